@@ -8,10 +8,13 @@
 # either express or implied, as more fully set forth in the License.
 #
 # See the NOTICE file distributed with this work for information regarding copyright ownership.
-from pycebes.core.dataframe import Dataframe
+from pycebes.core.dataframe import Dataframe, StorageLevels
 from pycebes.core.functions import *
+from pycebes.core.persistence import AutoPersistPolicy
 from pycebes.core.pipeline import Pipeline
 from pycebes.core.pipeline_api import *
 from pycebes.core.schema import StorageTypes, VariableTypes
-from pycebes.core.session import Session, ReadOptions, CsvReadOptions, JsonReadOptions, ParquetReadOptions
+from pycebes.core.session import Session, ReadOptions, CsvReadOptions, JsonReadOptions, ParquetReadOptions, \
+    WriteOptions, CsvWriteOptions, JsonWriteOptions
+from pycebes.core.writer import DataframeWriter
 from pycebes.internal.implicits import get_default_pipeline, get_default_session
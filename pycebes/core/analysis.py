@@ -0,0 +1,220 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import six
+
+import pycebes.core.expressions as exprs
+from pycebes.core import stages
+from pycebes.core.column import Column
+from pycebes.core.dataframe import Dataframe
+from pycebes.core.exceptions import AnalysisException
+from pycebes.core.inference import infer_fields, _resolve_column
+from pycebes.core.schema import Schema, SchemaField, StorageTypes, VariableTypes
+
+"""
+Static analysis of Dataframe operations and Pipelines, done on the client before
+any request is sent to the server, so that invalid jobs fail fast with a precise error message.
+
+The analysis is enabled by default, and can be switched off with the ``validate`` argument of #Session.
+"""
+
+
+def validate_columns(columns, schemas, expect_boolean=False):
+    """
+    Validate the given columns against the schemas of the Dataframes they can refer to
+
+    # Arguments
+    columns (list): list of #Column
+    schemas (dict): a dict of Dataframe ID -> #Schema, of all the Dataframes the columns can refer to.
+        Column names (i.e. ``functions.col('name')``) are resolved against all of them.
+    expect_boolean (bool): whether the columns must be boolean expressions, e.g. filtering conditions
+
+    # Raises
+    AnalysisException: if the columns are invalid, e.g. they refer to a column that does not exist
+    """
+    combined = Schema(fields=[f for s in schemas.values() for f in s.fields])
+    for c in columns:
+        if not isinstance(c, Column):
+            raise AnalysisException('Expected a Column, got {!r}'.format(c))
+
+        # check all column references first, to report precise errors
+        all_known = True
+        for ref in _column_references(c.expr):
+            if isinstance(ref, exprs.SparkPrimitiveExpression):
+                if ref.df_id not in schemas:
+                    # column of a Dataframe we don't know the lineage of, leave it to the server
+                    all_known = False
+                    continue
+                _resolve_column(schemas[ref.df_id], ref.col_name)
+            else:
+                _resolve_column(combined, ref.col_name)
+
+        if not all_known:
+            continue
+
+        # then the types
+        try:
+            fields = infer_fields(c, combined)
+        except NotImplementedError:
+            continue
+
+        if expect_boolean:
+            if len(fields) != 1 or fields[0].storage_type != StorageTypes.BOOLEAN:
+                raise AnalysisException('Expected a boolean condition, got {} of type {}'.format(
+                    ', '.join(f.name for f in fields), ', '.join(f.storage_type.name for f in fields)))
+
+
+def validate_pipeline(pipeline, feeds=None):
+    """
+    Validate the column-valued inputs of all stages in the given pipeline,
+    by propagating the schemas of the Dataframes given to the pipeline (directly or via ``feeds``)
+    through the stages. Stages whose input schema cannot be known on the client are skipped.
+
+    # Arguments
+    pipeline (Pipeline): the pipeline to be validated
+    feeds (dict): the feeds that will be given to #Pipeline.run
+
+    # Raises
+    AnalysisException: if an input slot refers to a column that does not exist in the input Dataframe
+    """
+    feed_values = {}
+    for k, v in (feeds or {}).items():
+        slot_desc = k.input_val if isinstance(k, stages.Placeholder) else k
+        if isinstance(slot_desc, stages.SlotDescriptor):
+            feed_values[(slot_desc.parent_name, slot_desc.name)] = v
+
+    output_schemas = {}
+    for stage in pipeline.stages.values():
+        _stage_output_schema(stage, feed_values, output_schemas)
+
+
+"""
+Private helpers
+"""
+
+
+def _column_references(expr):
+    """Yield all column references in the given expression tree"""
+    if isinstance(expr, (exprs.SparkPrimitiveExpression, exprs.UnresolvedColumnName)):
+        yield expr
+    for child in expr.child_expressions():
+        for ref in _column_references(child):
+            yield ref
+
+
+# Slots holding names of columns that are read from the input Dataframe of the stage.
+# Drop is not one of them: as in Spark, dropping a column that does not exist is a no-op
+_INPUT_COLUMN_SLOTS = [
+    (stages._HasInputCol, 'input_col'),
+    (stages._HasInputCols, 'input_cols'),
+    (stages._HasFeaturesCol, 'features_col'),
+    (stages._HasLabelCol, 'label_col'),
+    (stages._LinearRegressionInputs, 'weight_col'),
+    (stages._Evaluator, 'prediction_col'),
+]
+
+
+def _slot_value(stage, slot_name, feed_values):
+    """The value given to the input slot, either when the stage is created or via feeds"""
+    value = feed_values.get((stage.get_name(), slot_name))
+    if value is None:
+        value = stage.get_input(stage.slot_descriptor(slot_name))
+    if isinstance(value, stages.SlotDescriptor) and isinstance(value.parent, stages.ValuePlaceholder):
+        value = _slot_value(value.parent, 'input_val', feed_values)
+    return value
+
+
+def _input_schema(stage, feed_values, output_schemas):
+    """Schema of the input Dataframe of the given stage, or None if it is unknown"""
+    if isinstance(stage, stages.DataframePlaceholder):
+        slot_name = 'input_val'
+    elif any(s.name == 'input_df' for s in stages._get_slots(type(stage), is_input=True)):
+        slot_name = 'input_df'
+    else:
+        return None
+
+    value = feed_values.get((stage.get_name(), slot_name))
+    if value is None:
+        value = stage.get_input(stage.slot_descriptor(slot_name))
+    if isinstance(value, Dataframe):
+        return value.schema
+    if isinstance(value, stages.SlotDescriptor):
+        return _stage_output_schema(value.parent, feed_values, output_schemas).get(value.name)
+    return None
+
+
+def _stage_output_schema(stage, feed_values, output_schemas):
+    """
+    Validate the given stage, and return a dict of output slot name -> Schema of its Dataframe outputs
+    that can be inferred on the client
+    """
+    name = stage.get_name()
+    if name in output_schemas:
+        return output_schemas[name]
+
+    # to stop infinite recursion in case of (invalid) cycles
+    output_schemas[name] = {}
+
+    schema = _input_schema(stage, feed_values, output_schemas)
+    if schema is None:
+        return output_schemas[name]
+
+    if isinstance(stage, stages.DataframePlaceholder):
+        output_schemas[name] = {'output_val': schema}
+        return output_schemas[name]
+
+    input_slot_names = [s.name for s in stages._get_slots(type(stage), is_input=True)]
+    for clz, slot_name in _INPUT_COLUMN_SLOTS:
+        if not isinstance(stage, clz) or slot_name not in input_slot_names:
+            continue
+        value = _slot_value(stage, slot_name, feed_values)
+        if value is None or isinstance(value, stages.SlotDescriptor):
+            continue
+        for col_name in ([value] if isinstance(value, six.text_type) else value):
+            try:
+                _resolve_column(schema, col_name)
+            except AnalysisException:
+                raise AnalysisException('Stage {!r}: column {!r} given in slot {} is not found in its input '
+                                        'Dataframe. Available columns are: {}'.format(
+                                            name, col_name, slot_name, ', '.join(schema.columns)))
+
+    fields = _stage_output_fields(stage, schema, feed_values)
+    if fields is not None:
+        output_schemas[name] = {'output_df': Schema(fields=fields)}
+    return output_schemas[name]
+
+
+def _stage_output_fields(stage, schema, feed_values):
+    """Fields of the output Dataframe of the given stage, or None if they cannot be inferred"""
+    fields = list(schema.fields)
+
+    if isinstance(stage, stages.Drop):
+        dropped = _slot_value(stage, 'col_names', feed_values)
+        if not isinstance(dropped, (list, tuple)):
+            return None
+        return [f for f in fields if f.name not in set(dropped)]
+
+    new_columns = {stages.VectorAssembler: ('output_col', StorageTypes.VECTOR, VariableTypes.ARRAY),
+                   stages.StringIndexer: ('output_col', StorageTypes.DOUBLE, VariableTypes.NOMINAL),
+                   stages.IndexToString: ('output_col', StorageTypes.STRING, VariableTypes.NOMINAL),
+                   stages.LinearRegression: ('prediction_col', StorageTypes.DOUBLE, VariableTypes.CONTINUOUS)}
+    if type(stage) not in new_columns:
+        return None
+
+    slot_name, storage_type, variable_type = new_columns[type(stage)]
+    col_name = _slot_value(stage, slot_name, feed_values)
+    if not isinstance(col_name, six.text_type):
+        return None
+    return [f for f in fields if f.name != col_name] + [SchemaField(col_name, storage_type, variable_type)]
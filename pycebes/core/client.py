@@ -13,123 +13,479 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import copy
+import hashlib
 import json
+import math
+import os
 import random
+import threading
 import time
+import uuid
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 import requests
+import six
 from future import utils as future_utils
 from requests import exceptions as requests_exceptions
 from requests_toolbelt import MultipartEncoderMonitor
 
 from pycebes.core.exceptions import ServerException
-from pycebes.internal.helpers import require
+from pycebes.internal.helpers import require, file_digest, get_logger
+from pycebes.internal.local_cache import LocalCache
+from pycebes.internal.polling import AdaptivePoller
+from pycebes.internal.responses import JobMetrics, JobProgress
+from pycebes.internal.scheduler import Priorities, RequestScheduler
+
+
+# seconds to wait before checking again a server that stopped answering
+_HEALTH_CHECK_INTERVAL = 30
+
+# timeout, in seconds, of the health check of a server
+_HEALTH_CHECK_TIMEOUT = 5
+
+# size, in bytes, of the chunks in which downloaded files are written to disk
+_DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# HTTP status codes of requests that can be sent again later
+_TRANSIENT_STATUS_CODES = (requests.codes.bad_gateway, requests.codes.service_unavailable,
+                           requests.codes.gateway_timeout)
+
+# read-only commands whose identical requests sent at the same time by several threads are sent only once
+_SINGLE_FLIGHT_COMMANDS = ('df/count', 'df/take', 'df/get', 'df/tags', 'df/estimatesize', 'df/cached',
+                           'df/approxquantile', 'df/histogram', 'model/get', 'model/tags',
+                           'pipeline/get', 'pipeline/tags')
+
+_logger = get_logger(__name__)
 
 
 class Client(object):
     """
     Represent a connection to the Cebes server. Normally created by a session.
+
+    The client can be connected to several Cebes servers running in front of the same cluster, by giving
+    a list of endpoints as ``host``. New requests are then sent to the server with the least requests
+    in progress from this client, and are re-sent to another server if the chosen one cannot be reached.
+    Asynchronous requests are always polled on the server that accepted them. Servers that stopped
+    answering are checked again (via ``/version``) every ``_HEALTH_CHECK_INTERVAL`` seconds.
+
+    The authorization tokens and the server API version are cached in ``~/.cebes/tokens.json``
+    (readable only by the current user) for every host, port, user name and password, so that new
+    clients with the same credentials can skip the version check and the login. Tokens renewed by
+    the server are saved as they come, and the client logs in again if the server rejects them.
+
+    Blocking calls can be bounded by a wall-clock deadline, given with their ``timeout`` argument,
+    with the :func:`deadline` context manager, or for all calls via ``default_timeout``. Deadlines are
+    measured with a monotonic clock, and sent to the server in the ``Request-Timeout`` header (in seconds).
+
+    Asynchronous requests are polled according to how long previous requests of the same command took,
+    see #AdaptivePoller. The statistics are available via ``client.poller.stats()``.
+
+    When several threads send the same read-only asynchronous request (same URI and same data, for the
+    commands in ``_SINGLE_FLIGHT_COMMANDS``, e.g. ``df/count``) at the same time, only one of them is sent
+    to the server and all of them get its result. This can be disabled by setting ``single_flight`` to False.
+
+    At most ``max_in_flight`` asynchronous requests run on the server at any time, the others wait
+    in the queue of ``client.scheduler`` (see #RequestScheduler), where interactive commands such as
+    ``df/take`` and ``df/count`` go ahead of batch ones such as ``pipeline/run``.
+
+    Every request is sent with a unique ``Idempotency-Key`` header. When sending it fails with a transient
+    error (the server cannot be reached, the connection is reset, or the server answers 502, 503 or 504),
+    it is sent again with the same key, up to ``max_retries`` times with exponential back-off, so that the
+    server can recognize requests it already accepted instead of starting duplicate jobs. Asynchronous jobs
+    that fail because of the cluster (e.g. a lost Spark executor) are submitted again as new requests.
+
+    :param host: host name of the server, or a list of endpoints, each of them is either a host name,
+        a string ``host:port`` or a tuple ``(host, port)``
+    :param port: port of the server(s), when it is not given in ``host``
+    :param default_timeout: deadline in seconds of the blocking calls that are not given one explicitly.
+        None means they can wait indefinitely.
+    :param max_in_flight: maximum number of asynchronous requests of this client running on the server
+        at the same time. None means no limit
     """
 
     def __init__(self, host='localhost', port=21000, user_name='',
-                 password='', api_version='v1', interactive=True):
-        self.host = host
-        self.port = port
+                 password='', api_version='v1', interactive=True, cache_tokens=True, default_timeout=None,
+                 max_in_flight=16):
+        self._endpoints = [_Endpoint(h, p) for h, p in Client._parse_endpoints(host, port)]
+        self.host = self._endpoints[0].host
+        self.port = self._endpoints[0].port
         self.user_name = user_name
         self.api_version = api_version
         self.interactive = interactive
+        self.default_timeout = default_timeout
+        self._password = password
 
-        self.session = requests.Session()
-        self.session.headers.update({'Content-Type': 'application/json'})
+        # content hash -> server path of the files uploaded by this machine
+        self._upload_index = LocalCache('uploads')
+        self._token_cache = LocalCache('tokens', file_mode=0o600) if cache_tokens else None
+
+        # protects the counters of the endpoints and the request ID -> endpoint map
+        self._lock = threading.Lock()
+        self._request_endpoints = {}
+
+        # the deadline set by deadline(), per thread
+        self._local = threading.local()
 
-        self._check_server_version()
+        # completion times of the asynchronous requests, per command
+        self.poller = AdaptivePoller()
 
-        # login
-        r = self.session.post(self._server_url('auth/login'),
-                              data=json.dumps({'userName': user_name, 'passwordHash': password}))
-        self.session.headers.update({'Authorization': r.headers.get('Set-Authorization'),
-                                     'Refresh-Token': r.headers.get('Set-Refresh-Token'),
-                                     'X-XSRF-TOKEN': r.cookies.get('XSRF-TOKEN')})
+        # (uri, canonical data) -> Future of the result, of the asynchronous requests being waited for
+        self.single_flight = True
+        self._in_flight = {}
 
-    def upload(self, path):
+        self.scheduler = RequestScheduler(max_in_flight=max_in_flight)
+
+        # retries of requests that failed with a transient error, see _with_retry()
+        self.max_retries = 3
+        self.retry_backoff = 0.5
+
+        if len(self._endpoints) == 1:
+            self._connect(self._endpoints[0])
+        else:
+            for endpoint in self._endpoints:
+                try:
+                    self._connect(endpoint)
+                except (requests_exceptions.ConnectionError, requests_exceptions.Timeout):
+                    self._mark_failed(endpoint)
+            require(any(e.connected for e in self._endpoints),
+                    'Unable to connect to any of the servers: {}'.format(', '.join(map(str, self._endpoints))))
+
+    @property
+    def session(self):
+        """
+        The HTTP session to the first server of this client
+
+        :rtype: requests.Session
+        """
+        return self._endpoints[0].session
+
+    @property
+    def endpoints(self):
+        """List of ``host:port`` of the servers this client is sending requests to"""
+        return ['{}'.format(e) for e in self._endpoints]
+
+    def upload(self, path, dedup=True, digest=None, progress=None, timeout=None):
         """
         Upload the given path to the server, return the JSON response
 
+        When ``dedup`` is True, the content hash of the file is computed first, and the file is only
+        transferred if the server does not have a file with the same content already.
+
         :param path: path to the file to be uploaded
-        :return: a dict object with 'path' and 'size'
+        :param dedup: whether to skip the transfer if the server already has this content
+        :param digest: the sha256 hex digest of the file, if it is already known
+        :param progress: the ``_TransferProgress`` to report to, when this file is part of a bigger upload.
+            If None, the progress of this file is reported on its own.
+        :param timeout: deadline of the upload, in seconds. See :func:`deadline`
+        :return: a dict object with 'path' and 'size', and 'sha256' when ``dedup`` is True
+        :raises TimeoutError: if the upload is not done before the deadline
         """
+        return self._upload(path, dedup, digest, progress, self._deadline(timeout))
+
+    def _upload(self, path, dedup, digest, progress, deadline):
+        """Upload the given file before the given deadline. See :func:`upload`"""
+        file_size = os.path.getsize(path)
+        own_progress = progress is None
+        if own_progress:
+            progress = _TransferProgress(file_size, interactive=self.interactive)
+        if dedup:
+            digest = digest or file_digest(path)
+
+        sent = [0]
 
         def callback(encoder):
-            if self.interactive:
-                n = 20
-                pct = encoder.bytes_read / encoder.len
-                size = int(round(n * pct))
-                s = '\rUploading: {}{} {:.0f}%'.format('.' * size, ' ' * (max(0, n - size)), pct * 100)
-                print(s, end='')
-
-        with open(path, 'rb') as f:
-            monitor = MultipartEncoderMonitor.from_fields(fields={'file': f}, callback=callback)
-            headers = {'Content-Type': monitor.content_type}
-
-            response = self.session.put(self._server_url('storage/upload'), data=monitor, headers=headers)
+            # encoder.len includes the multipart overhead, scale it back to the file size
+            sent_bytes = int(file_size * encoder.bytes_read / max(encoder.len, 1))
+            progress.update(sent_bytes - sent[0])
+            sent[0] = sent_bytes
+
+        def _upload(endpoint):
+            index_key = None
+            if dedup:
+                index_key = '{}:{}'.format(endpoint, digest)
+                existing = self._lookup_upload(endpoint, digest, file_size, self._upload_index.get(index_key),
+                                               deadline=deadline)
+                if existing is not None:
+                    _logger.info('Skipped uploading {}, already on the server at {}'.format(path, existing['path']))
+                    progress.update(file_size)
+                    if own_progress:
+                        progress.finish()
+                    self._upload_index.put(index_key, existing['path'])
+                    return dict(existing, sha256=digest)
+
+            def _put():
+                progress.update(-sent[0])
+                sent[0] = 0
+                timeout = self._remaining(deadline, 'uploading {}'.format(path))
+                with open(path, 'rb') as f:
+                    monitor = MultipartEncoderMonitor.from_fields(fields={'file': f}, callback=callback)
+                    headers = dict(self._timeout_headers(timeout), **{'Content-Type': monitor.content_type})
+                    return endpoint.session.put(self._server_url('storage/upload', endpoint),
+                                                data=monitor, headers=headers, timeout=timeout)
+
+            response = self._send_before(deadline, 'uploading {}'.format(path), endpoint, _put)
             require(response.status_code == requests.codes.ok, 'Unsuccessful request: {}'.format(response.text))
-            if self.interactive:
-                print('')
-            return response.json()
+            if own_progress:
+                progress.finish()
+            result = response.json()
+
+            if index_key is not None:
+                if result.get('path'):
+                    self._upload_index.put(index_key, result['path'])
+                result['sha256'] = digest
+            return result
+
+        result, endpoint = self._with_failover(_upload, track=True)
+        self._release(endpoint)
+        return result
+
+    def upload_many(self, paths, dedup=True, max_workers=4, timeout=None):
+        """
+        Upload the given files to the server concurrently, using at most ``max_workers`` threads.
+        The progress is reported for all the files together. As soon as one of the uploads fails,
+        the uploads that are not started yet are cancelled, and its exception is raised.
+
+        :param paths: list of paths to the files to be uploaded
+        :param dedup: whether to skip the files whose content is already on the server. See :func:`upload`
+        :param max_workers: maximum number of concurrent uploads
+        :param timeout: deadline of all the uploads together, in seconds. See :func:`deadline`
+        :return: list of the responses of :func:`upload`, in the same order as ``paths``
+        :raises TimeoutError: if the uploads are not done before the deadline
+        """
+        require(max_workers > 0, 'max_workers must be positive, got {!r}'.format(max_workers))
+        paths = list(paths)
+        deadline = self._deadline(timeout)
+        if len(paths) == 1:
+            return [self._upload(paths[0], dedup, None, None, deadline)]
+
+        progress = _TransferProgress(sum(os.path.getsize(p) for p in paths), n_files=len(paths),
+                                   interactive=self.interactive)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+            uploads = [executor.submit(self._upload, p, dedup, None, progress, deadline) for p in paths]
+            try:
+                done, _ = futures.wait(uploads, return_when=futures.FIRST_EXCEPTION)
+                failed = next((f for f in uploads if f in done and f.exception() is not None), None)
+                if failed is not None:
+                    failed.result()
+            except BaseException:
+                for f in uploads:
+                    f.cancel()
+                raise
+            results = [f.result() for f in uploads]
+        progress.finish()
+        return results
+
+    def download(self, path, local_path, progress=None, timeout=None):
+        """
+        Download the given file from the server into ``local_path``, e.g. a part of a Dataframe
+        exported with ``df/export``. The file is streamed to disk, it is never held in memory as a whole.
+
+        Downloading is safe to repeat, so it is tried again on transient errors (see ``max_retries``).
+
+        :param path: path of the file on the server
+        :param local_path: path to the local file to be written. It is overwritten if it exists
+        :param progress: the ``_TransferProgress`` to report to, when this file is part of a bigger download.
+            If None, the progress is not reported.
+        :param timeout: deadline of the download, in seconds. See :func:`deadline`
+        :return: the number of bytes downloaded
+        :raises TimeoutError: if the download is not done before the deadline
+        """
+        return self._download(path, local_path, progress, self._deadline(timeout))
+
+    def _download(self, path, local_path, progress, deadline):
+        """Download the given file before the given deadline. See :func:`download`"""
+        what = 'downloading {}'.format(path)
+        received = [0]
+
+        def _get(ep):
+            timeout = self._remaining(deadline, what)
+            return ep.session.get(self._server_url('storage/download', ep), params={'path': path},
+                                  headers=self._timeout_headers(timeout), timeout=timeout, stream=True)
+
+        def _download(ep):
+            if progress is not None:
+                progress.update(-received[0])
+            received[0] = 0
+            response = self._send_before(deadline, what, ep, lambda: _get(ep))
+            try:
+                if response.status_code in _TRANSIENT_STATUS_CODES:
+                    raise ServerException(message='Server {} answered {}: {}'.format(
+                        ep, response.status_code, response.text), request_uri='storage/download',
+                        request_entity={'path': path}, retryable=True)
+                require(response.status_code == requests.codes.ok,
+                        'Unsuccessful request: {}'.format(response.text))
+                with open(local_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=_DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                        received[0] += len(chunk)
+                        if progress is not None:
+                            progress.update(len(chunk))
+                        self._remaining(deadline, what)
+            finally:
+                response.close()
+            return received[0]
+
+        def _download_once():
+            result, ep = self._with_failover(_download, track=True)
+            self._release(ep)
+            return result
+
+        return self._with_retry(_download_once, deadline, what)
+
+    def download_many(self, paths, local_paths, total_bytes=None, max_workers=4, timeout=None):
+        """
+        Download the given files from the server concurrently, using at most ``max_workers`` connections.
+        The progress is reported for all the files together.
 
-    def post(self, uri, data):
+        :param paths: list of paths of the files on the server
+        :param local_paths: list of paths to the local files to be written, in the same order as ``paths``
+        :param total_bytes: total size of the files, if known, used to report the progress
+        :param max_workers: maximum number of concurrent downloads
+        :param timeout: deadline of all the downloads together, in seconds. See :func:`deadline`
+        :return: list of the number of bytes downloaded for every file, in the same order as ``paths``
+        :raises TimeoutError: if the downloads are not done before the deadline
+        """
+        require(max_workers > 0, 'max_workers must be positive, got {!r}'.format(max_workers))
+        paths, local_paths = list(paths), list(local_paths)
+        require(len(paths) == len(local_paths), 'Expect as many local paths as paths, got {} and {}'.format(
+            len(local_paths), len(paths)))
+        if not paths:
+            return []
+        deadline = self._deadline(timeout)
+
+        progress = None
+        if total_bytes is not None:
+            progress = _TransferProgress(total_bytes, n_files=len(paths), interactive=self.interactive,
+                                         verb='Downloading')
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+            futures = [executor.submit(self._download, p, lp, progress, deadline) for p, lp in zip(paths, local_paths)]
+            results = [f.result() for f in futures]
+        if progress is not None:
+            progress.finish()
+        return results
+
+    def post(self, uri, data, timeout=None):
         """
         Send a POST request to the given uri, with the given data
         This function catches the exceptions.
 
+        :param timeout: deadline of the request, in seconds. See :func:`deadline`
         :return: a JSON object of the response
         :exception ConnectionError: if a connection to the server can't be established.
         :exception ValueError: if the response code is not OK
+        :exception TimeoutError: if the server does not answer before the deadline
         """
-        try:
-            response = self.session.post(self._server_url(uri), data=json.dumps(data))
-            require(response.status_code == requests.codes.ok, 'Unsuccessful request: {}'.format(response.text))
-            return response.json()
-
-        except requests_exceptions.ConnectionError as e:
-            # wrap this in the standard OSError to ease end-users
-            future_utils.raise_from(OSError('{}'.format(e)), e)
+        deadline = self._deadline(timeout)
+        headers = self._idempotency_headers()
+        return self._with_retry(lambda: self._post(uri, data, deadline=deadline, headers=headers), deadline, uri)[0]
 
-    def wait(self, request_id, sleep_base=0.5, max_count=100):
+    def wait(self, request_id, sleep_base=0.5, max_count=100, timeout=None, progress_callback=None):
         """
         Wait for the given request ID to complete, using an exponential back-off scheme, where:
-         - wait for at most `max_count` iterations
+         - wait until the deadline, and for at most `max_count` iterations
          - at each iteration `i`: 
             - if result is ready, return
-            - if not, sleep for `sleep_base * randint(0, [2 ** min(i, 7)] - 1)` seconds
+            - if not, sleep for `sleep_base * randint(0, [2 ** min(i, 7)] - 1)` seconds,
+              or until the deadline if it comes earlier
+
+        The request is polled on the server that accepted it. Requests sent with :func:`post_and_wait`
+        are polled according to the completion times of the previous requests of the same command instead,
+        see :class:`AdaptivePoller`.
 
         :param request_id: ID of the request to wait for
         :param sleep_base: base of 1 sleep, in seconds
-        :param max_count: maximum number of iterations to wait for
+        :param max_count: maximum number of polls after the first one, so that the wait is bounded
+            even without a deadline. None means no limit
+        :param timeout: maximum time to wait, in seconds. See :func:`deadline`
+        :param progress_callback: function called with a :class:`JobProgress` every time the server reports
+            a new progress of the request (completed Spark stages and tasks, processed rows).
+            In interactive mode, the progress is also shown as a progress bar.
         :return: the JSON object
          
-        :raises TimeoutError: if ``max_count`` is exceeded
+        :raises TimeoutError: if the deadline passes or ``max_count`` is exceeded
         :raises ServerException: if the request failed, e.g. an exception thrown on the server
-        :raises ValueError: invalid status received from the server 
+        :raises ValueError: invalid status response from the server 
+        """
+        return self._wait(request_id, self._deadline(timeout), sleep_base=sleep_base, max_count=max_count,
+                          progress_callback=progress_callback)
+
+    def _wait(self, request_id, deadline, sleep_base=0.5, max_count=100, uri=None, started=None,
+              progress_callback=None):
+        """
+        Wait for the given request ID to complete before the given deadline. See :func:`wait`
+
+        :param uri: the command of the request, whose completion times are used to schedule the polls
+        :param started: value of ``time.monotonic()`` when the request was sent
+        """
+        return Client._request_result(request_id, self._poll(
+            request_id, deadline, sleep_base=sleep_base, max_count=max_count, uri=uri, started=started,
+            progress_callback=progress_callback))
+
+    def _poll(self, request_id, deadline, sleep_base=0.5, max_count=100, uri=None, started=None,
+              progress_callback=None):
+        """
+        Poll the given request ID until it is not scheduled anymore. See :func:`_wait`
+
+        :return: the last status of the request
         """
         if self.interactive:
             print('Request ID: {}'.format(request_id))
+        progress = _JobProgressReporter(progress_callback, interactive=self.interactive)
+
+        with self._lock:
+            endpoint = self._request_endpoints.get(request_id, self._endpoints[0])
+
+        what = 'waiting for request ID {}'.format(request_id)
+        started = time.monotonic() if started is None else started
+        # the last time the request was known to be running, relative to ``started``
+        last_running = 0.
+        n_polls = 0
 
-        status = self.post('request/{}'.format(request_id), {})
-        cnt = 0
+        while True:
+            delay = self.poller.next_delay(uri, time.monotonic() - started, n_polls, sleep_base=sleep_base)
+            if delay > 0:
+                remaining = self._remaining(deadline, what)
+                time.sleep(delay if remaining is None else min(delay, remaining))
 
-        while status.get('status', '') == 'scheduled':
-            time.sleep(sleep_base * random.randint(0, (2 ** min(cnt, 7)) - 1))
-            cnt += 1
-            if cnt >= max_count:
-                raise TimeoutError('Timed out waiting for request ID {} after {} sleeps'.format(request_id, cnt))
+            status = self._with_retry(lambda: self._post('request/{}'.format(request_id), {}, endpoint=endpoint,
+                                                         deadline=deadline), deadline, what)[0]
+            n_polls += 1
+            if status.get('progress'):
+                progress.update(JobProgress(status['progress']))
+            if status.get('status', '') != 'scheduled':
+                progress.finish()
+                break
 
-            status = self.post('request/{}'.format(request_id), {})
+            last_running = time.monotonic() - started
+            if max_count is not None and n_polls > max_count:
+                raise TimeoutError('Timed out waiting for request ID {} after {} sleeps'.format(
+                    request_id, n_polls - 1))
+
+        if status.get('status', '') == 'finished':
+            # the request completed somewhere between the last two polls
+            self.poller.record(uri, (last_running + time.monotonic() - started) / 2., n_polls)
+        return status
+
+    @staticmethod
+    def _request_result(request_id, status):
+        """
+        The response of a completed request, given its last status
 
+        :raises ServerException: if the request failed or was cancelled
+        :raises ValueError: invalid status response from the server
+        """
         request_status = status.get('status', '')
         if request_status == 'finished':
             return status.get('response', {})
 
+        if request_status == 'cancelled':
+            raise ServerException(message='Request ID {} was cancelled'.format(request_id),
+                                  request_uri=status.get('requestUri', ''),
+                                  request_entity=status.get('requestEntity'), retryable=False)
+
         if request_status == 'failed':
             fail_response = status.get('response', {})
             raise ServerException(message=fail_response.get('message', 'Unknown server exception'),
@@ -137,36 +493,655 @@ class Client(object):
                                   request_uri=status.get('requestUri', ''),
                                   request_entity=status.get('requestEntity'))
 
-        raise ValueError('Request ID {}: invalid status response from server: {}'.format(request_id, status.text))
+        raise ValueError('Request ID {}: invalid status response from server: {}'.format(request_id, status))
 
-    def post_and_wait(self, uri, data):
+    def post_and_wait(self, uri, data, timeout=None, progress_callback=None, priority=None):
         """
         POST a request to the server, which is expected to return an ID that will be 
         used to checking the results in an exponential-backoff fashion.
 
+        :param timeout: deadline of the whole call (sending the request and waiting for its result),
+            in seconds. See :func:`deadline`
+        :param progress_callback: function called with the progress of the request, see :func:`wait`.
+            Not called if the same request is already being waited for by another thread.
+        :param priority: priority of the request in the queue of the scheduler, see :class:`Priorities`.
+            If None, it is decided from ``uri``
         :return: a JSON object of the response
+        :raises TimeoutError: if the result is not available before the deadline, or after 100 polls
+            (see :func:`wait`). The request is then cancelled on the server.
+        """
+        deadline = self._deadline(timeout)
+        if not self.single_flight or uri not in _SINGLE_FLIGHT_COMMANDS:
+            return self._post_and_wait(uri, data, deadline, progress_callback, priority)
+
+        key = (uri, json.dumps(data, sort_keys=True))
+        while True:
+            with self._lock:
+                future = self._in_flight.get(key)
+                leader = future is None
+                if leader:
+                    future = self._in_flight[key] = futures.Future()
+
+            if leader:
+                try:
+                    result = self._post_and_wait(uri, data, deadline, progress_callback, priority)
+                except BaseException as e:
+                    self._finish_flight(key, future, exception=e)
+                    raise
+                self._finish_flight(key, future, result=result)
+                return result
+
+            try:
+                return copy.deepcopy(future.result(timeout=self._remaining(deadline, 'waiting for {}'.format(uri))))
+            except BaseException as e:
+                if future.done() and isinstance(future.exception(), (KeyboardInterrupt, TimeoutError)):
+                    # the thread which sent the request gave up on it, send it again
+                    continue
+                if not future.done() and isinstance(e, futures.TimeoutError):
+                    future_utils.raise_from(TimeoutError('Deadline exceeded while waiting for {}'.format(uri)), e)
+                if future.done() and e is future.exception():
+                    # raising the exception of the leader in every thread would keep growing its traceback
+                    future_utils.raise_from(_copy_exception(e), e)
+                raise
+
+    def _finish_flight(self, key, future, result=None, exception=None):
+        """Set the outcome of the given in-flight request, for the threads waiting for the same request"""
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def _post_and_wait(self, uri, data, deadline, progress_callback=None, priority=None):
+        """POST the request and wait for its result before the deadline. See :func:`post_and_wait`"""
+        with self.scheduler.slot(Priorities.of(uri) if priority is None else priority, deadline):
+            return self._post_and_wait_now(uri, data, deadline, progress_callback)
+
+    def _post_and_wait_now(self, uri, data, deadline, progress_callback=None):
+        """
+        POST the request and wait for its result. Jobs that failed because of the cluster rather than
+        the request (see :func:`ServerException.is_retryable`, e.g. an executor was lost) are submitted
+        again as new requests, at most ``max_retries`` times and not after the deadline.
+        """
+        attempt = 0
+        while True:
+            request_id, status = self._submit_and_poll(uri, data, deadline, progress_callback)
+            try:
+                return Client._request_result(request_id, status)
+            except ServerException as e:
+                if not e.is_retryable or not self._wait_before_retry(attempt, deadline, uri, e):
+                    raise
+                attempt += 1
+
+    def _submit_and_poll(self, uri, data, deadline, progress_callback=None):
+        """
+        POST the request and poll it until it is done
+
+        :return: a tuple of the request ID and its last status
+        """
+        started = time.monotonic()
+        headers = self._idempotency_headers()
+        response, endpoint = self._with_retry(
+            lambda: self._post(uri, data=data, track=True, deadline=deadline, headers=headers), deadline, uri)
+        try:
+            request_id = response.get('requestId', None)
+            require(request_id is not None, 'Request ID not found. Maybe this is not an asynchronous command? '
+                                            'uri={}, response={}'.format(uri, response))
+            with self._lock:
+                self._request_endpoints[request_id] = endpoint
+            try:
+                return request_id, self._poll(request_id, deadline, uri=uri, started=started,
+                                              progress_callback=progress_callback)
+            except (KeyboardInterrupt, TimeoutError):
+                # nobody is going to take the result, stop the job on the server
+                self.cancel(request_id)
+                raise
+            finally:
+                with self._lock:
+                    self._request_endpoints.pop(request_id, None)
+        finally:
+            self._release(endpoint)
+
+    def job_metrics(self, request_id):
+        """
+        Get the metrics of the Spark stages run so far for the given request, e.g. to spot stuck jobs
+        (no task completed for a long time) or skewed ones (see :func:`JobMetrics.skewed_stages`).
+        Works for running and finished requests.
+
+        :param request_id: ID of the request
+        :rtype: JobMetrics
+        """
+        with self._lock:
+            endpoint = self._request_endpoints.get(request_id, self._endpoints[0])
+        return JobMetrics(self._post('request/{}/metrics'.format(request_id), {}, endpoint=endpoint)[0])
+
+    def cancel(self, request_id):
+        """
+        Ask the server to cancel the given request. The request is cancelled on a best-effort basis:
+        it might have finished already, or the server might not be able to stop it.
+
+        :param request_id: ID of the request to be cancelled
+        :return: True if the server accepted to cancel the request, False otherwise
+        """
+        with self._lock:
+            endpoint = self._request_endpoints.get(request_id, self._endpoints[0])
+        try:
+            # not bounded by the deadline of the request, which might have passed already
+            response = self._send(endpoint, lambda: endpoint.session.post(
+                self._server_url('request/{}/cancel'.format(request_id), endpoint), data=json.dumps({}),
+                timeout=_HEALTH_CHECK_TIMEOUT))
+        except requests_exceptions.RequestException:
+            return False
+        return response.status_code == requests.codes.ok
+
+    def cancel_all(self):
+        """
+        Cancel all requests of this client that are still being waited for
+
+        :return: list of IDs of the requests that were cancelled
+        """
+        with self._lock:
+            request_ids = list(self._request_endpoints.keys())
+        return [request_id for request_id in request_ids if self.cancel(request_id)]
+
+    def logout(self):
+        """
+        Log out of the servers of this client, on a best-effort basis, and forget the cached tokens.
+        Requests sent afterwards log in again.
+        """
+        for endpoint in self._endpoints:
+            if not endpoint.connected:
+                continue
+            try:
+                endpoint.session.post(self._server_url('auth/logout', endpoint), data=json.dumps({}),
+                                      timeout=_HEALTH_CHECK_TIMEOUT)
+            except requests_exceptions.RequestException as e:
+                _logger.debug('Failed to log out of {}: {}'.format(endpoint, e))
+            if self._token_cache is not None:
+                self._token_cache.remove(self._token_cache_key(endpoint))
+
+    @contextmanager
+    def deadline(self, seconds):
         """
-        response = self.post(uri, data=data)
-        request_id = response.get('requestId', None)
-        require(request_id is not None, 'Request ID not found. Maybe this is not an asynchronous command? '
-                                        'uri={}, response={}'.format(uri, response))
-        return self.wait(request_id)
+        Context manager bounding all the blocking calls made by the current thread inside it,
+        so that they raise TimeoutError when the given number of seconds has passed.
+        Nested deadlines can only make the deadline earlier.
+
+        Example:
+
+            with client.deadline(30):
+                df.take(10)
+                len(df)
+
+        :param seconds: the time budget of the calls, in seconds
+        """
+        require(seconds > 0, 'Deadline must be positive, got {!r}'.format(seconds))
+        previous = getattr(self._local, 'deadline', None)
+        new_deadline = time.monotonic() + seconds
+        self._local.deadline = new_deadline if previous is None else min(previous, new_deadline)
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
 
     """
     Private helpers
     """
 
-    def _server_url(self, uri):
-        return 'http://{}:{}/{}/{}'.format(self.host, self.port, self.api_version, uri)
+    def _deadline(self, timeout=None):
+        """
+        The deadline, in terms of ``time.monotonic()``, of a call given the ``timeout`` argument.
+        An explicit timeout is still bounded by the enclosing :func:`deadline`, while
+        ``default_timeout`` only applies to calls that have neither of them.
+
+        :return: the deadline, or None if the call can wait indefinitely
+        """
+        current = getattr(self._local, 'deadline', None)
+        if timeout is None:
+            if current is not None or self.default_timeout is None:
+                return current
+            timeout = self.default_timeout
+        require(timeout > 0, 'Timeout must be positive, got {!r}'.format(timeout))
+        deadline = time.monotonic() + timeout
+        return deadline if current is None else min(current, deadline)
+
+    @staticmethod
+    def _remaining(deadline, what):
+        """
+        Seconds left until the given deadline, or None if there is no deadline
+
+        :raises TimeoutError: if the deadline has passed
+        """
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError('Deadline exceeded while {}'.format(what))
+        return remaining
+
+    @staticmethod
+    def _timeout_headers(timeout):
+        """Headers telling the server how many seconds the client is going to wait for the answer"""
+        if timeout is None:
+            return {}
+        return {'Request-Timeout': '{}'.format(int(math.ceil(timeout)))}
+
+    def _send_before(self, deadline, what, endpoint, send):
+        """
+        Same as :func:`_send`, but turns timeouts of the HTTP request into TimeoutError
+        when there is a deadline.
+        Connection timeouts are left as they are, so that the request can be sent to another server.
+        """
+        try:
+            return self._send(endpoint, send)
+        except requests_exceptions.ReadTimeout as e:
+            if deadline is None:
+                raise
+            future_utils.raise_from(TimeoutError('Deadline exceeded while {}'.format(what)), e)
+
+    @staticmethod
+    def _parse_endpoints(host, port):
+        """
+        Parse the endpoints given to the constructor into a list of (host, port)
+        """
+        hosts = [host] if isinstance(host, six.string_types) else list(host)
+        require(len(hosts) > 0, 'Expect at least one server, got {!r}'.format(host))
+
+        endpoints = []
+        for h in hosts:
+            if isinstance(h, (tuple, list)):
+                require(len(h) == 2, 'Expect a tuple of (host, port), got {!r}'.format(h))
+                endpoints.append((h[0], int(h[1])))
+            else:
+                require(isinstance(h, six.string_types) and h != '', 'Invalid host: {!r}'.format(h))
+                if ':' in h:
+                    h, p = h.rsplit(':', 1)
+                    endpoints.append((h, int(p)))
+                else:
+                    endpoints.append((h, port))
+        return endpoints
+
+    def _server_url(self, uri, endpoint=None):
+        endpoint = endpoint or self._endpoints[0]
+        return 'http://{}:{}/{}/{}'.format(endpoint.host, endpoint.port, self.api_version, uri)
+
+    def _post(self, uri, data, endpoint=None, track=False, deadline=None, headers=None):
+        """
+        POST the given data to the given endpoint, or to the best endpoint if it is None.
+        See :func:`_with_failover`.
+
+        :param deadline: deadline of the request, see :func:`_deadline`
+        :param headers: additional headers of the request
+        :return: a tuple of the JSON response and the endpoint which answered
+        :raises ServerException: if the server is temporarily unable to handle the request (502, 503 or 504)
+        """
+        what = 'sending {}'.format(uri)
+
+        def _post_once(ep):
+            timeout = self._remaining(deadline, what)
+            return ep.session.post(self._server_url(uri, ep), data=json.dumps(data),
+                                   headers=dict(self._timeout_headers(timeout), **(headers or {})), timeout=timeout)
+
+        def _do_post(ep):
+            response = self._send_before(deadline, what, ep, lambda: _post_once(ep))
+            if response.status_code in _TRANSIENT_STATUS_CODES:
+                raise ServerException(message='Server {} answered {}: {}'.format(
+                    ep, response.status_code, response.text), request_uri=uri, request_entity=data, retryable=True)
+            require(response.status_code == requests.codes.ok, 'Unsuccessful request: {}'.format(response.text))
+            return response.json()
+
+        return self._with_failover(_do_post, endpoint=endpoint, track=track)
+
+    @staticmethod
+    def _idempotency_headers():
+        """Headers identifying a request, kept the same when the request is sent again"""
+        return {'Idempotency-Key': uuid.uuid4().hex}
+
+    def _with_retry(self, func, deadline, what):
+        """
+        Call ``func()`` and return its result. If it fails with a transient error (see :func:`_is_transient`),
+        call it again after an exponential back-off, at most ``max_retries`` times and not after the deadline.
+        ``func`` must be safe to call several times, e.g. because its request has an idempotency key.
+        """
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except (OSError, ServerException) as e:
+                if not Client._is_transient(e) or not self._wait_before_retry(attempt, deadline, what, e):
+                    raise
+                attempt += 1
+
+    @staticmethod
+    def _is_transient(e):
+        """
+        Whether the given exception is a transient failure of a request, which can then be sent again:
+        the server could not be reached or did not answer in time, or a retryable #ServerException.
+        Local errors, e.g. a file that cannot be read, are not transient.
+        """
+        if isinstance(e, ServerException):
+            return e.is_retryable
+        if type(e) is OSError:
+            # none of the endpoints could be reached, see _with_failover()
+            e = getattr(e, '__cause__', None)
+        return isinstance(e, (requests_exceptions.ConnectionError, requests_exceptions.Timeout))
+
+    def _wait_before_retry(self, attempt, deadline, what, e):
+        """
+        Sleep for the exponential back-off before the given retry attempt (starting at 0)
+
+        :return: False if no more attempt should be made, because of ``max_retries`` or the deadline
+        :raises TimeoutError: if the deadline has passed
+        """
+        if attempt >= self.max_retries:
+            return False
+        delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.)
+        remaining = self._remaining(deadline, what)
+        if remaining is not None and remaining <= delay:
+            return False
+        _logger.debug('Transient failure while {}, trying again in {:.1f}s: {}'.format(what, delay, e))
+        time.sleep(delay)
+        return True
+
+    def _with_failover(self, func, endpoint=None, track=False):
+        """
+        Call ``func(endpoint)`` on the given endpoint, or on the endpoint with the least outstanding
+        requests if ``endpoint`` is None. In the latter case, if the endpoint cannot be reached,
+        it is marked as failed and ``func`` is called again on the next best endpoint.
+
+        :param track: whether to count this as an outstanding request on the endpoint.
+            If True, the caller must call :func:`_release` on the returned endpoint when the request is done.
+        :return: a tuple of the result of ``func`` and the endpoint on which it was called
+        :exception OSError: if no endpoint can be reached
+        """
+        tried = []
+        while True:
+            ep = endpoint if endpoint is not None else self._choose_endpoint(exclude=tried)
+            if track:
+                with self._lock:
+                    ep.outstanding += 1
+            try:
+                return func(ep), ep
+            except requests_exceptions.ConnectionError as e:
+                if track:
+                    self._release(ep)
+                self._mark_failed(ep)
+                tried.append(ep)
+                if endpoint is not None or len(tried) >= len(self._endpoints):
+                    # wrap this in the standard OSError to ease end-users
+                    future_utils.raise_from(OSError('{}'.format(e)), e)
+            except Exception:
+                if track:
+                    self._release(ep)
+                raise
+
+    def _release(self, endpoint):
+        """Mark one outstanding request on the given endpoint as done"""
+        with self._lock:
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+
+    def _choose_endpoint(self, exclude=()):
+        """
+        Return the healthy endpoint with the least outstanding requests, not in ``exclude``.
+        Endpoints that failed more than ``_HEALTH_CHECK_INTERVAL`` seconds ago are checked again.
+
+        :rtype: _Endpoint
+        """
+        candidates = [e for e in self._endpoints if e not in exclude]
+        if len(self._endpoints) == 1:
+            return self._endpoints[0]
+        require(len(candidates) > 0, 'No server left to try')
+
+        now = time.time()
+        for e in candidates:
+            if not e.healthy and now - e.last_failure >= _HEALTH_CHECK_INTERVAL:
+                self._check_health(e)
+
+        healthy = [e for e in candidates if e.healthy]
+        if not healthy:
+            # all of them failed recently, give them another chance rather than failing right away
+            healthy = [e for e in candidates if self._check_health(e)] or candidates
+        with self._lock:
+            return min(healthy, key=lambda e: e.outstanding)
+
+    def _mark_failed(self, endpoint):
+        with self._lock:
+            endpoint.healthy = False
+            endpoint.last_failure = time.time()
+
+    def _check_health(self, endpoint):
+        """
+        Check whether the given endpoint answers ``/version``, and connect to it if needed
+        :return: True if the endpoint is healthy
+        """
+        try:
+            if endpoint.connected:
+                r = endpoint.session.get('http://{}:{}/version'.format(endpoint.host, endpoint.port),
+                                         timeout=_HEALTH_CHECK_TIMEOUT)
+                healthy = r.status_code == requests.codes.ok
+            else:
+                self._connect(endpoint)
+                healthy = True
+        except (requests_exceptions.ConnectionError, requests_exceptions.Timeout, ValueError):
+            healthy = False
+
+        with self._lock:
+            endpoint.healthy = healthy
+            if not healthy:
+                endpoint.last_failure = time.time()
+        return healthy
+
+    def _connect(self, endpoint):
+        """
+        Connect to the given endpoint, with the cached tokens if there are some,
+        otherwise check the server version and log in
+        """
+        cached = self._token_cache.get(self._token_cache_key(endpoint)) if self._token_cache is not None else None
+        if cached is not None and cached.get('api') == self.api_version and cached.get('authorization'):
+            endpoint.set_tokens(cached.get('authorization'), cached.get('refreshToken'), cached.get('xsrfToken'))
+        else:
+            self._check_server_version(endpoint)
+            self._login(endpoint)
+        endpoint.connected = True
+        endpoint.healthy = True
+
+    def _token_cache_key(self, endpoint):
+        # the tokens of another password must not be used, but the password itself is not stored
+        password_digest = hashlib.sha256('{}:{}:{}'.format(endpoint, self.user_name, self._password).encode('utf-8'))
+        return '{}:{}:{}'.format(endpoint, self.user_name, password_digest.hexdigest())
+
+    def _login(self, endpoint):
+        """
+        Log in the given endpoint with the user name and password of this client, and save the tokens
+        """
+        r = endpoint.session.post(self._server_url('auth/login', endpoint),
+                                  data=json.dumps({'userName': self.user_name, 'passwordHash': self._password}))
+        endpoint.set_tokens(r.headers.get('Set-Authorization'), r.headers.get('Set-Refresh-Token'),
+                            r.cookies.get('XSRF-TOKEN'))
+        self._save_tokens(endpoint)
+
+    def _save_tokens(self, endpoint):
+        if self._token_cache is None:
+            return
+        headers = endpoint.session.headers
+        if headers.get('Authorization'):
+            self._token_cache.put(self._token_cache_key(endpoint),
+                                  {'api': self.api_version,
+                                   'authorization': headers.get('Authorization'),
+                                   'refreshToken': headers.get('Refresh-Token'),
+                                   'xsrfToken': headers.get('X-XSRF-TOKEN')})
+
+    def _send(self, endpoint, send):
+        """
+        Send a request to the given endpoint by calling ``send()``, which returns the response.
+        Tokens renewed by the server are kept for the next requests. If the request is rejected
+        because the tokens are no longer valid, log in again and re-send it once.
 
-    def _check_server_version(self):
+        :rtype: requests.Response
+        """
+        response = send()
+        if response.status_code == requests.codes.unauthorized:
+            self._login(endpoint)
+            response = send()
+
+        headers = endpoint.session.headers
+        authorization = response.headers.get('Set-Authorization')
+        if authorization and authorization != headers.get('Authorization'):
+            headers.update({'Authorization': authorization})
+            refresh_token = response.headers.get('Set-Refresh-Token')
+            if refresh_token:
+                headers.update({'Refresh-Token': refresh_token})
+            self._save_tokens(endpoint)
+        return response
+
+    def _lookup_upload(self, endpoint, digest, size, known_path=None, deadline=None):
+        """
+        Ask the server whether it already has a file of the given content hash and size,
+        possibly at ``known_path`` where it was uploaded before.
+
+        :return: a dict with 'path' and 'size' of the file on the server, or None if it is not there,
+            or the server does not support the lookup
+        """
+        if not endpoint.lookup_supported:
+            return None
+        what = 'looking up {}'.format(digest)
+        response = self._send_before(deadline, what, endpoint, lambda: endpoint.session.post(
+            self._server_url('storage/lookup', endpoint),
+            data=json.dumps({'sha256': digest, 'size': size, 'path': known_path}),
+            timeout=self._remaining(deadline, what)))
+
+        if response.status_code in (requests.codes.not_found, requests.codes.method_not_allowed):
+            # older servers, don't ask again
+            endpoint.lookup_supported = False
+            return None
+        if response.status_code != requests.codes.ok:
+            return None
+
+        result = response.json() or {}
+        if not result.get('path') or result.get('size', size) != size:
+            return None
+        return {'path': result['path'], 'size': result.get('size', size)}
+
+    def _check_server_version(self, endpoint):
         """
         Private helper to check if the server supports the given API version
         Raise ValueError if that is not the case.
         """
-        r = self.session.get('http://{}:{}/version'.format(self.host, self.port))
+        r = endpoint.session.get('http://{}:{}/version'.format(endpoint.host, endpoint.port))
         require(r.status_code == requests.codes.ok, 'Unable to query server API version: {}'.format(r.text))
         server_version = r.json()
         server_api_version = server_version.get('api', '')
         require(server_api_version == self.api_version,
                 'Mismatch API version: server={}, client={}'.format(server_api_version, self.api_version))
+
+
+def _copy_exception(e):
+    """A new exception of the same type and arguments as the given one, without its traceback"""
+    try:
+        return copy.copy(e)
+    except Exception:
+        return RuntimeError('{}: {}'.format(type(e).__name__, e))
+
+
+@six.python_2_unicode_compatible
+class _Endpoint(object):
+    """
+    One of the servers of a #Client, with its own HTTP session (holding its tokens)
+    and the number of requests from the client it is currently running
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+
+        self.connected = False
+        self.healthy = True
+        self.last_failure = 0
+        self.outstanding = 0
+        # whether the server supports looking up uploaded files by their content hash
+        self.lookup_supported = True
+
+    def __repr__(self):
+        return '{}({!r}, {!r})'.format(self.__class__.__name__, self.host, self.port)
+
+    def __str__(self):
+        return '{}:{}'.format(self.host, self.port)
+
+    def set_tokens(self, authorization, refresh_token, xsrf_token):
+        self.session.headers.update({'Authorization': authorization,
+                                     'Refresh-Token': refresh_token,
+                                     'X-XSRF-TOKEN': xsrf_token})
+        if xsrf_token is not None:
+            self.session.cookies.set('XSRF-TOKEN', xsrf_token)
+
+
+class _TransferProgress(object):
+    """
+    Progress of an upload or a download of one or several files, printed on stdout in interactive mode.
+    Can be updated from several threads.
+    """
+
+    def __init__(self, total_bytes, n_files=1, interactive=True, verb='Uploading'):
+        self._total_bytes = total_bytes
+        self._n_files = n_files
+        self._interactive = interactive
+        self._verb = verb
+        self._sent_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def sent_bytes(self):
+        return self._sent_bytes
+
+    def update(self, n_bytes):
+        """Record that ``n_bytes`` more bytes were transferred"""
+        with self._lock:
+            self._sent_bytes += n_bytes
+            if self._interactive:
+                pct = min(1., float(self._sent_bytes) / self._total_bytes) if self._total_bytes > 0 else 1.
+                label = self._verb if self._n_files == 1 else '{} {} files'.format(self._verb, self._n_files)
+                _print_progress_bar(label, pct)
+
+    def finish(self):
+        if self._interactive:
+            print('')
+
+
+class _JobProgressReporter(object):
+    """
+    Report the progress of a request running on the server to a callback,
+    and as a progress bar on stdout in interactive mode
+    """
+
+    def __init__(self, callback=None, interactive=True):
+        self._callback = callback
+        self._interactive = interactive
+        self._last = None
+
+    def update(self, progress):
+        """Report the given JobProgress, if it is different from the last one"""
+        if progress == self._last:
+            return
+        self._last = progress
+        if self._callback is not None:
+            self._callback(progress)
+        if self._interactive:
+            _print_progress_bar('Running', progress.fraction, details=progress)
+
+    def finish(self):
+        if self._interactive and self._last is not None:
+            print('')
+
+
+def _print_progress_bar(label, fraction, details=None, n=20):
+    """Print a progress bar on the current line of stdout. The bar is left empty if ``fraction`` is None"""
+    size = 0 if fraction is None else int(round(n * fraction))
+    line = '\r{}: {}{}'.format(label, '.' * size, ' ' * (max(0, n - size)))
+    if fraction is not None:
+        line += ' {:.0f}%'.format(fraction * 100)
+    if details:
+        line += ' ({})'.format(details)
+    print(line, end='')
@@ -224,7 +224,7 @@ class Column(object):
             raise ValueError('when() can only be applied on a Column previously generated by when() function')
         if self.expr.else_value is not None:
             raise ValueError('when() cannot be applied once otherwise() is applied')
-        return Column(exprs.CaseWhen(self.expr[:] + [(condition, lit(value).expr)]))
+        return Column(exprs.CaseWhen(list(self.expr.branches) + [(condition.expr, lit(value).expr)]))
 
     def otherwise(self, value):
         """
@@ -243,7 +243,7 @@ class Column(object):
             raise ValueError('otherwise() can only be applied on a Column previously generated by when() function')
         if self.expr.else_value is not None:
             raise ValueError('otherwise() can only be applied once on a Column previously generated by when()')
-        return Column(exprs.CaseWhen(self.expr[:], lit(value).expr))
+        return Column(exprs.CaseWhen(list(self.expr.branches), lit(value).expr))
 
     def between(self, lower_bound, upper_bound):
         """
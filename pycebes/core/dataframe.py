@@ -13,20 +13,75 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import enum
+import os
+import shutil
+import tempfile
 import types
+from collections import OrderedDict
+from contextlib import contextmanager
 
+import pandas as pd
 import six
 
 from pycebes.core import functions
-from pycebes.core.column import Column
+from pycebes.core.column import Column, lit
 from pycebes.core.expressions import SparkPrimitiveExpression, UnresolvedColumnName
 from pycebes.core.sample import DataSample
 from pycebes.core.schema import Schema, StorageTypes, VariableTypes
-from pycebes.internal.helpers import require
-from pycebes.internal.implicits import get_default_session
+from pycebes.internal import export
+from pycebes.internal.helpers import require, is_integer, is_positive_integer
+from pycebes.internal.implicits import get_default_session, get_session_stack
 from pycebes.internal.serializer import to_json
 
 
+@enum.unique
+class StorageLevels(enum.Enum):
+    """
+    Where the server keeps the Dataframes that are cached with #Dataframe.persist
+    """
+    MEMORY_ONLY = 'MEMORY_ONLY'
+    MEMORY_AND_DISK = 'MEMORY_AND_DISK'
+    MEMORY_ONLY_SER = 'MEMORY_ONLY_SER'
+    MEMORY_AND_DISK_SER = 'MEMORY_AND_DISK_SER'
+    DISK_ONLY = 'DISK_ONLY'
+
+    @classmethod
+    def from_str(cls, s):
+        v = next((e for e in cls.__members__.values() if e.value == s), None)
+        if v is None:
+            raise ValueError('Unknown storage level: {!r}'.format(s))
+        return v
+
+    def to_json(self):
+        """
+        Return the JSON representation of this storage level
+        """
+        return self.value
+
+
+def _default_tracker():
+    """The Dataframe tracker of the default session, None if there is no default session"""
+    session = get_session_stack().get_default()
+    return None if session is None else session.dataframe_tracker
+
+
+@contextmanager
+def _requesting(tracker=None):
+    """
+    Context of a request returning Dataframes, see :func:`DataframeTracker.requesting`
+
+    :param tracker: the tracker of the returned Dataframes. None means the tracker of the default session, if any
+    """
+    if tracker is None:
+        tracker = _default_tracker()
+    if tracker is None:
+        yield
+    else:
+        with tracker.requesting():
+            yield
+
+
 def _parse_column_names(df, *columns):
     """
     Parse the list of column names (as strings) or ``Column`` objects which belong to this Dataframe
@@ -79,11 +134,78 @@ def _parse_columns(df, *columns):
     return cols
 
 
+def _parse_sort_exprs(df, *args):
+    """
+    Parse the list of column names (as strings) or ``Column`` objects given to the sort functions.
+    Column names are sorted in ascending order, ``Column`` objects are kept as they are.
+
+    :param df: The ``Dataframe`` to be sorted
+    :type df: Dataframe
+    :return: the list of ``Column`` objects
+    """
+    cols = []
+    col_names = set(df.columns)
+    for c in args:
+        if isinstance(c, six.text_type):
+            require(c in col_names, 'Column not found: {}'.format(c))
+            cols.append(df[c].asc)
+        else:
+            require(isinstance(c, Column), 'Expect a column or a column name, got {!r}'.format(c))
+            cols.append(c)
+    return cols
+
+
+_NUMERIC_STORAGE_TYPES = (StorageTypes.SHORT, StorageTypes.INTEGER, StorageTypes.LONG,
+                          StorageTypes.FLOAT, StorageTypes.DOUBLE)
+
+# storage types that can be compared, hence have a min and a max
+_ORDERED_STORAGE_TYPES = _NUMERIC_STORAGE_TYPES + (StorageTypes.BOOLEAN, StorageTypes.STRING,
+                                                   StorageTypes.DATE, StorageTypes.TIMESTAMP)
+
+# statistics of #Dataframe.describe and #Dataframe.profile, in the order they are shown
+_DESCRIBE_STATS = ('count', 'nulls', 'distinct', 'mean', 'stddev', 'min', '25%', '50%', '75%', 'max')
+_PROFILE_STATS = _DESCRIBE_STATS + ('skewness', 'kurtosis', 'mean_length', 'max_length')
+_QUANTILE_STATS = ('25%', '50%', '75%')
+
+
+def _summary_exprs(col_name, storage_type, stats):
+    """
+    The aggregate expressions computing the given statistics of a column.
+    Statistics that do not apply to the type of the column are left out.
+
+    :return: list of tuples (stat names, Column), where the Column computes the value of the stat, or
+        an array with the values of all the stat names for quantiles
+    """
+    column = functions.col(col_name)
+    numeric = storage_type in _NUMERIC_STORAGE_TYPES
+    result = []
+    if 'count' in stats or 'nulls' in stats:
+        result.append((('count',), functions.count(column)))
+    if 'distinct' in stats and storage_type in StorageTypes.__atomic_types__ and storage_type != StorageTypes.VECTOR:
+        result.append((('distinct',), functions.approx_count_distinct(column)))
+    if storage_type in _ORDERED_STORAGE_TYPES:
+        result.extend(((s,), f(column)) for s, f in [('min', functions.min), ('max', functions.max)] if s in stats)
+    if numeric:
+        result.extend(((s,), f(column)) for s, f in [('mean', functions.avg), ('stddev', functions.stddev_samp),
+                                                     ('skewness', functions.skewness),
+                                                     ('kurtosis', functions.kurtosis)] if s in stats)
+        quantiles = tuple(s for s in _QUANTILE_STATS if s in stats)
+        if quantiles:
+            # one pass for all the quantiles of the column
+            result.append((quantiles, functions.percentile_approx(
+                column, [float(q[:-1]) / 100 for q in quantiles])))
+    if storage_type == StorageTypes.STRING:
+        result.extend(((s,), f(functions.length(column))) for s, f in [('mean_length', functions.avg),
+                                                                       ('max_length', functions.max)] if s in stats)
+    return result
+
+
 @six.python_2_unicode_compatible
 class Dataframe(object):
     """
     Representation of a Cebes Dataframe on the client side. All functions in this
     class result in remote call to the Cebes server to perform corresponding actions.
+    These calls can be bounded by a deadline with #Session.deadline.
 
     Users should **NOT** manually construct this class.
     """
@@ -114,22 +236,67 @@ class Dataframe(object):
 
         :rtype: Dataframe
         """
-        r = self._client.post_and_wait('df/{}'.format(cmd), kwargs)
-        return Dataframe.from_json(r)
+        self._record_use()
+        with _requesting():
+            r = self._client.post_and_wait('df/{}'.format(cmd), kwargs)
+            return Dataframe.from_json(r)
+
+    def _record_use(self):
+        """
+        Record that this Dataframe is the input of a command about to be sent to the server,
+        for the auto-persist policy of the default session, if any
+        """
+        session = get_default_session()
+        if session.auto_persist is not None:
+            session.auto_persist.record_use(self, session.client)
+
+    def _forget_auto_persisted(self, persisted):
+        """
+        Tell the auto-persist policy of the default session, if any, that this Dataframe is persisted
+        (``persisted=True``) or unpersisted explicitly. Explicitly persisted Dataframes are left out of the policy.
+        """
+        session = get_default_session()
+        if session.auto_persist is not None:
+            if persisted:
+                session.auto_persist.exclude(self.id)
+            else:
+                session.auto_persist.forget([self.id])
+
+    def _validate(self, columns, others=(), expect_boolean=False):
+        """
+        Validate the given columns against the schema of this Dataframe (and ``others``, if any)
+        before sending them to the server. No-op if validation is disabled in the default session.
+
+        :raise AnalysisException: if the columns are found to be invalid
+        """
+        if not get_default_session().validate:
+            return
+        from pycebes.core.analysis import validate_columns
+        validate_columns(columns, {df.id: df.schema for df in (self,) + tuple(others)},
+                         expect_boolean=expect_boolean)
 
     @classmethod
-    def from_json(cls, js_data):
+    def from_json(cls, js_data, tracker=None):
         """
         Return a ``Dataframe`` instance from its JSON representation
 
         # Arguments
         js_data (dict): a dict with ``id`` and ``schema``
+        tracker (DataframeTracker): the tracker of the session the Dataframe belongs to.
+            None means the tracker of the default session, if any
 
         # Returns
         Dataframe: the result Dataframe object
         """
         require('id' in js_data and 'schema' in js_data, 'Invalid Dataframe JSON: {!r}'.format(js_data))
-        return Dataframe(_id=js_data['id'], _schema=Schema.from_json(js_data['schema']))
+        df = Dataframe(_id=js_data['id'], _schema=Schema.from_json(js_data['schema']))
+
+        # so that the server can be told when it is not used anymore
+        if tracker is None:
+            tracker = _default_tracker()
+        if tracker is not None:
+            tracker.track(df)
+        return df
 
     """
     Public properties and Python magics
@@ -170,10 +337,27 @@ class Dataframe(object):
         """
         return self.schema.columns
 
+    @property
+    def write(self):
+        """
+        Interface to write this ``Dataframe`` to an external storage
+
+        # Returns
+        DataframeWriter: see #DataframeWriter for the supported formats and options
+
+        # Example
+        ```python
+        df.write.parquet('/data/sales', partition_by='year', compression='snappy')
+        ```
+        """
+        from pycebes.core.writer import DataframeWriter
+        return DataframeWriter(self)
+
     def __len__(self):
         """
         Number of rows in this ``Dataframe``
         """
+        self._record_use()
         return self._client.post_and_wait('df/count', data={'df': self.id})
 
     def __repr__(self):
@@ -235,6 +419,148 @@ class Dataframe(object):
         return self._df_command('withvariabletypes', df=self.id,
                                 variableTypes={col_name: variable_type.to_json()})
 
+    """
+    Caching functions
+    """
+
+    def persist(self, storage_level=StorageLevels.MEMORY_AND_DISK):
+        """
+        Ask the server to keep the content of this Dataframe once it is computed, so that the
+        following commands on it do not compute it again from the data source.
+        The cached Dataframes are listed by #Session.cached_dataframes.
+
+        # Arguments
+        storage_level (StorageLevels): where to keep the content:
+            in memory, in memory spilling to disk, serialized (smaller but slower to read), or on disk
+
+        # Returns
+        Dataframe: this Dataframe
+        """
+        require(isinstance(storage_level, StorageLevels),
+                'storage_level: expect a StorageLevels, got {!r}'.format(storage_level))
+        self._forget_auto_persisted(persisted=True)
+        self._client.post_and_wait('df/persist', {'df': self.id, 'storageLevel': storage_level.to_json()})
+        return self
+
+    def cache(self):
+        """
+        Same as #Dataframe.persist with the default storage level `MEMORY_AND_DISK`
+
+        # Returns
+        Dataframe: this Dataframe
+        """
+        return self.persist(StorageLevels.MEMORY_AND_DISK)
+
+    def unpersist(self):
+        """
+        Free the memory and disk used by this Dataframe on the server right away, without waiting for
+        it to be released by #Session.release_unused. It can still be used afterwards: the server
+        then computes it again from the Dataframes it was derived from.
+
+        # Returns
+        Dataframe: this Dataframe
+        """
+        self._forget_auto_persisted(persisted=False)
+        self._client.post_and_wait('df/unpersist', {'df': self.id})
+        return self
+
+    """
+    Partitioning functions
+    """
+
+    def repartition(self, n, *columns):
+        """
+        Returns a new ``Dataframe`` with exactly ``n`` partitions. This always shuffles the data.
+
+        When ``columns`` are given, the rows are hash-partitioned by those columns, so that rows with the
+        same values end up in the same partition. This is the usual fix when a join or an aggregation
+        is slowed down by a few skewed partitions.
+
+        # Arguments
+        n (int): number of partitions, must be positive
+        columns: column names or #Column objects to partition by
+
+        # Returns
+        Dataframe: the repartitioned ``Dataframe``
+
+        # Example
+        ```python
+        df2 = df.repartition(200, 'customer')
+        df2.partition_stats()
+        ```
+        """
+        require(is_positive_integer(n), 'n: expect a positive integer, got {!r}'.format(n))
+        cols = _parse_columns(self, *columns)
+        self._validate(cols)
+        return self._df_command('repartition', df=self.id, numPartitions=int(n), cols=[c.to_json() for c in cols])
+
+    def coalesce(self, n):
+        """
+        Returns a new ``Dataframe`` with at most ``n`` partitions, by merging the existing partitions
+        without shuffling the data. Useful before writing a small result, to avoid many tiny files.
+
+        # Arguments
+        n (int): number of partitions, must be positive. If it is larger than the current number of
+            partitions, the number of partitions does not change
+
+        # Returns
+        Dataframe: the coalesced ``Dataframe``
+        """
+        require(is_positive_integer(n), 'n: expect a positive integer, got {!r}'.format(n))
+        return self._df_command('coalesce', df=self.id, numPartitions=int(n))
+
+    def sort_within_partitions(self, *args):
+        """
+        Sort the rows inside each partition of this ``Dataframe``, without moving rows across partitions.
+        This is cheaper than #Dataframe.sort, which does a global sort.
+
+        # Arguments
+        args: same as in #Dataframe.sort
+
+        # Returns
+        Dataframe: a new ``Dataframe`` with each partition sorted
+
+        # Example
+        ```python
+        df2 = df.repartition(10, 'customer').sort_within_partitions('customer', df.timestamp.desc)
+        ```
+        """
+        cols = _parse_sort_exprs(self, *args)
+        self._validate(cols)
+        return self._df_command('sortwithinpartitions', df=self.id, cols=[c.to_json() for c in cols])
+
+    def partition_stats(self, max_partitions=10000):
+        """
+        Count the number of rows in each partition of this ``Dataframe``, to diagnose skew.
+
+        This computes the whole Dataframe, grouped by #functions.spark_partition_id.
+        Empty partitions do not appear in the result.
+
+        # Arguments
+        max_partitions (int): maximum number of partitions to return
+
+        # Returns
+        pd.DataFrame: with columns `partition_id` and `count`, sorted by `partition_id`
+
+        # Raises
+        ValueError: if there are more than `max_partitions` non-empty partitions, so that
+            the result is never silently truncated
+
+        # Example
+        ```python
+        stats = df.partition_stats()
+        stats['count'].max() / stats['count'].mean()
+        ```
+        """
+        require(max_partitions > 0, 'max_partitions must be positive, got {!r}'.format(max_partitions))
+        partition_id = functions.spark_partition_id().alias('partition_id')
+        counts = self.groupby(partition_id).count().sort('partition_id')
+        stats = counts.take(max_partitions + 1).to_pandas()
+        require(len(stats) <= max_partitions,
+                'This Dataframe has more than {} non-empty partitions. '
+                'Use a larger max_partitions'.format(max_partitions))
+        return stats
+
     """
     Sampling functions
     """
@@ -249,6 +575,7 @@ class Dataframe(object):
         # Returns
         DataSample: sample of maximum size `n`
         """
+        self._record_use()
         r = self._client.post_and_wait('df/take', {'df': self.id, 'n': n})
         return DataSample.from_json(r)
 
@@ -271,6 +598,74 @@ class Dataframe(object):
         return self._df_command('sample', df=self.id, fraction=prob,
                                 withReplacement=replacement, seed=seed)
 
+    def sample_n(self, n, seed=42):
+        """
+        Take a sample of exactly ``n`` rows from this ``Dataframe``, without replacement,
+        in one job on the server. If the Dataframe has fewer than ``n`` rows, all of them are taken.
+
+        # Arguments
+        n (int): number of rows of the sample
+        seed (int): random seed
+
+        # Returns
+        Dataframe: a sample of ``n`` rows
+        """
+        require(is_integer(n) and n >= 0, 'n: expect a non-negative integer, got {!r}'.format(n))
+        return self._df_command('samplen', df=self.id, n=int(n), seed=seed)
+
+    def sample_by(self, column, fractions, seed=42):
+        """
+        Take a stratified sample of this ``Dataframe``, without replacement, with a different
+        sampling probability for every value of the given column.
+
+        # Arguments
+        column: name of the column or a #Column object, defining the strata
+        fractions (dict): a dict of value -> probability to sample the rows having this value in ``column``.
+            The rows whose value is not in the dict are not sampled
+        seed (int): random seed
+
+        # Returns
+        Dataframe: a stratified sample
+
+        # Example
+        ```python
+        # half of the rows of each of those customers
+        df.sample_by('customer', {'TVGUIDE': 0.5, 'MODMAT': 0.5})
+        ```
+        """
+        col_name = _parse_column_names(self, column)[0]
+        require(isinstance(fractions, dict) and len(fractions) > 0,
+                'fractions: expect a non-empty dict of value -> probability, got {!r}'.format(fractions))
+        require(all(0 <= f <= 1 for f in fractions.values()),
+                'fractions: expect probabilities in [0, 1], got {!r}'.format(fractions))
+        return self._df_command('sampleby', df=self.id, colName=col_name, seed=seed,
+                                fractions=[{'value': to_json(v), 'fraction': float(f)} for v, f in fractions.items()])
+
+    def random_split(self, weights, seed=42):
+        """
+        Randomly split this ``Dataframe`` into several Dataframes, in one request to the server.
+        Every row ends up in exactly one of them, so they can be used for e.g. train/test splits.
+
+        # Arguments
+        weights (list): weights of the splits, normalized to sum up to 1
+        seed (int): random seed
+
+        # Returns
+        list: the Dataframes of the splits, in the same order as ``weights``
+
+        # Example
+        ```python
+        train_df, test_df = df.random_split([0.8, 0.2])
+        ```
+        """
+        weights = [float(w) for w in weights]
+        require(len(weights) > 0 and all(w >= 0 for w in weights) and sum(weights) > 0,
+                'weights: expect a non-empty list of non-negative weights, got {!r}'.format(weights))
+        self._record_use()
+        with _requesting():
+            r = self._client.post_and_wait('df/randomsplit', {'df': self.id, 'weights': weights, 'seed': seed})
+            return [Dataframe.from_json(d) for d in r['dataframes']]
+
     def show(self, n=5):
         """
         Convenient function to show basic information and sample rows from this Dataframe
@@ -297,6 +692,81 @@ class Dataframe(object):
         print('ID: {}\nShape: {}\nSample {} rows:\n{!r}'.format(
             self.id, self.shape, len(pandas_df), pandas_df))
 
+    """
+    Downloading functions
+    """
+
+    def to_pandas(self, max_memory_bytes=2 << 30, max_workers=4):
+        """
+        Download the whole ``Dataframe`` into a pandas DataFrame.
+
+        The server exports the Dataframe into one file per partition, in Parquet when pyarrow or
+        fastparquet is installed, in Json otherwise. The files are downloaded concurrently into a
+        temporary directory, decoded in parallel and concatenated in the order of the partitions.
+
+        The size of the Dataframe is estimated by the server first, so that Dataframes that would not fit
+        in ``max_memory_bytes`` are refused before anything is exported. Use #Dataframe.download to get
+        those on disk instead, or #Dataframe.take to get a few rows.
+
+        # Arguments
+        max_memory_bytes (int): maximum size of the result in memory, in bytes. None means no limit
+        max_workers (int): maximum number of files downloaded and decoded at the same time
+
+        # Returns
+        pd.DataFrame: all the rows of this Dataframe
+
+        # Raises
+        MemoryError: if the Dataframe is estimated, or found while decoding, to take more than ``max_memory_bytes``
+        """
+        self._record_use()
+        if max_memory_bytes is not None:
+            size = self._client.post_and_wait('df/estimatesize', {'df': self.id}).get('sizeInBytes')
+            if size is not None and size > max_memory_bytes:
+                raise MemoryError('Dataframe {} is estimated to take {} bytes, more than max_memory_bytes={}. '
+                                  'Download it to disk with Dataframe.download instead'.format(
+                                    self.id, size, max_memory_bytes))
+
+        tmp_dir = tempfile.mkdtemp(prefix='cebes')
+        try:
+            fmt = export.export_format()
+            paths = self._export(tmp_dir, fmt, max_workers)
+            return export.read_parts(paths, fmt, self.schema, max_memory_bytes=max_memory_bytes,
+                                     max_workers=max_workers)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def download(self, directory, fmt='parquet', max_workers=4):
+        """
+        Export this ``Dataframe`` on the server into one file per partition, and download the files
+        concurrently into the given local directory. Nothing is held in memory, so this works for
+        Dataframes of any size, as long as they fit on the local disk.
+
+        # Arguments
+        directory (str): path to an existing local directory
+        fmt (str): format of the files, `parquet` or `json` (one record per line)
+        max_workers (int): maximum number of files downloaded at the same time
+
+        # Returns
+        list: paths to the downloaded files, in the order of the partitions
+        """
+        require(os.path.isdir(directory), 'Not a directory: {}'.format(directory))
+        require(fmt in ('parquet', 'json'), 'Unsupported format: {}. Supported values are: parquet, json'.format(fmt))
+        self._record_use()
+        return self._export(directory, fmt, max_workers)
+
+    def _export(self, directory, fmt, max_workers):
+        """
+        Export this Dataframe on the server and download the files into the given directory,
+        without recording a use of it. See #Dataframe.download
+        """
+        parts = self._client.post_and_wait('df/export', {'df': self.id, 'format': fmt}).get('parts', [])
+
+        local_paths = [os.path.join(directory, 'part-{:05d}.{}'.format(i, fmt)) for i in range(len(parts))]
+        sizes = [p.get('size') for p in parts]
+        self._client.download_many([p['path'] for p in parts], local_paths, max_workers=max_workers,
+                                   total_bytes=None if None in sizes else sum(sizes))
+        return local_paths
+
     """
     SQL API
     """
@@ -336,6 +806,7 @@ class Dataframe(object):
         ```
         """
         columns = _parse_columns(self, *columns)
+        self._validate(columns)
         return self._df_command('select', df=self.id, cols=[col.to_json() for col in columns])
 
     def where(self, condition):
@@ -358,6 +829,7 @@ class Dataframe(object):
         ```
         """
         require(isinstance(condition, Column), 'condition: expect a Column object')
+        self._validate([condition], expect_boolean=True)
         return self._df_command('where', df=self.id, cols=[condition.to_json()])
 
     def limit(self, n=100):
@@ -385,6 +857,7 @@ class Dataframe(object):
             4  colorfulimage  2.5
         ```
         """
+        other._record_use()
         return self._df_command('intersect', df=self.id, otherDf=other.id)
 
     def union(self, other):
@@ -407,6 +880,7 @@ class Dataframe(object):
             4  ABBYPRESS  1.0
         ```
         """
+        other._record_use()
         return self._df_command('union', df=self.id, otherDf=other.id)
 
     def subtract(self, other):
@@ -429,6 +903,7 @@ class Dataframe(object):
             4  colorfulimage  2.5
         ```
         """
+        other._record_use()
         return self._df_command('except', df=self.id, otherDf=other.id)
 
     def join(self, other, expr, join_type='inner'):
@@ -455,7 +930,10 @@ class Dataframe(object):
         join_type = join_type.lower()
         require(join_type in join_types,
                 'Invalid join type: {}. Valid values are: {}'.format(join_type, ', '.join(join_types)))
+        require(isinstance(expr, Column), 'expr: expect a Column object')
+        self._validate([expr], others=[other], expect_boolean=True)
 
+        other._record_use()
         return self._df_command('join', leftDf=self.id, rightDf=other.id,
                                 joinExprs=expr.to_json(), joinType=join_type)
 
@@ -481,6 +959,8 @@ class Dataframe(object):
         col_name (str): new column name
         col (Column): ``Column`` object describing the new column
         """
+        require(isinstance(col, Column), 'col: expect a Column object')
+        self._validate([col])
         return self._df_command('withcolumn', df=self.id, colName=col_name, col=col.to_json())
 
     def with_column_renamed(self, existing_name, new_name):
@@ -661,17 +1141,9 @@ class Dataframe(object):
         df1.sort('non_exist')
         ```
         """
-        cols = []
-        col_names = set(self.columns)
-        for c in args:
-            if isinstance(c, six.text_type):
-                require(c in col_names, 'Column not found: {}'.format(c))
-                cols.append(self[c].asc.to_json())
-            else:
-                require(isinstance(c, Column), 'Expect a column or a column name, got {!r}'.format(c))
-                cols.append(c.to_json())
-
-        return self._df_command('sort', df=self.id, cols=cols)
+        cols = _parse_sort_exprs(self, *args)
+        self._validate(cols)
+        return self._df_command('sort', df=self.id, cols=[c.to_json() for c in cols])
 
     def drop(self, *columns):
         """
@@ -810,6 +1282,202 @@ class Dataframe(object):
             return self._df_command('fillnawithmap', df=self.id, valueMap=to_json(value))
         raise ValueError('Unsupported value: {!r}'.format(value))
 
+    def describe(self, columns=None, stats=None):
+        """
+        Compute summary statistics of the given columns, in a single pass over the data.
+
+        The available statistics are `count` (number of non-null values), `nulls`, `distinct`
+        (approximate number of distinct values), `mean`, `stddev` (sample standard deviation), `min`,
+        `25%`, `50%`, `75%` (approximate quantiles) and `max`. Statistics that do not apply to the type
+        of a column (e.g. `mean` of a string column) are left empty.
+
+        # Arguments
+        columns (list): names of the columns or #Column objects to describe. None means all columns
+        stats (list): names of the statistics to compute. None means all of them
+
+        # Returns
+        pd.DataFrame: one row per statistic, one column per column of this Dataframe
+
+        # Example
+        ```python
+        df.describe(['wax', 'customer'], stats=['count', 'nulls', 'mean', 'max'])
+                     wax   customer
+            count  537.0        540
+            nulls    3.0          0
+            mean   2.412       None
+            max    3.1    woolworth
+        ```
+        """
+        stats = _DESCRIBE_STATS if stats is None else list(stats)
+        summary = self._summarize(columns, stats)
+        del summary[None]
+        return pd.DataFrame({name: [values.get(s) for s in stats] for name, values in summary.items()},
+                            index=stats, columns=list(summary.keys()))
+
+    def profile(self, columns=None):
+        """
+        Profile the given columns, in a single pass over the data.
+
+        In addition to the statistics of #Dataframe.describe, the profile has the storage and variable types
+        of the columns, the fraction of null values, the `skewness` and `kurtosis` of numeric columns,
+        and the `mean_length` and `max_length` of string columns.
+
+        # Arguments
+        columns (list): names of the columns or #Column objects to profile. None means all columns
+
+        # Returns
+        pd.DataFrame: one row per column of this Dataframe, one column per statistic
+        """
+        summary = self._summarize(columns, _PROFILE_STATS)
+        n_rows = summary.pop(None, {}).get('rows')
+        rows = []
+        for name, values in summary.items():
+            field = self.schema[name]
+            row = [field.storage_type.name, field.variable_type.name]
+            null_fraction = None
+            if n_rows:
+                null_fraction = float(values['nulls']) / n_rows
+            row.extend([values.get(s) for s in _PROFILE_STATS[:2]] + [null_fraction] +
+                       [values.get(s) for s in _PROFILE_STATS[2:]])
+            rows.append(row)
+        return pd.DataFrame(rows, index=list(summary.keys()),
+                            columns=['storage_type', 'variable_type'] + list(_PROFILE_STATS[:2]) +
+                            ['null_fraction'] + list(_PROFILE_STATS[2:]))
+
+    def approx_quantile(self, columns, probabilities=(0.25, 0.5, 0.75), relative_error=0.01):
+        """
+        Compute approximate quantiles of numeric columns, in one distributed pass on the server.
+
+        The result is guaranteed to be within ``relative_error * len(df)`` ranks of the exact quantiles
+        (Greenwald-Khanna). Null and NaN values are ignored.
+
+        # Arguments
+        columns (list): names of the numeric columns or #Column objects, or a single one of them
+        probabilities (list): the quantile probabilities, each of them in [0, 1],
+            e.g. 0 is the minimum, 0.5 the median and 1 the maximum
+        relative_error (float): the target relative precision, at least 0. The lower, the more accurate
+            but also the more expensive. 0 computes the exact quantiles, which can be very expensive.
+
+        # Returns
+        pd.DataFrame: one row per probability, one column per column
+
+        # Example
+        ```python
+        df.approx_quantile(['wax', 'hardener'], [0.5, 0.9, 0.99])
+                 wax  hardener
+            0.50  2.4       1.0
+            0.90  3.0       1.5
+            0.99  3.1       2.5
+        ```
+        """
+        col_names = self._numeric_column_names(columns)
+        probabilities = [float(p) for p in probabilities]
+        require(len(probabilities) > 0 and all(0 <= p <= 1 for p in probabilities),
+                'probabilities: expect a non-empty list of numbers in [0, 1], got {!r}'.format(probabilities))
+        require(relative_error >= 0, 'relative_error must be at least 0, got {!r}'.format(relative_error))
+
+        self._record_use()
+        r = self._client.post_and_wait('df/approxquantile', {'df': self.id, 'colNames': col_names,
+                                                             'probabilities': probabilities,
+                                                             'relativeError': float(relative_error)})
+        return pd.DataFrame({name: values for name, values in zip(col_names, r['quantiles'])},
+                            index=probabilities, columns=col_names)
+
+    def histogram(self, column, bins=10):
+        """
+        Compute the histogram of a numeric column, in one distributed pass on the server.
+        Null and NaN values are ignored.
+
+        # Arguments
+        column (str): name of the numeric column or a #Column object
+        bins (int, list): either the number of bins of equal width between the minimum and the maximum
+            of the column, or the list of bin edges, in increasing order. All the bins are half-open,
+            e.g. `[1, 2)`, except the last one which also includes its upper edge.
+            Values outside of the given edges are not counted.
+
+        # Returns
+        pd.DataFrame: one row per bin, with columns `lower`, `upper` and `count`
+
+        # Example
+        ```python
+        df.histogram('wax', bins=[0, 1, 2, 3, 4])
+               lower  upper  count
+            0    0.0    1.0      5
+            1    1.0    2.0    140
+            2    2.0    3.0    361
+            3    3.0    4.0     31
+        ```
+        """
+        col_name = self._numeric_column_names([column])[0]
+        data = {'df': self.id, 'colName': col_name}
+        if is_integer(bins):
+            require(bins > 0, 'bins: expect a positive number of bins, got {!r}'.format(bins))
+            data['numBins'] = int(bins)
+        else:
+            edges = [float(b) for b in bins]
+            require(len(edges) >= 2 and all(a < b for a, b in zip(edges, edges[1:])),
+                    'bins: expect at least 2 edges in increasing order, got {!r}'.format(bins))
+            data['binEdges'] = edges
+
+        self._record_use()
+        r = self._client.post_and_wait('df/histogram', data)
+        edges, counts = r['binEdges'], r['counts']
+        return pd.DataFrame({'lower': edges[:-1], 'upper': edges[1:], 'count': counts},
+                            columns=['lower', 'upper', 'count'])
+
+    def _numeric_column_names(self, columns):
+        """
+        Parse the given column names or #Column objects, which must be numeric columns of this Dataframe
+
+        :return: the list of column names
+        """
+        if isinstance(columns, (six.text_type, Column)):
+            columns = [columns]
+        col_names = _parse_column_names(self, *columns)
+        require(len(col_names) > 0, 'Expect at least one column')
+        for name in col_names:
+            storage_type = self.schema[name].storage_type
+            require(storage_type in _NUMERIC_STORAGE_TYPES,
+                    'Column {} must be numeric, got {}'.format(name, storage_type.name))
+        return col_names
+
+    def _summarize(self, columns, stats):
+        """
+        Compute the given statistics of the given columns with a single aggregation
+
+        :return: an OrderedDict of column name -> dict of stat name -> value. The total number of rows
+            is under the key None, as ``{'rows': n}``
+        """
+        unknown = [s for s in stats if s not in _PROFILE_STATS]
+        require(not unknown, 'Unknown statistics: {}. Supported values are: {}'.format(
+            ', '.join(unknown), ', '.join(_PROFILE_STATS)))
+        col_names = _parse_column_names(self, *(self.columns if columns is None else columns))
+        require(len(col_names) > 0, 'Expect at least one column')
+
+        targets = [(None, ('rows',))]
+        agg_exprs = [functions.count(lit(1)).alias('_s0')]
+        for name in col_names:
+            for stat_names, expr in _summary_exprs(name, self.schema[name].storage_type, stats):
+                targets.append((name, stat_names))
+                agg_exprs.append(expr.alias('_s{}'.format(len(agg_exprs))))
+
+        sample = self.agg(*agg_exprs).take(1)
+        summary = OrderedDict([(None, {})] + [(name, {}) for name in col_names])
+        for (name, stat_names), values in zip(targets, sample.data):
+            value = values[0] if values else None
+            if stat_names[0] in _QUANTILE_STATS:
+                # all the quantiles of the column, in an array
+                for stat, v in zip(stat_names, value or [None] * len(stat_names)):
+                    summary[name][stat] = v
+            else:
+                summary[name][stat_names[0]] = value
+
+        n_rows = summary[None].get('rows') or 0
+        for name in col_names:
+            if 'count' in summary[name]:
+                summary[name]['nulls'] = n_rows - (summary[name]['count'] or 0)
+        return summary
+
 
 @six.python_2_unicode_compatible
 class GroupedDataframe(object):
@@ -849,6 +1517,7 @@ class GroupedDataframe(object):
 
     def _send_request(self, generic_agg_exprs=None, agg_func=None, agg_col_names=None):
         client = get_default_session().client
+        self.df._record_use()
 
         data = {
             'df': self.df.id,
@@ -868,7 +1537,8 @@ class GroupedDataframe(object):
         if agg_col_names is not None:
             data['aggColNames'] = _parse_column_names(self.df, *agg_col_names)
 
-        return Dataframe.from_json(client.post_and_wait('df/aggregate', data))
+        with _requesting():
+            return Dataframe.from_json(client.post_and_wait('df/aggregate', data))
 
     def agg(self, *exprs):
         """
@@ -924,6 +1594,7 @@ class GroupedDataframe(object):
                 require(isinstance(expr, Column), 'Expected a Column expression, got {!r}'.format(expr))
                 agg_cols.append(expr)
 
+        self.df._validate(list(self.agg_columns) + agg_cols)
         return self._send_request(generic_agg_exprs=agg_cols)
 
     def count(self):
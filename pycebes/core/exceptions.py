@@ -19,8 +19,33 @@ class ServerException(Exception):
     Exception happened on the server, got catched and returned to the client
     """
 
-    def __init__(self, message='', server_stack_trace='', request_uri='', request_entity=None):
+    # markers of failures that are likely to go away if the request is sent again
+    _TRANSIENT_MARKERS = ('FetchFailedException', 'ExecutorLostFailure', 'TimeoutException',
+                          'SocketTimeoutException', 'ConnectException', 'Connection reset',
+                          'Service Unavailable')
+
+    def __init__(self, message='', server_stack_trace='', request_uri='', request_entity=None, retryable=None):
         super(ServerException, self).__init__(message, server_stack_trace, request_uri, request_entity)
         self.server_stack_trace = server_stack_trace
         self.request_uri = request_uri
         self.request_entity = request_entity
+        self._retryable = retryable
+
+    @property
+    def is_retryable(self):
+        """
+        Whether the request is likely to succeed if it is sent again, e.g. when the server was overloaded
+        or a Spark executor was lost, as opposed to errors in the request itself
+        """
+        if self._retryable is not None:
+            return self._retryable
+        text = '{} {}'.format(self.args[0] if self.args else '', self.server_stack_trace or '')
+        return any(m in text for m in ServerException._TRANSIENT_MARKERS)
+
+
+class AnalysisException(ValueError):
+    """
+    Exception raised on the client when an expression or a command is found to be invalid
+    against the known schemas, before any request is sent to the server
+    """
+    pass
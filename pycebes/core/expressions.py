@@ -93,6 +93,21 @@ class Expression(object):
     def __str__(self):
         return super(Expression, self).__str__()
 
+    def child_expressions(self):
+        """
+        Return the list of Expressions given as parameters to this expression,
+        including those nested in lists or tuples (e.g. ``children`` or the branches of ``CaseWhen``)
+        """
+
+        def _collect(value):
+            if isinstance(value, Expression):
+                return [value]
+            if isinstance(value, (list, tuple)):
+                return [ex for v in value for ex in _collect(v)]
+            return []
+
+        return [ex for pc in self._get_params() for ex in _collect(getattr(self, pc.name, None))]
+
     @staticmethod
     def _param_to_json(pc, value):
         """
@@ -262,6 +277,13 @@ class Min(_UnaryExpression):
         super(Min, self).__init__(child=child)
 
 
+@param('percentage')
+@param('accuracy', param_type='int')
+class ApproximatePercentile(_UnaryExpression):
+    def __init__(self, child, percentage, accuracy=10000):
+        super(ApproximatePercentile, self).__init__(child=child, percentage=percentage, accuracy=accuracy)
+
+
 class Skewness(_UnaryExpression):
     def __init__(self, child):
         super(Skewness, self).__init__(child=child)
@@ -17,6 +17,7 @@ import six
 import random
 import pycebes.core.expressions as exprs
 from pycebes.core.column import Column, lit
+from pycebes.internal.helpers import require, is_positive_integer
 
 
 """
@@ -202,6 +203,31 @@ def min(column):
     return _with_expr(exprs.Min, column)
 
 
+def percentile_approx(column, percentage, accuracy=10000):
+    """
+    Returns the approximate percentile(s) of the numeric values in a group,
+    computed in the same pass as the other aggregations.
+
+    # Arguments:
+    column (Column): the column to compute
+    percentage: a number in [0, 1], or a list of them. With a list, the result is an array
+        with one percentile per number
+    accuracy (int): the higher, the more accurate but also the more memory it takes.
+        The relative error of the result is ``1.0 / accuracy`` (default = 10000)
+    """
+    if isinstance(percentage, (list, tuple)):
+        percentages = [float(p) for p in percentage]
+        require(len(percentages) > 0, 'percentage: expect at least one number')
+        percentage_expr = exprs.CreateArray([lit(p).expr for p in percentages])
+    else:
+        percentages = [float(percentage)]
+        percentage_expr = lit(percentages[0]).expr
+    require(all(0 <= p <= 1 for p in percentages),
+            'percentage: expect numbers in [0, 1], got {!r}'.format(percentage))
+    require(is_positive_integer(accuracy), 'accuracy: expect a positive integer, got {!r}'.format(accuracy))
+    return _with_expr(exprs.ApproximatePercentile, column, percentage_expr, int(accuracy))
+
+
 def skewness(column):
     """
     Returns the kurtosis of the values in a group
@@ -0,0 +1,807 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import datetime
+
+import six
+
+import pycebes.core.expressions as exprs
+from pycebes.core.column import Column
+from pycebes.core.exceptions import AnalysisException
+from pycebes.core.schema import Schema, SchemaField, StorageType, StorageTypes, VariableTypes, \
+    ArrayType, MapType, StructType, StructField, default_variable_type
+
+"""
+Client-side type inference for #Column expressions.
+
+Given the #Schema of the input Dataframe, the functions in this module compute the name,
+storage type and variable type of the column(s) produced by an expression, without
+contacting the server. Typing rules follow Spark SQL, while column names are generated
+the same way Spark does on a best-effort basis.
+"""
+
+# Type of `lit(None)`. Only used internally, it is exposed as STRING in the results
+_NULL = StorageType('null', type(None), name='NULL')
+
+_NUMERIC_TYPES = [StorageTypes.SHORT, StorageTypes.INTEGER, StorageTypes.LONG,
+                  StorageTypes.FLOAT, StorageTypes.DOUBLE]
+_INTEGRAL_TYPES = _NUMERIC_TYPES[:3]
+_DATETIME_TYPES = [StorageTypes.DATE, StorageTypes.TIMESTAMP]
+
+_SQL_TYPE_NAMES = {StorageTypes.SHORT: 'SMALLINT', StorageTypes.INTEGER: 'INT', StorageTypes.LONG: 'BIGINT'}
+
+_RULES = {}
+
+
+def _rule(*expr_classes):
+    """
+    Decorator registering the decorated function as the inference rule of the given expression classes.
+    The function takes the expression and the input Schema, and returns a list of #SchemaField
+    """
+
+    def decorate(func):
+        for clz in expr_classes:
+            assert clz not in _RULES, 'Duplicated inference rule for {}'.format(clz.__name__)
+            _RULES[clz] = func
+        return func
+
+    return decorate
+
+
+def infer_fields(column, schema):
+    """
+    Infer the list of fields produced by the given column, when it is evaluated on a Dataframe
+    of the given schema. Most expressions produce exactly one field, but some (e.g. ``explode()``
+    on a map, or ``*``) produce several of them.
+
+    # Arguments
+    column (Column): the column (or the expression) to be inferred
+    schema (Schema): schema of the input Dataframe
+
+    # Returns
+    list: list of #SchemaField
+
+    # Raises
+    AnalysisException: if the expression is invalid against the schema, e.g. a column is not found
+    NotImplementedError: if the expression cannot be inferred on the client, e.g. a raw SQL expression
+    """
+    return [_finalize(f) for f in _infer(column, schema)]
+
+
+def infer_field(column, schema):
+    """
+    Infer the field produced by the given column, when it is evaluated on a Dataframe of the given schema.
+    See #infer_fields for more information.
+
+    # Returns
+    SchemaField: the inferred field
+
+    # Raises
+    AnalysisException: if the expression is invalid, or does not produce exactly one field
+    """
+    fields = infer_fields(column, schema)
+    if len(fields) != 1:
+        raise AnalysisException('Expected an expression producing exactly one column, '
+                                'got {} columns for {!r}'.format(len(fields), column))
+    return fields[0]
+
+
+def infer_schema(columns, schema):
+    """
+    Infer the schema of the result of a ``select`` of the given columns on a Dataframe of the given schema
+
+    # Arguments
+    columns (list): list of #Column
+    schema (Schema): schema of the input Dataframe
+
+    # Returns
+    Schema: the schema of the result
+    """
+    fields = []
+    for c in columns:
+        fields.extend(infer_fields(c, schema))
+    return Schema(fields=fields)
+
+
+"""
+Private helpers
+"""
+
+
+def _finalize(field):
+    if field.storage_type == _NULL:
+        return SchemaField(name=field.name, storage_type=StorageTypes.STRING, variable_type=VariableTypes.TEXT)
+    return field
+
+
+def _infer(column, schema):
+    """Infer the list of fields, without finalizing the NULL type"""
+    expr = column.expr if isinstance(column, Column) else column
+    if not isinstance(expr, exprs.Expression):
+        raise ValueError('Expected a Column or an Expression, got {!r}'.format(column))
+    rule = _RULES.get(type(expr))
+    if rule is None:
+        raise NotImplementedError('Type inference is not supported for {}'.format(type(expr).__name__))
+    return rule(expr, schema)
+
+
+def _infer_one(expr, schema):
+    fields = _infer(expr, schema)
+    if len(fields) != 1:
+        raise AnalysisException('Expected an expression producing exactly one column, '
+                                'got {} columns for {!r}'.format(len(fields), expr))
+    return fields[0]
+
+
+def _field(name, storage_type, variable_type=None):
+    if variable_type is None:
+        variable_type = default_variable_type(storage_type)
+    return [SchemaField(name=name, storage_type=storage_type, variable_type=variable_type)]
+
+
+def _sql_type_name(storage_type):
+    return _SQL_TYPE_NAMES.get(storage_type, storage_type.cebes_type.upper())
+
+
+def _literal_type(value):
+    if value is None:
+        return _NULL
+    if isinstance(value, bool):
+        return StorageTypes.BOOLEAN
+    if isinstance(value, six.integer_types):
+        return StorageTypes.INTEGER if -2 ** 31 <= value < 2 ** 31 else StorageTypes.LONG
+    if isinstance(value, float):
+        # python floats are sent as 'float' by the serializer
+        return StorageTypes.FLOAT
+    if isinstance(value, six.text_type):
+        return StorageTypes.STRING
+    if isinstance(value, datetime.datetime):
+        return StorageTypes.TIMESTAMP
+    if isinstance(value, datetime.date):
+        return StorageTypes.DATE
+    if isinstance(value, (bytearray, six.binary_type)):
+        return StorageTypes.BINARY
+    raise NotImplementedError('Type inference is not supported for literal {!r}'.format(value))
+
+
+def _literal_name(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return '{}'.format(value)
+
+
+def _find_field(fields, name):
+    """Find the field of the given name, case-insensitively as Spark does by default"""
+    f = next((f for f in fields if f.name == name), None)
+    if f is None:
+        f = next((f for f in fields if f.name.lower() == name.lower()), None)
+    return f
+
+
+def _resolve_column(schema, col_name):
+    """
+    Resolve the given column name against the schema. The name can be qualified
+    by a Dataframe alias (``alias.column``), or refer to a field of a struct column (``column.field``)
+    """
+    if col_name == '*' or col_name.endswith('.*'):
+        return [SchemaField(name=f.name, storage_type=f.storage_type, variable_type=f.variable_type)
+                for f in schema.fields]
+
+    f = _find_field(schema.fields, col_name)
+    if f is not None:
+        return [SchemaField(name=f.name, storage_type=f.storage_type, variable_type=f.variable_type)]
+
+    parts = col_name.split('.')
+    for start in range(min(2, len(parts))):
+        f = _find_field(schema.fields, parts[start])
+        if f is None:
+            continue
+        storage_type = f.storage_type
+        for field_name in parts[start + 1:]:
+            struct_field = None
+            if isinstance(storage_type, StructType):
+                struct_field = next((sf for sf in storage_type.fields if sf.name == field_name), None)
+            if struct_field is None:
+                storage_type = None
+                break
+            storage_type = struct_field.storage_type
+        if storage_type is not None:
+            variable_type = f.variable_type if start == len(parts) - 1 else None
+            return _field(parts[-1], storage_type, variable_type)
+
+    raise AnalysisException('Column not found: {!r}. Available columns are: {}'.format(
+        col_name, ', '.join(schema.columns)))
+
+
+def _is_numeric(storage_type):
+    return storage_type in _NUMERIC_TYPES
+
+
+def _wider_type(left, right):
+    """Return the wider of two numeric types"""
+    return _NUMERIC_TYPES[max(_NUMERIC_TYPES.index(left), _NUMERIC_TYPES.index(right))]
+
+
+def _numeric_operand(expr, field, op_name):
+    """Return the numeric type used when the given field is an operand of a numeric operator"""
+    t = field.storage_type
+    if t == _NULL or _is_numeric(t):
+        return t
+    if t == StorageTypes.STRING:
+        # strings are implicitly casted into double
+        return StorageTypes.DOUBLE
+    raise AnalysisException('{} requires a numeric argument, got {} of type {} in {!r}'.format(
+        op_name, field.name, t.name, expr))
+
+
+def _common_type(expr, types):
+    """Return the type that all the given types can be coerced to, following Spark's rules"""
+    types = [t for t in types if t != _NULL]
+    if len(types) == 0:
+        return _NULL
+    if all(t == types[0] for t in types):
+        return types[0]
+    if all(_is_numeric(t) for t in types):
+        result = types[0]
+        for t in types[1:]:
+            result = _wider_type(result, t)
+        return result
+    if all(_is_numeric(t) or t in (StorageTypes.STRING, StorageTypes.BOOLEAN) or t in _DATETIME_TYPES
+           for t in types):
+        return StorageTypes.STRING
+    raise AnalysisException('Incompatible types {} in {!r}'.format(', '.join(t.name for t in types), expr))
+
+
+def _ordered_params(expr):
+    """Parameters of the given expression in their declaration order, those of the parent classes first"""
+    params = []
+    for clz in reversed(type(expr).__mro__):
+        # the @param decorators are applied bottom-up, hence the reversed order in PARAMS
+        params.extend(reversed(expr.PARAMS.get(clz.__name__, [])))
+    return params
+
+
+def _function_name(expr, schema, name=None):
+    """Name of a function call, e.g. ``max(col)``, following Spark's convention"""
+    args = []
+    for pc in _ordered_params(expr):
+        value = getattr(expr, pc.name, None)
+        if isinstance(value, exprs.Expression):
+            args.append(_infer_one(value, schema).name)
+        elif isinstance(value, (list, tuple)):
+            args.extend(_infer_one(v, schema).name for v in value if isinstance(v, exprs.Expression))
+        elif value is not None:
+            args.append(_literal_name(value))
+    return '{}({})'.format(name or _FUNCTION_NAMES.get(type(expr), type(expr).__name__.lower()), ', '.join(args))
+
+
+_FUNCTION_NAMES = {
+    exprs.ApproxCountDistinct: 'approx_count_distinct',
+    exprs.ApproximatePercentile: 'percentile_approx',
+    exprs.Average: 'avg',
+    exprs.CollectList: 'collect_list',
+    exprs.CollectSet: 'collect_set',
+    exprs.CovPopulation: 'covar_pop',
+    exprs.CovSample: 'covar_samp',
+    exprs.GroupingID: 'grouping_id',
+    exprs.StddevSamp: 'stddev_samp',
+    exprs.StddevPop: 'stddev_pop',
+    exprs.VarianceSamp: 'var_samp',
+    exprs.VariancePop: 'var_pop',
+    exprs.Logarithm: 'log',
+    exprs.BRound: 'bround',
+    exprs.ShiftLeft: 'shiftleft',
+    exprs.ShiftRight: 'shiftright',
+    exprs.ShiftRightUnsigned: 'shiftrightunsigned',
+    exprs.ToDegrees: 'degrees',
+    exprs.ToRadians: 'radians',
+    exprs.ArrayContains: 'array_contains',
+    exprs.GetJsonObject: 'get_json_object',
+    exprs.JsonTuple: 'json_tuple',
+    exprs.SortArray: 'sort_array',
+    exprs.CreateArray: 'array',
+    exprs.CreateMap: 'map',
+    exprs.CreateStruct: 'struct',
+    exprs.AddMonths: 'add_months',
+    exprs.CurrentDate: 'current_date',
+    exprs.CurrentTimestamp: 'current_timestamp',
+    exprs.DateFormatClass: 'date_format',
+    exprs.DateAdd: 'date_add',
+    exprs.DateSub: 'date_sub',
+    exprs.LastDay: 'last_day',
+    exprs.MonthsBetween: 'months_between',
+    exprs.NextDay: 'next_day',
+    exprs.FromUnixTime: 'from_unixtime',
+    exprs.UnixTimestamp: 'unix_timestamp',
+    exprs.ToDate: 'to_date',
+    exprs.TruncDate: 'trunc',
+    exprs.FromUTCTimestamp: 'from_utc_timestamp',
+    exprs.ToUTCTimestamp: 'to_utc_timestamp',
+    exprs.TimeWindow: 'window',
+    exprs.Murmur3Hash: 'hash',
+    exprs.InputFileName: 'input_file_name',
+    exprs.MonotonicallyIncreasingID: 'monotonically_increasing_id',
+    exprs.SparkPartitionID: 'spark_partition_id',
+    exprs.IsNaN: 'isnan',
+    exprs.ConcatWs: 'concat_ws',
+    exprs.FormatNumber: 'format_number',
+    exprs.FormatString: 'format_string',
+    exprs.StringInstr: 'instr',
+    exprs.StringLocate: 'locate',
+    exprs.StringLPad: 'lpad',
+    exprs.StringRPad: 'rpad',
+    exprs.StringTrimLeft: 'ltrim',
+    exprs.StringTrimRight: 'rtrim',
+    exprs.StringTrim: 'trim',
+    exprs.RegExpExtract: 'regexp_extract',
+    exprs.RegExpReplace: 'regexp_replace',
+    exprs.StringRepeat: 'repeat',
+    exprs.StringReverse: 'reverse',
+    exprs.StringSplit: 'split',
+    exprs.StringTranslate: 'translate',
+    exprs.SubstringIndex: 'substring_index',
+    exprs.UnBase64: 'unbase64',
+    exprs.EndsWith: 'endswith',
+    exprs.StartsWith: 'startswith',
+}
+
+_BINARY_OPERATORS = {
+    exprs.Add: '+', exprs.Subtract: '-', exprs.Multiply: '*', exprs.Divide: '/', exprs.Remainder: '%',
+    exprs.EqualTo: '=', exprs.EqualNullSafe: '<=>', exprs.GreaterThan: '>', exprs.LessThan: '<',
+    exprs.GreaterThanOrEqual: '>=', exprs.LessThanOrEqual: '<=', exprs.And: 'AND', exprs.Or: 'OR',
+    exprs.BitwiseAnd: '&', exprs.BitwiseOr: '|', exprs.BitwiseXor: '^',
+}
+
+
+def _operator_name(expr, schema):
+    return '({} {} {})'.format(_infer_one(expr.left, schema).name, _BINARY_OPERATORS[type(expr)],
+                               _infer_one(expr.right, schema).name)
+
+
+"""
+Inference rules
+"""
+
+
+@_rule(exprs.UnresolvedColumnName, exprs.SparkPrimitiveExpression)
+def _column_ref(expr, schema):
+    return _resolve_column(schema, expr.col_name)
+
+
+@_rule(exprs.Literal)
+def _literal(expr, schema):
+    value = expr.value
+    if isinstance(value, StorageType):
+        raise AnalysisException('Storage types can only be used in cast(), got {!r}'.format(expr))
+    return _field(_literal_name(value), _literal_type(value))
+
+
+@_rule(exprs.Alias)
+def _alias(expr, schema):
+    f = _infer_one(expr.child, schema)
+    return _field(expr.alias, f.storage_type, f.variable_type)
+
+
+@_rule(exprs.MultiAlias)
+def _multi_alias(expr, schema):
+    fields = _infer(expr.child, schema)
+    if len(fields) != len(expr.aliases):
+        raise AnalysisException('Number of aliases ({}) does not match the number of columns ({}) in {!r}'.format(
+            len(expr.aliases), len(fields), expr))
+    return [SchemaField(name=a, storage_type=f.storage_type, variable_type=f.variable_type)
+            for a, f in zip(expr.aliases, fields)]
+
+
+@_rule(exprs.Cast)
+def _cast(expr, schema):
+    to = expr.to.value if isinstance(expr.to, exprs.Literal) else expr.to
+    if not isinstance(to, StorageType):
+        raise AnalysisException('Invalid target type in {!r}'.format(expr))
+    return _field('CAST({} AS {})'.format(_infer_one(expr.child, schema).name, _sql_type_name(to)), to)
+
+
+@_rule(exprs.SortOrder)
+def _sort_order(expr, schema):
+    f = _infer_one(expr.child, schema)
+    if expr.direction == exprs.SortOrder.Descending:
+        name = '{} DESC NULLS LAST'.format(f.name)
+    else:
+        name = '{} ASC NULLS FIRST'.format(f.name)
+    return _field(name, f.storage_type, f.variable_type)
+
+
+@_rule(exprs.CaseWhen)
+def _case_when(expr, schema):
+    names = []
+    values = []
+    for condition, value in expr.branches:
+        cond_field = _infer_one(condition, schema)
+        if cond_field.storage_type not in (StorageTypes.BOOLEAN, _NULL):
+            raise AnalysisException('Condition of WHEN must be boolean, got {} of type {}'.format(
+                cond_field.name, cond_field.storage_type.name))
+        value_field = _infer_one(value, schema)
+        names.append('WHEN {} THEN {}'.format(cond_field.name, value_field.name))
+        values.append(value_field.storage_type)
+    if expr.else_value is not None:
+        else_field = _infer_one(expr.else_value, schema)
+        names.append('ELSE {}'.format(else_field.name))
+        values.append(else_field.storage_type)
+    return _field('CASE {} END'.format(' '.join(names)), _common_type(expr, values))
+
+
+"""
+arithmetic
+"""
+
+
+@_rule(exprs.Add, exprs.Subtract, exprs.Multiply, exprs.Remainder)
+def _arithmetic(expr, schema):
+    left = _infer_one(expr.left, schema)
+    right = _infer_one(expr.right, schema)
+    name = _operator_name(expr, schema)
+
+    # date/time arithmetic with intervals
+    if isinstance(expr, (exprs.Add, exprs.Subtract)):
+        types = {left.storage_type, right.storage_type}
+        if StorageTypes.CALENDAR_INTERVAL in types:
+            if types == {StorageTypes.CALENDAR_INTERVAL}:
+                return _field(name, StorageTypes.CALENDAR_INTERVAL)
+            if types & set(_DATETIME_TYPES):
+                return _field(name, StorageTypes.TIMESTAMP)
+
+    op = _BINARY_OPERATORS[type(expr)]
+    left_type = _numeric_operand(expr, left, op)
+    right_type = _numeric_operand(expr, right, op)
+    if left_type == _NULL or right_type == _NULL:
+        return _field(name, right_type if left_type == _NULL else left_type)
+    return _field(name, _wider_type(left_type, right_type))
+
+
+@_rule(exprs.Divide)
+def _divide(expr, schema):
+    for f in (_infer_one(expr.left, schema), _infer_one(expr.right, schema)):
+        _numeric_operand(expr, f, '/')
+    return _field(_operator_name(expr, schema), StorageTypes.DOUBLE)
+
+
+@_rule(exprs.Pmod)
+def _pmod(expr, schema):
+    left = _numeric_operand(expr, _infer_one(expr.left, schema), 'pmod')
+    right = _numeric_operand(expr, _infer_one(expr.right, schema), 'pmod')
+    return _field(_function_name(expr, schema), _common_type(expr, [left, right]))
+
+
+@_rule(exprs.UnaryMinus, exprs.Abs)
+def _numeric_unary(expr, schema):
+    f = _infer_one(expr.child, schema)
+    t = _numeric_operand(expr, f, type(expr).__name__)
+    name = '(- {})'.format(f.name) if isinstance(expr, exprs.UnaryMinus) else _function_name(expr, schema)
+    return _field(name, t)
+
+
+@_rule(exprs.Round, exprs.BRound)
+def _round(expr, schema):
+    f = _infer_one(expr.left if isinstance(expr, exprs.Round) else expr.child, schema)
+    return _field(_function_name(expr, schema), _numeric_operand(expr, f, type(expr).__name__))
+
+
+@_rule(exprs.ShiftLeft, exprs.ShiftRight, exprs.ShiftRightUnsigned, exprs.BitwiseNot)
+def _bitwise_unary(expr, schema):
+    f = _infer_one(expr.child, schema)
+    if f.storage_type not in _INTEGRAL_TYPES + [_NULL]:
+        raise AnalysisException('{} requires an integral argument, got {} of type {}'.format(
+            type(expr).__name__, f.name, f.storage_type.name))
+    if isinstance(expr, exprs.BitwiseNot):
+        return _field('~{}'.format(f.name), f.storage_type)
+    t = StorageTypes.LONG if f.storage_type == StorageTypes.LONG else StorageTypes.INTEGER
+    return _field(_function_name(expr, schema), t)
+
+
+@_rule(exprs.BitwiseAnd, exprs.BitwiseOr, exprs.BitwiseXor)
+def _bitwise_binary(expr, schema):
+    types = []
+    for f in (_infer_one(expr.left, schema), _infer_one(expr.right, schema)):
+        if f.storage_type not in _INTEGRAL_TYPES + [_NULL]:
+            raise AnalysisException('{} requires integral arguments, got {} of type {}'.format(
+                _BINARY_OPERATORS[type(expr)], f.name, f.storage_type.name))
+        types.append(f.storage_type)
+    return _field(_operator_name(expr, schema), _common_type(expr, types))
+
+
+@_rule(exprs.Sqrt, exprs.Acos, exprs.Asin, exprs.Atan, exprs.Cbrt, exprs.Cos, exprs.Cosh, exprs.Exp,
+       exprs.Expm1, exprs.Log, exprs.Logarithm, exprs.Log10, exprs.Log1p, exprs.Log2, exprs.Rint,
+       exprs.Signum, exprs.Sin, exprs.Sinh, exprs.Tan, exprs.Tanh, exprs.ToDegrees, exprs.ToRadians,
+       exprs.Atan2, exprs.Hypot, exprs.Pow)
+def _math_double(expr, schema):
+    for child in expr.child_expressions():
+        _numeric_operand(expr, _infer_one(child, schema), _FUNCTION_NAMES.get(type(expr), type(expr).__name__))
+    return _field(_function_name(expr, schema), StorageTypes.DOUBLE)
+
+
+@_rule(exprs.Ceil, exprs.Floor, exprs.Factorial)
+def _math_long(expr, schema):
+    _numeric_operand(expr, _infer_one(expr.child, schema), type(expr).__name__.lower())
+    return _field(_function_name(expr, schema), StorageTypes.LONG)
+
+
+@_rule(exprs.Greatest, exprs.Least, exprs.Coalesce, exprs.NaNvl)
+def _common_of_children(expr, schema):
+    children = expr.child_expressions()
+    types = [_infer_one(c, schema).storage_type for c in children]
+    return _field(_function_name(expr, schema), _common_type(expr, types))
+
+
+"""
+aggregation
+"""
+
+
+@_rule(exprs.Count, exprs.CountDistinct, exprs.ApproxCountDistinct)
+def _count(expr, schema):
+    if isinstance(expr, exprs.CountDistinct):
+        args = [_infer_one(e, schema).name for e in [expr.expr] + list(expr.exprs)]
+        name = 'count(DISTINCT {})'.format(', '.join(args))
+    elif isinstance(expr, exprs.ApproxCountDistinct):
+        name = 'approx_count_distinct({})'.format(_infer_one(expr.child, schema).name)
+    else:
+        name = _function_name(expr, schema)
+    return _field(name, StorageTypes.LONG)
+
+
+@_rule(exprs.Sum)
+def _sum(expr, schema):
+    f = _infer_one(expr.child, schema)
+    t = _numeric_operand(expr, f, 'sum')
+    fmt = 'sum(DISTINCT {})' if expr.is_distinct else 'sum({})'
+    return _field(fmt.format(f.name), StorageTypes.LONG if t in _INTEGRAL_TYPES else StorageTypes.DOUBLE)
+
+
+@_rule(exprs.Average, exprs.StddevSamp, exprs.StddevPop, exprs.VarianceSamp, exprs.VariancePop,
+       exprs.Skewness, exprs.Kurtosis, exprs.Corr, exprs.CovPopulation, exprs.CovSample)
+def _statistics(expr, schema):
+    for child in expr.child_expressions():
+        _numeric_operand(expr, _infer_one(child, schema), _FUNCTION_NAMES.get(type(expr), type(expr).__name__))
+    return _field(_function_name(expr, schema), StorageTypes.DOUBLE)
+
+
+@_rule(exprs.ApproximatePercentile)
+def _percentile(expr, schema):
+    t = _numeric_operand(expr, _infer_one(expr.child, schema), 'percentile_approx')
+    if isinstance(_infer_one(expr.percentage, schema).storage_type, ArrayType):
+        # one percentile per percentage
+        t = StorageTypes.array(t)
+    return _field(_function_name(expr, schema), t)
+
+
+@_rule(exprs.Max, exprs.Min, exprs.First, exprs.Last)
+def _same_as_child(expr, schema):
+    f = _infer_one(expr.child, schema)
+    return _field(_function_name(expr, schema), f.storage_type, f.variable_type)
+
+
+@_rule(exprs.CollectList, exprs.CollectSet)
+def _collect(expr, schema):
+    f = _infer_one(expr.child, schema)
+    return _field(_function_name(expr, schema), StorageTypes.array(f.storage_type))
+
+
+@_rule(exprs.Grouping)
+def _grouping(expr, schema):
+    # Spark returns a byte here, which is the closest to SHORT in Cebes
+    return _field(_function_name(expr, schema), StorageTypes.SHORT)
+
+
+"""
+collections and complex types
+"""
+
+
+@_rule(exprs.Explode, exprs.PosExplode)
+def _explode(expr, schema):
+    f = _infer_one(expr.child, schema)
+    fields = []
+    if isinstance(expr, exprs.PosExplode):
+        fields.extend(_field('pos', StorageTypes.INTEGER))
+    if isinstance(f.storage_type, ArrayType):
+        fields.extend(_field('col', f.storage_type.element_type))
+    elif isinstance(f.storage_type, MapType):
+        fields.extend(_field('key', f.storage_type.key_type))
+        fields.extend(_field('value', f.storage_type.value_type))
+    else:
+        raise AnalysisException('{} requires an array or a map, got {} of type {}'.format(
+            type(expr).__name__.lower(), f.name, f.storage_type.name))
+    return fields
+
+
+@_rule(exprs.JsonTuple)
+def _json_tuple(expr, schema):
+    _infer_one(expr.child, schema)
+    return [SchemaField(name='c{}'.format(i), storage_type=StorageTypes.STRING, variable_type=VariableTypes.TEXT)
+            for i in range(len(expr.fields))]
+
+
+@_rule(exprs.GetItem)
+def _get_item(expr, schema):
+    f = _infer_one(expr.left, schema)
+    key = _infer_one(expr.right, schema)
+    name = '{}[{}]'.format(f.name, key.name)
+    if isinstance(f.storage_type, ArrayType):
+        return _field(name, f.storage_type.element_type)
+    if isinstance(f.storage_type, MapType):
+        return _field(name, f.storage_type.value_type)
+    raise AnalysisException('get_item() requires an array or a map, got {} of type {}'.format(
+        f.name, f.storage_type.name))
+
+
+@_rule(exprs.GetField)
+def _get_field(expr, schema):
+    f = _infer_one(expr.child, schema)
+    field_name = expr.field_name.value if isinstance(expr.field_name, exprs.Literal) else expr.field_name
+    if not isinstance(f.storage_type, StructType):
+        raise AnalysisException('get_field() requires a struct, got {} of type {}'.format(
+            f.name, f.storage_type.name))
+    struct_field = next((sf for sf in f.storage_type.fields if sf.name == field_name), None)
+    if struct_field is None:
+        raise AnalysisException('Field {!r} not found in struct column {}. Available fields are: {}'.format(
+            field_name, f.name, ', '.join(sf.name for sf in f.storage_type.fields)))
+    return _field('{}.{}'.format(f.name, field_name), struct_field.storage_type)
+
+
+@_rule(exprs.Size)
+def _size(expr, schema):
+    f = _infer_one(expr.child, schema)
+    if not isinstance(f.storage_type, (ArrayType, MapType)):
+        raise AnalysisException('size() requires an array or a map, got {} of type {}'.format(
+            f.name, f.storage_type.name))
+    return _field(_function_name(expr, schema), StorageTypes.INTEGER)
+
+
+@_rule(exprs.SortArray)
+def _sort_array(expr, schema):
+    f = _infer_one(expr.child, schema)
+    if not isinstance(f.storage_type, ArrayType):
+        raise AnalysisException('sort_array() requires an array, got {} of type {}'.format(
+            f.name, f.storage_type.name))
+    return _field(_function_name(expr, schema), f.storage_type)
+
+
+@_rule(exprs.CreateArray)
+def _create_array(expr, schema):
+    types = [_infer_one(c, schema).storage_type for c in expr.children]
+    element_type = _common_type(expr, types)
+    return _field(_function_name(expr, schema),
+                  StorageTypes.array(StorageTypes.STRING if element_type == _NULL else element_type))
+
+
+@_rule(exprs.CreateMap)
+def _create_map(expr, schema):
+    if len(expr.children) % 2 != 0:
+        raise AnalysisException('map() expects a positive even number of arguments, got {}'.format(
+            len(expr.children)))
+    fields = [_infer_one(c, schema) for c in expr.children]
+    key_type = _common_type(expr, [f.storage_type for f in fields[0::2]])
+    value_type = _common_type(expr, [f.storage_type for f in fields[1::2]])
+    return _field(_function_name(expr, schema),
+                  StorageTypes.map(StorageTypes.STRING if key_type == _NULL else key_type,
+                                   StorageTypes.STRING if value_type == _NULL else value_type))
+
+
+@_rule(exprs.CreateStruct)
+def _create_struct(expr, schema):
+    fields = [_finalize(_infer_one(c, schema)) for c in expr.children]
+    struct_fields = [StructField(f.name, f.storage_type) for f in fields]
+    return _field(_function_name(expr, schema), StorageTypes.struct(struct_fields))
+
+
+@_rule(exprs.TimeWindow)
+def _time_window(expr, schema):
+    f = _infer_one(expr.child, schema)
+    if f.storage_type not in _DATETIME_TYPES + [StorageTypes.STRING]:
+        raise AnalysisException('window() requires a timestamp, got {} of type {}'.format(
+            f.name, f.storage_type.name))
+    return _field('window', StorageTypes.struct([StructField('start', StorageTypes.TIMESTAMP),
+                                                 StructField('end', StorageTypes.TIMESTAMP)]))
+
+
+@_rule(exprs.StringSplit)
+def _split(expr, schema):
+    return _field(_function_name(expr, schema), StorageTypes.array(StorageTypes.STRING))
+
+
+"""
+predicates
+"""
+
+
+@_rule(exprs.And, exprs.Or)
+def _logical(expr, schema):
+    for f in (_infer_one(expr.left, schema), _infer_one(expr.right, schema)):
+        if f.storage_type not in (StorageTypes.BOOLEAN, _NULL):
+            raise AnalysisException('{} requires boolean arguments, got {} of type {}'.format(
+                _BINARY_OPERATORS[type(expr)], f.name, f.storage_type.name))
+    return _field(_operator_name(expr, schema), StorageTypes.BOOLEAN)
+
+
+@_rule(exprs.Not)
+def _not(expr, schema):
+    f = _infer_one(expr.child, schema)
+    if f.storage_type not in (StorageTypes.BOOLEAN, _NULL):
+        raise AnalysisException('NOT requires a boolean argument, got {} of type {}'.format(
+            f.name, f.storage_type.name))
+    return _field('(NOT {})'.format(f.name), StorageTypes.BOOLEAN)
+
+
+@_rule(exprs.EqualTo, exprs.EqualNullSafe, exprs.GreaterThan, exprs.LessThan,
+       exprs.GreaterThanOrEqual, exprs.LessThanOrEqual)
+def _comparison(expr, schema):
+    return _field(_operator_name(expr, schema), StorageTypes.BOOLEAN)
+
+
+@_rule(exprs.IsNull, exprs.IsNotNull)
+def _is_null(expr, schema):
+    fmt = '({} IS NULL)' if isinstance(expr, exprs.IsNull) else '({} IS NOT NULL)'
+    return _field(fmt.format(_infer_one(expr.child, schema).name), StorageTypes.BOOLEAN)
+
+
+@_rule(exprs.In)
+def _in(expr, schema):
+    return _field('({} IN ({}))'.format(_infer_one(expr.value, schema).name,
+                                        ', '.join(_infer_one(v, schema).name for v in expr.ls)),
+                  StorageTypes.BOOLEAN)
+
+
+@_rule(exprs.Like, exprs.RLike)
+def _like(expr, schema):
+    op = 'LIKE' if isinstance(expr, exprs.Like) else 'RLIKE'
+    return _field('{} {} {}'.format(_infer_one(expr.child, schema).name, op, expr.literal), StorageTypes.BOOLEAN)
+
+
+def _typed_function(storage_type):
+    """Rule for functions of a fixed result type"""
+
+    def infer(expr, schema):
+        return _field(_function_name(expr, schema), storage_type)
+
+    return infer
+
+
+_rule(exprs.IsNaN, exprs.Contains, exprs.StartsWith, exprs.EndsWith,
+      exprs.ArrayContains)(_typed_function(StorageTypes.BOOLEAN))
+
+_rule(exprs.Bin, exprs.Hex, exprs.Conv, exprs.Base64, exprs.Concat, exprs.ConcatWs, exprs.Decode,
+      exprs.FormatNumber, exprs.FormatString, exprs.InitCap, exprs.Lower, exprs.Upper, exprs.StringLPad,
+      exprs.StringRPad, exprs.StringTrimLeft, exprs.StringTrimRight, exprs.StringTrim, exprs.RegExpExtract,
+      exprs.RegExpReplace, exprs.StringRepeat, exprs.StringReverse, exprs.SoundEx, exprs.StringTranslate,
+      exprs.Substring, exprs.SubstringIndex, exprs.Md5, exprs.Sha1, exprs.Sha2, exprs.DateFormatClass,
+      exprs.FromUnixTime, exprs.GetJsonObject, exprs.InputFileName)(_typed_function(StorageTypes.STRING))
+
+_rule(exprs.Unhex, exprs.UnBase64, exprs.Encode)(_typed_function(StorageTypes.BINARY))
+
+_rule(exprs.Ascii, exprs.StringInstr, exprs.Length, exprs.Levenshtein, exprs.StringLocate,
+      exprs.Murmur3Hash, exprs.SparkPartitionID, exprs.GroupingID, exprs.DateDiff, exprs.Year, exprs.Quarter,
+      exprs.Month, exprs.DayOfMonth, exprs.DayOfYear, exprs.Hour, exprs.Minute, exprs.Second,
+      exprs.WeekOfYear)(_typed_function(StorageTypes.INTEGER))
+
+_rule(exprs.Crc32, exprs.UnixTimestamp, exprs.MonotonicallyIncreasingID)(_typed_function(StorageTypes.LONG))
+
+_rule(exprs.Rand, exprs.Randn, exprs.MonthsBetween)(_typed_function(StorageTypes.DOUBLE))
+
+_rule(exprs.AddMonths, exprs.CurrentDate, exprs.DateAdd, exprs.DateSub, exprs.LastDay, exprs.NextDay,
+      exprs.ToDate, exprs.TruncDate)(_typed_function(StorageTypes.DATE))
+
+_rule(exprs.CurrentTimestamp, exprs.FromUTCTimestamp,
+      exprs.ToUTCTimestamp)(_typed_function(StorageTypes.TIMESTAMP))
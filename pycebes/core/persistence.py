@@ -0,0 +1,201 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+from collections import Counter, OrderedDict
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+from pycebes.core.dataframe import StorageLevels
+from pycebes.internal.helpers import require, get_logger
+from pycebes.internal.scheduler import Priorities
+
+_logger = get_logger(__name__)
+
+
+class AutoPersistPolicy(object):
+    """
+    Policy persisting automatically the Dataframes that are used repeatedly in a #Session.
+
+    Every time a Dataframe is the input of a command sent to the server, its use count is increased.
+    When it reaches ``threshold``, the size of the Dataframe is estimated by the server, and if it fits
+    in ``budget_bytes``, the Dataframe is persisted with ``storage_level``. To make room for it,
+    the least recently used Dataframes persisted by this policy are unpersisted, and their use counts start
+    over. Dataframes persisted explicitly with #Dataframe.persist are left out of the policy until they are
+unpersisted with #Dataframe.unpersist: they are neither persisted again with ``storage_level`` nor evicted.
+
+    The size estimate and the persist and unpersist requests take as long as a Spark job each. They are sent
+    in the background, one Dataframe at a time and with the #Priorities.BATCH priority, so the command that
+    triggered them does not wait for them: the Dataframe is cached for the commands after it.
+    Use #AutoPersistPolicy.wait to wait for them.
+
+    The policy is off by default. Enable it with:
+
+    ```python
+    session.auto_persist = AutoPersistPolicy(threshold=3, budget_bytes=2 << 30)
+    ```
+    """
+
+    def __init__(self, threshold=3, budget_bytes=1 << 30, storage_level=StorageLevels.MEMORY_AND_DISK):
+        """
+        # Arguments
+        threshold (int): number of uses after which a Dataframe is persisted
+        budget_bytes (int): maximum total estimated size of the Dataframes persisted by this policy, in bytes
+        storage_level (StorageLevels): storage level of the Dataframes persisted by this policy
+        """
+        require(threshold > 0, 'threshold must be positive, got {!r}'.format(threshold))
+        require(budget_bytes > 0, 'budget_bytes must be positive, got {!r}'.format(budget_bytes))
+        require(isinstance(storage_level, StorageLevels),
+                'storage_level: expect a StorageLevels, got {!r}'.format(storage_level))
+        self.threshold = threshold
+        self.budget_bytes = budget_bytes
+        self.storage_level = storage_level
+
+        self._lock = threading.RLock()
+        self._uses = Counter()
+        # Dataframe ID -> estimated size of the Dataframes persisted by this policy, least recently used first
+        self._persisted = OrderedDict()
+        # IDs of the Dataframes persisted explicitly, left out of the policy
+        self._explicit = set()
+
+        # sends the requests of the policy in the background, created when first needed
+        self._executor = None
+        self._pending = set()
+
+    @property
+    def persisted(self):
+        """
+        The Dataframes persisted by this policy
+
+        # Returns
+        OrderedDict: Dataframe ID -> estimated size in bytes, least recently used first
+        """
+        with self._lock:
+            return OrderedDict(self._persisted)
+
+    @property
+    def used_bytes(self):
+        """Total estimated size of the Dataframes persisted by this policy, in bytes"""
+        with self._lock:
+            return sum(self._persisted.values())
+
+    def record_use(self, df, client):
+        """
+        Record that the given Dataframe is the input of a command about to be sent,
+        and persist it if it is used often enough
+
+        # Arguments
+        df (Dataframe): the Dataframe
+        client (Client): the client to send the persist requests with
+        """
+        with self._lock:
+            if df.id in self._explicit:
+                return
+            self._uses[df.id] += 1
+            if df.id in self._persisted:
+                self._persisted.move_to_end(df.id)
+                return
+            if self._uses[df.id] != self.threshold:
+                return
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            future = self._executor.submit(self._persist_quietly, df.id, client)
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def wait(self, timeout=None):
+        """
+        Wait until the requests sent in the background by this policy are done
+
+        # Arguments
+        timeout (float): maximum time to wait, in seconds. None means no limit
+
+        # Returns
+        bool: True if they are done, False if the timeout expired
+        """
+        with self._lock:
+            pending = list(self._pending)
+        return not futures.wait(pending, timeout=timeout).not_done
+
+    def exclude(self, df_id):
+        """Leave the given Dataframe out of this policy, because it is persisted explicitly"""
+        with self._lock:
+            self._explicit.add(df_id)
+            self._uses.pop(df_id, None)
+            self._persisted.pop(df_id, None)
+
+    def forget(self, df_ids):
+        """
+        Forget the given Dataframes, e.g. because they were unpersisted explicitly or released on the server.
+        They are counted again by this policy.
+        """
+        with self._lock:
+            for df_id in df_ids:
+                self._uses.pop(df_id, None)
+                self._persisted.pop(df_id, None)
+                self._explicit.discard(df_id)
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _persist_quietly(self, df_id, client):
+        try:
+            self._persist(df_id, client)
+        except Exception as e:
+            # only an optimization, it will be tried again after ``threshold`` more uses
+            _logger.warning('Failed to persist Dataframe {} automatically: {}'.format(df_id, e))
+            with self._lock:
+                self._uses.pop(df_id, None)
+
+    def _persist(self, df_id, client):
+        size = client.post_and_wait('df/estimatesize', {'df': df_id}, priority=Priorities.BATCH).get('sizeInBytes')
+        if size is None or size > self.budget_bytes:
+            _logger.info('Not persisting Dataframe {} used {} times: its estimated size {} is over the budget '
+                         'of {} bytes'.format(df_id, self.threshold, size, self.budget_bytes))
+            return
+
+        with self._lock:
+            if df_id in self._explicit:
+                # persisted explicitly since the size estimate was requested
+                return
+            evicted = []
+            while self._persisted and sum(self._persisted.values()) + size > self.budget_bytes:
+                evicted_id, evicted_size = self._persisted.popitem(last=False)
+                if evicted_id in self._explicit:
+                    continue
+                evicted.append((evicted_id, evicted_size))
+                # persisted again if it is used ``threshold`` more times
+                self._uses.pop(evicted_id, None)
+            self._persisted[df_id] = size
+
+        for evicted_id, evicted_size in evicted:
+            _logger.info('Unpersisting Dataframe {} ({} bytes) to make room for Dataframe {}'.format(
+                evicted_id, evicted_size, df_id))
+            try:
+                client.post_and_wait('df/unpersist', {'df': evicted_id}, priority=Priorities.BATCH)
+            except Exception as e:
+                _logger.warning('Failed to unpersist Dataframe {}: {}'.format(evicted_id, e))
+
+        _logger.info('Persisting Dataframe {} ({} bytes) with {}, after it was used {} times'.format(
+            df_id, size, self.storage_level.name, self.threshold))
+        try:
+            client.post_and_wait('df/persist', {'df': df_id, 'storageLevel': self.storage_level.to_json()},
+                                 priority=Priorities.BATCH)
+        except BaseException:
+            with self._lock:
+                self._persisted.pop(df_id, None)
+            raise
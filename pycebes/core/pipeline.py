@@ -50,20 +50,23 @@ class Model(object):
     def inputs(self):
         return dict(**self._inputs)
 
-    def transform(self, input_df):
+    def transform(self, input_df, timeout=None):
         """
         Transform the given Dataframe
 
         # Arguments
         input_df (Dataframe): the input Dataframe to be transformed
+        timeout (float): deadline of the transformation, in seconds. See #Session.deadline
 
         # Returns
         Dataframe: the Dataframe transformed by this model
         """
+        input_df._record_use()
         data = {'model': {'modelId': self._id},
                 'inputDf': {'dfId': input_df.id}}
-        result = get_default_session().client.post_and_wait('model/run', data)
-        return dataframe.Dataframe.from_json(result)
+        with dataframe._requesting():
+            result = get_default_session().client.post_and_wait('model/run', data, timeout=timeout)
+            return dataframe.Dataframe.from_json(result)
 
     @classmethod
     def from_json(cls, js_data):
@@ -185,14 +188,17 @@ class Pipeline(object):
         """
         return {'id': self.id, 'stages': [s.to_json() for s in self._stages]}
 
-    def run(self, outputs=(), feeds=None, timeout=-1):
+    def run(self, outputs=(), feeds=None, timeout=-1, progress_callback=None):
         """
         Run this pipeline, given the feeds and take the outputs
 
         :param outputs: list of SlotDescriptor from which to take the value
         :param feeds: a dictionary of {SlotDescriptor -> value} giving the values
             to some slots in the pipeline
-        :param timeout: timeout in seconds. Negative means wait indefinitely
+        :param timeout: timeout in seconds, enforced both on the server and on the client.
+            Negative means wait indefinitely, unless a deadline is set via :func:`Session.deadline`
+        :param progress_callback: function called with a ``JobProgress`` every time the server reports
+            a new progress of the run. See :func:`Client.wait`
         :return: tuple of values of the output slots
         """
         single_output = False
@@ -223,6 +229,14 @@ class Pipeline(object):
 
             feeds_json[slot_desc.full_server_name] = slot_desc.message_type.to_json(v)
 
+        if get_default_session().validate:
+            from pycebes.core.analysis import validate_pipeline
+            validate_pipeline(self, feeds)
+
+        for v in feeds.values():
+            if isinstance(v, dataframe.Dataframe):
+                v._record_use()
+
         ppl_json = self.to_json()
 
         data = {'pipeline': ppl_json,
@@ -230,17 +244,19 @@ class Pipeline(object):
                 'outputs': output_slots,
                 'timeout': timeout}
 
-        run_result = get_default_session().client.post_and_wait('pipeline/run', data)
+        with dataframe._requesting():
+            run_result = get_default_session().client.post_and_wait(
+                'pipeline/run', data, timeout=timeout if timeout > 0 else None, progress_callback=progress_callback)
 
-        assert self._id is None or self._id == run_result['pipelineId']
-        self._id = run_result['pipelineId']
+            assert self._id is None or self._id == run_result['pipelineId']
+            self._id = run_result['pipelineId']
 
-        # parse the results
-        require(len(run_result['results']) == len(output_slots), 'Invalid result from server')
-        parsed_results = []
-        for out_slot in output_slots:
-            r = next((v for k, v in run_result['results'] if k == out_slot), None)
-            require(r is not None, 'Could not find result for output slot {}'.format(out_slot))
-            parsed_results.append(MessageType.from_json(r))
+            # parse the results
+            require(len(run_result['results']) == len(output_slots), 'Invalid result from server')
+            parsed_results = []
+            for out_slot in output_slots:
+                r = next((v for k, v in run_result['results'] if k == out_slot), None)
+                require(r is not None, 'Could not find result for output slot {}'.format(out_slot))
+                parsed_results.append(MessageType.from_json(r))
 
         return parsed_results[0] if single_output else tuple(parsed_results)
@@ -68,6 +68,15 @@ class StorageType(object):
     def to_json(self):
         return self._cebes_type
 
+    def __eq__(self, other):
+        return isinstance(other, StorageType) and self.cebes_type == other.cebes_type
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.cebes_type)
+
 
 class ArrayType(StorageType):
 
@@ -219,6 +228,45 @@ class StorageTypes(object):
         raise ValueError('Unknown storage type: {!r}'.format(js_val))
 
 
+# numpy dtypes (kind, item size) -> storage types, used by Schema.from_pandas()
+_PANDAS_STORAGE_TYPES = {
+    ('b', 1): StorageTypes.BOOLEAN,
+    ('i', 1): StorageTypes.SHORT, ('i', 2): StorageTypes.SHORT,
+    ('i', 4): StorageTypes.INTEGER, ('i', 8): StorageTypes.LONG,
+    ('u', 1): StorageTypes.SHORT, ('u', 2): StorageTypes.INTEGER,
+    ('u', 4): StorageTypes.LONG, ('u', 8): StorageTypes.LONG,
+    ('f', 2): StorageTypes.FLOAT, ('f', 4): StorageTypes.FLOAT, ('f', 8): StorageTypes.DOUBLE,
+    ('M', 8): StorageTypes.TIMESTAMP,
+}
+
+
+def default_variable_type(storage_type):
+    """
+    Return the variable type given by default to a column of the given storage type
+
+    # Arguments
+    storage_type (StorageType): the storage type
+
+    # Returns
+    VariableTypes: the default variable type
+    """
+    if isinstance(storage_type, ArrayType) or storage_type == StorageTypes.VECTOR:
+        return VariableTypes.ARRAY
+    if isinstance(storage_type, MapType):
+        return VariableTypes.MAP
+    if isinstance(storage_type, StructType):
+        return VariableTypes.STRUCT
+    if storage_type in (StorageTypes.DATE, StorageTypes.TIMESTAMP, StorageTypes.CALENDAR_INTERVAL):
+        return VariableTypes.DATETIME
+    if storage_type in (StorageTypes.SHORT, StorageTypes.INTEGER, StorageTypes.LONG):
+        return VariableTypes.DISCRETE
+    if storage_type in (StorageTypes.FLOAT, StorageTypes.DOUBLE):
+        return VariableTypes.CONTINUOUS
+    if storage_type == StorageTypes.BOOLEAN:
+        return VariableTypes.NOMINAL
+    return VariableTypes.TEXT
+
+
 @six.python_2_unicode_compatible
 class SchemaField(object):
     def __init__(self, name='', storage_type=StorageTypes.STRING, variable_type=VariableTypes.TEXT):
@@ -233,6 +281,14 @@ class SchemaField(object):
     def __str__(self):
         return super(SchemaField, self).__str__()
 
+    def to_json(self):
+        """
+        Return the JSON representation of this field
+        """
+        return {'name': self.name,
+                'storageType': self.storage_type.to_json(),
+                'variableType': self.variable_type.to_json()}
+
 
 @six.python_2_unicode_compatible
 class Schema(object):
@@ -272,6 +328,32 @@ class Schema(object):
         except StopIteration:
             raise KeyError('Column not found: {!r}'.format(item))
 
+    def to_json(self):
+        """
+        Return the JSON representation of this Schema, which can be parsed back with :func:`from_json`
+        """
+        return {'fields': [f.to_json() for f in self.fields]}
+
+    @classmethod
+    def from_pandas(cls, df):
+        """
+        Derive the Schema of the given pandas DataFrame from the dtypes of its columns.
+        Columns of type ``object`` are mapped to ``STRING``, categorical columns are ``NOMINAL``.
+
+        :param df: a pandas DataFrame
+        :rtype: Schema
+        """
+        fields = []
+        for name, dtype in df.dtypes.items():
+            storage_type = _PANDAS_STORAGE_TYPES.get((dtype.kind, getattr(dtype, 'itemsize', 0)),
+                                                     StorageTypes.STRING)
+            if '{}'.format(dtype) == 'category':
+                variable_type = VariableTypes.NOMINAL
+            else:
+                variable_type = default_variable_type(storage_type)
+            fields.append(SchemaField('{}'.format(name), storage_type, variable_type))
+        return Schema(fields=fields)
+
     @classmethod
     def from_json(cls, js_data):
         """
@@ -16,43 +16,72 @@ from __future__ import unicode_literals
 import base64
 import fcntl
 import getpass
+import glob
+import hashlib
 import json
 import os
 import tempfile
+from contextlib import contextmanager
 
 import pandas as pd
 import six
 
 from pycebes.core.client import Client
+from pycebes.core.column import Column
 from pycebes.core.dataframe import Dataframe
 from pycebes.core.pipeline import Model, Pipeline
+from pycebes.core.schema import Schema
 from pycebes.internal import docker_helpers
 from pycebes.internal import responses
-from pycebes.internal.helpers import require, get_logger
+from pycebes.internal.helpers import require, get_logger, is_positive_integer
+from pycebes.internal.lifecycle import DataframeTracker
+from pycebes.internal.local_cache import LocalCache
 from pycebes.internal.implicits import get_session_stack
 
 _logger = get_logger(__name__)
 
+# extensions of the files of every format, see Session._expand_local_paths
+_LOCAL_FILE_EXTENSIONS = {'csv': ('.csv', '.tsv'), 'json': ('.json', '.jsonl'), 'parquet': ('.parquet',),
+                          'orc': ('.orc',), 'text': ('.txt', '.text', '.log')}
+
 
 @six.python_2_unicode_compatible
 class Session(object):
     """
     Construct a new `Session` to the server at the given host and port, with the given user name and password.
 
+    The `read_*` functions take optional `columns` (names of the columns to be read) and `condition`
+    (a #Column referring to columns by name, e.g. ``cb.col('wax') > 2``) arguments. Only these columns and
+    the rows matching the condition end up in the Dataframe. They are pushed down to the data source, so that
+    it reads less data, as far as its format allows: see the note on each function.
+
     # Arguments
     host (str): Hostname of the Cebes server.
         If `None` (default), cebes will try to launch a new
         docker container with a suitable version of Cebes server in it. Note that it requires you have
         a working docker daemon on your machine.
         Otherwise a string containing the host name or IP address of the Cebes server you want to connect to.
-    port (int): The port on which Cebes server is listening. Ignored when ``host=None``.
+        It can also be a list of servers running in front of the same cluster, each of them given as
+        a host name, a string `host:port` or a tuple `(host, port)`. New requests are then sent to the server
+        with the least requests in progress, and to another server if the chosen one does not answer.
+    port (int): The port on which Cebes server is listening, for servers given without port.
+        Ignored when ``host=None``.
     user_name (str): Username to log in to Cebes server
     password (str): Password of the user to log in to Cebes server
     interactive (bool): whether this is an interactive session,
         in which case some diagnosis logs will be printed to stdout.
+    validate (bool): whether to validate Dataframe operations and Pipelines on the client
+        against the known schemas before sending them to the server.
+        Can be changed later via the ``validate`` attribute.
+    timeout (float): default deadline, in seconds, of every blocking call of this session
+        (Dataframe actions, tag operations, model transformations, uploads...).
+        `None` (default) means they can wait indefinitely. See #Session.deadline.
+    auto_persist (AutoPersistPolicy): policy persisting automatically the Dataframes used repeatedly
+        in this session. `None` (default) disables it. Can be changed later via the ``auto_persist`` attribute.
     """
 
-    def __init__(self, host=None, port=21000, user_name='', password='', interactive=True):
+    def __init__(self, host=None, port=21000, user_name='', password='', interactive=True, validate=True,
+                 timeout=None, auto_persist=None):
         """Construct a Session object. See class docstring for parameters."""
         # local Spark
         self.cebes_container = None
@@ -65,7 +94,15 @@ class Session(object):
             _logger.info('Spark UI can be accessed at http://localhost:{}'.format(self.cebes_container.spark_port))
 
         self._client = Client(host=host, port=port, user_name=user_name,
-                              password=password, interactive=interactive)
+                              password=password, interactive=interactive, default_timeout=timeout)
+        self.validate = validate
+        self.auto_persist = auto_persist
+
+        # schemas inferred by the server for local files, keyed by content hash
+        self._schema_cache = LocalCache('schemas')
+
+        # Dataframes of this session, to release those that are not used anymore on the server
+        self._dataframe_tracker = DataframeTracker(self._client, on_release=self._on_dataframes_released)
 
         # the first session created
         session_stack = get_session_stack()
@@ -73,6 +110,10 @@ class Session(object):
             session_stack.stack.append(self)
 
     def __repr__(self):
+        endpoints = self._client.endpoints
+        if len(endpoints) > 1:
+            return '{}(hosts={!r},user_name={!r},api_version={!r})'.format(
+                self.__class__.__name__, endpoints, self._client.user_name, self._client.api_version)
         return '{}(host={!r},port={!r},user_name={!r},api_version={!r})'.format(
             self.__class__.__name__, self._client.host, self._client.port,
             self._client.user_name, self._client.api_version)
@@ -90,6 +131,17 @@ class Session(object):
         """
         return self._client
 
+    @property
+    def dataframe_tracker(self):
+        """
+        Return the tracker of the Dataframes of this session.
+        Its ``batch_size`` controls how many unused Dataframes are released at once, see #Session.release_unused
+
+        # Returns
+        DataframeTracker:
+        """
+        return self._dataframe_tracker
+
     @property
     def dataframe(self):
         """
@@ -99,7 +151,8 @@ class Session(object):
         _TagHelper:
         """
         return _TagHelper(client=self._client, cmd_prefix='df',
-                          object_class=Dataframe, response_class=responses.TaggedDataframeResponse)
+                          object_class=Dataframe, response_class=responses.TaggedDataframeResponse,
+                          tracker=self._dataframe_tracker)
 
     @property
     def model(self):
@@ -174,26 +227,104 @@ class Session(object):
 
     def close(self):
         """
-        Close this session. Will stop the Cebes container if this session was
-        created against a local Cebes container. Otherwise it is a no-op.
+        Close this session. Requests of this session that are still running are cancelled,
+        the Dataframes that are not used anymore are released on the server, then the session logs out.
+        Will also stop the Cebes container if this session was created against a local Cebes container.
         """
+        self._client.cancel_all()
+        try:
+            self._dataframe_tracker.release_unused()
+        except Exception as e:
+            _logger.warning('Failed to release unused Dataframes: {}'.format(e))
+        self._dataframe_tracker.clear()
+        self._client.logout()
         if self.cebes_container is not None:
             self.cebes_container.shutdown()
             self.cebes_container = None
         self.stop_repository_container()
 
+    def release_unused(self):
+        """
+        Release on the server the Dataframes of this session that are not referenced anymore
+        on the client, e.g. the intermediate results of `df.where(...).select(...)`.
+        Tagged Dataframes are never released.
+
+        This also happens automatically when 50 of them are waiting to be released,
+        see #Session.dataframe_tracker.
+
+        # Returns
+        list: IDs of the released Dataframes
+        """
+        return self._dataframe_tracker.release_unused()
+
+    def _on_dataframes_released(self, df_ids):
+        if self.auto_persist is not None:
+            self.auto_persist.forget(df_ids)
+
+    def cached_dataframes(self):
+        """
+        List the Dataframes cached on the server with #Dataframe.persist,
+        with their storage levels and the memory and disk they use
+
+        # Returns
+        CachedDataframesResponse:
+        """
+        return responses.CachedDataframesResponse(self._client.post_and_wait('df/cached', {}))
+
+    def deadline(self, seconds):
+        """
+        Context manager bounding all the blocking calls made inside it by the current thread,
+        e.g. Dataframe actions, so that they raise `TimeoutError` once the given number of seconds has passed.
+        Requests still running on the server at that time are cancelled.
+
+        ```python
+        with session.deadline(30):
+            df = session.read_local('/data/cylinder_bands.csv')
+            print(len(df.where(df.wax > 2)))
+        ```
+
+        # Arguments
+        seconds (float): the time budget of the calls, in seconds. Nested deadlines can only make it shorter.
+        """
+        return self._client.deadline(seconds)
+
     """
     Storage APIs
     """
 
-    def _read(self, request):
+    def _read(self, request, columns=None, condition=None):
         """
         Read a Dataframe from the given request
 
+        # Arguments
+        request (dict): the request, describing the data source
+        columns (list): names of the columns to be read. None means all columns
+        condition (Column): condition on the rows to be read. None means all rows
+
         # Returns
         Dataframe:
         """
-        return Dataframe.from_json(self._client.post_and_wait('storage/read', data=request))
+        request = dict(request, **Session._pushdown_request(columns, condition))
+        with self._dataframe_tracker.requesting():
+            return Dataframe.from_json(self._client.post_and_wait('storage/read', data=request),
+                                       tracker=self._dataframe_tracker)
+
+    @staticmethod
+    def _pushdown_request(columns=None, condition=None):
+        """
+        Helper to verify the projection and filter given to a read command
+        Return the fields to be added into the ``storage/read`` request
+        """
+        request = {}
+        if columns is not None:
+            columns = [columns] if isinstance(columns, six.text_type) else list(columns)
+            require(len(columns) > 0 and all(isinstance(c, six.text_type) for c in columns),
+                    'columns: expect a non-empty list of column names, got {!r}'.format(columns))
+            request['projection'] = columns
+        if condition is not None:
+            require(isinstance(condition, Column), 'condition: expect a Column object, got {!r}'.format(condition))
+            request['filter'] = condition.to_json()
+        return request
 
     @staticmethod
     def _verify_data_format(fmt='csv', options=None):
@@ -223,36 +354,103 @@ class Session(object):
             return options.to_json()
         return {}
 
-    def read_jdbc(self, url, table_name, user_name='', password=''):
+    def read_jdbc(self, url, table_name, user_name='', password='', columns=None, condition=None,
+                  partition_column=None, lower_bound=None, upper_bound=None, num_partitions=None,
+                  fetch_size=None, predicates=None):
         """
         Read a Dataframe from a JDBC table
 
+        By default the table is read through a single connection. Large tables can be read in parallel
+        by either giving a numeric `partition_column` together with `lower_bound`, `upper_bound` and
+        `num_partitions`, or a list of `predicates`, each of them defines one partition.
+
         # Arguments
         url (str): URL to the JDBC server
         table_name (str): name of the table
         user_name (str): JDBC user name
         password (str): JDBC password
+        columns (list): names of the columns to be read, only these are selected by the database
+        condition (Column): filter on the rows to be read, translated into the `WHERE` clause of the query
+        partition_column (str): name of a numeric, date or timestamp column used to partition the table
+        lower_bound: minimum value of `partition_column`, used to decide the partition stride.
+            Rows with smaller values are still read, in the first partition.
+        upper_bound: maximum value of `partition_column`, used to decide the partition stride.
+            Rows with larger values are still read, in the last partition.
+        num_partitions (int): number of partitions, which is also the maximum number of concurrent
+            JDBC connections
+        fetch_size (int): number of rows to fetch per round trip to the JDBC server
+        predicates (list): list of SQL `WHERE` conditions (as strings), one for each partition.
+            Cannot be used together with `partition_column`.
 
         # Returns
         Dataframe: the Cebes Dataframe object created from the data source
         """
-        return self._read({'jdbc': {'url': url, 'tableName': table_name,
-                                    'userName': user_name,
-                                    'passwordBase64': base64.urlsafe_b64encode(password)}})
+        request = Session._jdbc_request(url, table_name, user_name=user_name, password=password,
+                                        partition_column=partition_column, lower_bound=lower_bound,
+                                        upper_bound=upper_bound, num_partitions=num_partitions,
+                                        fetch_size=fetch_size, predicates=predicates)
+        return self._read(request, columns=columns, condition=condition)
+
+    @staticmethod
+    def _jdbc_request(url, table_name, user_name='', password='', partition_column=None, lower_bound=None,
+                      upper_bound=None, num_partitions=None, fetch_size=None, predicates=None):
+        """
+        Helper to verify the arguments of #Session.read_jdbc
+        Return the ``storage/read`` request for the JDBC table
+        """
+        jdbc_options = {'url': url, 'tableName': table_name, 'userName': user_name,
+                        'passwordBase64': base64.urlsafe_b64encode(password.encode('utf-8')).decode('ascii')}
+
+        partition_args = (lower_bound, upper_bound, num_partitions)
+        if partition_column is not None:
+            require(isinstance(partition_column, six.text_type) and partition_column != '',
+                    'partition_column: expect a column name, got {!r}'.format(partition_column))
+            require(all(v is not None for v in partition_args),
+                    'lower_bound, upper_bound and num_partitions must be specified along with partition_column')
+            require(predicates is None, 'predicates cannot be used together with partition_column')
+            require(lower_bound <= upper_bound, 'lower_bound ({!r}) must not be greater than upper_bound ({!r})'.format(
+                lower_bound, upper_bound))
+            jdbc_options.update({'partitionColumn': partition_column,
+                                 'lowerBound': '{}'.format(lower_bound),
+                                 'upperBound': '{}'.format(upper_bound)})
+        else:
+            require(lower_bound is None and upper_bound is None,
+                    'lower_bound and upper_bound can only be used along with partition_column')
+
+        if num_partitions is not None:
+            require(is_positive_integer(num_partitions),
+                    'num_partitions: expect a positive integer, got {!r}'.format(num_partitions))
+            jdbc_options['numPartitions'] = int(num_partitions)
+
+        if fetch_size is not None:
+            require(is_positive_integer(fetch_size),
+                    'fetch_size: expect a positive integer, got {!r}'.format(fetch_size))
+            jdbc_options['fetchSize'] = int(fetch_size)
+
+        if predicates is not None:
+            predicates = list(predicates)
+            require(len(predicates) > 0 and all(isinstance(p, six.text_type) for p in predicates),
+                    'predicates: expect a non-empty list of SQL conditions, got {!r}'.format(predicates))
+            jdbc_options['predicates'] = predicates
+
+        return {'jdbc': jdbc_options}
 
-    def read_hive(self, table_name=''):
+    def read_hive(self, table_name='', columns=None, condition=None):
         """
         Read a Dataframe from Hive table of the given name
 
         # Arguments
         table_name (str): name of the Hive table to read data from
+        columns (list): names of the columns to be read, pruned in Parquet and ORC tables
+        condition (Column): filter on the rows to be read, skipping partitions when it is on partition columns
 
         # Returns
         Dataframe: The Cebes Dataframe object created from Hive table
         """
-        return self._read({'hive': {'tableName': table_name}})
+        return self._read({'hive': {'tableName': table_name}}, columns=columns, condition=condition)
 
-    def read_s3(self, bucket, key, access_key, secret_key, region=None, fmt='csv', options=None):
+    def read_s3(self, bucket, key, access_key, secret_key, region=None, fmt='csv', options=None,
+                columns=None, condition=None):
         """
         Read a Dataframe from files stored in Amazon S3.
 
@@ -271,6 +469,8 @@ class Session(object):
             - #ParquetReadOptions when `fmt='parquet'`
 
          Other formats do not need additional options
+        columns (list): names of the columns to be read, pruned in `parquet` and `orc` files
+        condition (Column): filter on the rows to be read, pushed down to `parquet` and `orc` files
 
         # Returns
         Dataframe: the Cebes Dataframe object created from the data source
@@ -281,9 +481,9 @@ class Session(object):
                       'format': fmt}
         if region:
             s3_options['regionName'] = region
-        return self._read({'s3': s3_options, 'readOptions': options_dict})
+        return self._read({'s3': s3_options, 'readOptions': options_dict}, columns=columns, condition=condition)
 
-    def read_hdfs(self, path, server=None, fmt='csv', options=None):
+    def read_hdfs(self, path, server=None, fmt='csv', options=None, columns=None, condition=None):
         """
         Load a dataset from HDFS.
 
@@ -299,6 +499,8 @@ class Session(object):
             - #ParquetReadOptions when `fmt='parquet'`
 
          Other formats do not need additional options
+        columns (list): names of the columns to be read, pruned in `parquet` and `orc` files
+        condition (Column): filter on the rows to be read, pushed down to `parquet` and `orc` files
 
         # Returns
         Dataframe: the Cebes Dataframe object created from the data source
@@ -307,14 +509,20 @@ class Session(object):
         hdfs_options = {'path': path, 'format': fmt}
         if server:
             hdfs_options['uri'] = server
-        return self._read({'hdfs': hdfs_options, 'readOptions': options_dict})
+        return self._read({'hdfs': hdfs_options, 'readOptions': options_dict},
+                          columns=columns, condition=condition)
 
-    def read_local(self, path, fmt='csv', options=None):
+    def read_local(self, path, fmt='csv', options=None, columns=None, condition=None,
+                   schema=None, cache_schema=True, max_upload_workers=4, timeout=None):
         """
-        Upload a file from the local machine to the server, and create a :class:`Dataframe` out of it.
+        Upload files from the local machine to the server, and create a :class:`Dataframe` out of them.
 
         # Arguments
-        path (str): path to the local file
+        path (str, list): path to the local file, a directory, or a glob pattern (e.g. `/data/part-*.csv`),
+            or a list of those. All the matched files are uploaded and read into a single Dataframe.
+            In directories, only the files with an extension of the format (e.g. `.csv`, `.csv.gz` or `.tsv`
+            for `csv`, `.parquet` for `parquet`) or without any extension (e.g. `part-00000`) are read, and
+            hidden files and files whose name starts with `_` (e.g. `_SUCCESS`) are ignored.
         fmt (str): format of the file, can be `csv`, `json`, `orc`, `parquet`, `text`
         options: Additional options that dictate how the files are going to be read.
             If specified, this can be:
@@ -324,46 +532,153 @@ class Session(object):
             - #ParquetReadOptions when `fmt='parquet'`
 
          Other formats do not need additional options
+        columns (list): names of the columns to be read, pruned in `parquet` and `orc` files
+        condition (Column): filter on the rows to be read, pushed down to `parquet` and `orc` files
+        schema (Schema): the schema of the file, only for `csv` and `json`.
+            If specified, the server does not need to infer the schema from the data.
+            See #Schema.from_pandas for a way to derive it from a pandas DataFrame.
+        cache_schema (bool): whether to cache the schema inferred by the server for this file
+            (`csv` files read with `infer_schema=True`, or `json` files), so that later reads of
+            the same content with the same options skip the schema inference.
+            The cache is keyed by the hash of the file content and kept in ``~/.cebes/schemas.json``.
+        max_upload_workers (int): maximum number of files uploaded concurrently
+        timeout (float): deadline of the upload, in seconds. See #Session.deadline
 
         # Returns
         Dataframe: the Cebes Dataframe object created from the data source
         """
+        # fail fast, before uploading the files
         options_dict = Session._verify_data_format(fmt=fmt, options=options)
-        server_path = self._client.upload(path)['path']
-        return self._read({'localFs': {'path': server_path, 'format': fmt}, 'readOptions': options_dict})
+        fmt = fmt.lower()
+        Session._pushdown_request(columns, condition)
+        if schema is not None:
+            require(fmt in ('csv', 'json'), 'schema can only be specified for csv and json files')
+            require(isinstance(schema, Schema), 'schema: expect a Schema object, got {!r}'.format(schema))
+        require(max_upload_workers > 0, 'max_upload_workers must be positive, got {!r}'.format(max_upload_workers))
+        paths = Session._expand_local_paths(path, fmt)
+        uploaded = self._client.upload_many(paths, max_workers=max_upload_workers, timeout=timeout)
+
+        # content hash of the files, used for caching the schema
+        if len(uploaded) == 1:
+            digest = uploaded[0]['sha256']
+        else:
+            digest = hashlib.sha256(' '.join(u['sha256'] for u in uploaded).encode('ascii')).hexdigest()
+
+        schema_json = None
+        cache_key = None
+        if schema is not None:
+            schema_json = schema.to_json()
+        elif cache_schema and (fmt == 'json' or (fmt == 'csv' and options_dict.get('inferSchema') == 'true')):
+            cache_key = Session._schema_cache_key(digest, fmt, options_dict)
+            schema_json = self._schema_cache.get(cache_key)
+
+        if len(uploaded) == 1:
+            local_fs = {'path': uploaded[0]['path'], 'format': fmt}
+        else:
+            local_fs = {'paths': [u['path'] for u in uploaded], 'format': fmt}
+        request = {'localFs': local_fs, 'readOptions': options_dict}
+        if schema_json is not None:
+            request['schema'] = schema_json
+            if 'inferSchema' in options_dict:
+                request['readOptions'] = dict(options_dict, inferSchema='false')
+
+        df = self._read(request, columns=columns, condition=condition)
+        if cache_key is not None and schema_json is None and columns is None:
+            self._schema_cache.put(cache_key, df.schema.to_json())
+        return df
 
-    def read_csv(self, path, options=None):
+    @staticmethod
+    def _expand_local_paths(path, fmt='csv'):
+        """
+        Helper to expand the path given to #Session.read_local into the sorted list of files to be uploaded.
+        Files given explicitly or matched by a glob pattern are always kept, while only the files of
+        the given format (see ``_LOCAL_FILE_EXTENSIONS``) are taken from directories.
+        """
+        extensions = _LOCAL_FILE_EXTENSIONS.get(fmt, ())
+
+        def _in_format(name):
+            suffixes = ['.{}'.format(s) for s in name.lower().split('.')[1:]]
+            return not suffixes or any(s in extensions for s in suffixes)
+
+        patterns = [path] if isinstance(path, six.string_types) else list(path)
+        require(len(patterns) > 0, 'path: expect a path or a list of paths, got {!r}'.format(path))
+
+        files = []
+        seen = set()
+        for pattern in patterns:
+            require(isinstance(pattern, six.string_types), 'path: expect a string, got {!r}'.format(pattern))
+            pattern = os.path.expanduser(pattern)
+            if os.path.isdir(pattern):
+                matched = [os.path.join(pattern, name) for name in sorted(os.listdir(pattern))
+                           if not name.startswith(('.', '_')) and _in_format(name) and
+                           os.path.isfile(os.path.join(pattern, name))]
+            elif any(c in pattern for c in '*?['):
+                matched = sorted(p for p in glob.glob(pattern) if os.path.isfile(p))
+            else:
+                require(os.path.isfile(pattern), 'File not found: {}'.format(pattern))
+                matched = [pattern]
+            require(len(matched) > 0, 'No file found in {}'.format(pattern))
+            files.extend(f for f in matched if f not in seen)
+            seen.update(matched)
+        return files
+
+    @staticmethod
+    def _schema_cache_key(digest, fmt, options_dict):
+        """Key of a file in the schema cache, which depends on its content hash and how it is read"""
+        return '{}:{}:{}'.format(digest, fmt, json.dumps(options_dict, sort_keys=True))
+
+    def read_csv(self, path, options=None, columns=None, condition=None, schema=None, cache_schema=True,
+                 max_upload_workers=4, timeout=None):
         """
         Upload a local CSV file to the server, and create a Dataframe out of it.
 
         # Arguments
-        path (str): path to the local CSV file
+        path (str, list): path to the local CSV file, a directory or a glob pattern, or a list of those.
+            See #Session.read_local
         options (CsvReadOptions): Additional options that dictate how the files are going to be read.
             Must be either None or a :class:`CsvReadOptions` object
+        columns (list): names of the columns to be read, the whole files are still parsed
+        condition (Column): filter on the rows to be read, applied while the files are parsed
+        schema (Schema): the schema of the file. If specified, `infer_schema` in `options` is ignored.
+        cache_schema (bool): whether to cache the schema inferred by the server. See #Session.read_local
+        max_upload_workers (int): maximum number of files uploaded concurrently
+        timeout (float): deadline of the upload, in seconds. See #Session.deadline
 
         # Returns
         Dataframe: the Cebes Dataframe object created from the data source
         """
-        return self.read_local(path=path, fmt='csv', options=options)
+        return self.read_local(path=path, fmt='csv', options=options, columns=columns, condition=condition,
+                               schema=schema, cache_schema=cache_schema, max_upload_workers=max_upload_workers,
+                               timeout=timeout)
 
-    def read_json(self, path, options=None):
+    def read_json(self, path, options=None, columns=None, condition=None, schema=None, cache_schema=True,
+                 max_upload_workers=4, timeout=None):
         """
         Upload a local JSON file to the server, and create a Dataframe out of it.
 
         # Arguments
-        path (str): path to the local JSON file
+        path (str, list): path to the local JSON file, a directory or a glob pattern, or a list of those.
+            See #Session.read_local
         options (JsonReadOptions): Additional options that dictate how the files are going to be read.
             Must be either None or a :class:`JsonReadOptions` object
+        columns (list): names of the columns to be read, the whole files are still parsed
+        condition (Column): filter on the rows to be read, applied while the files are parsed
+        schema (Schema): the schema of the file. If specified, the server does not infer it from the data.
+        cache_schema (bool): whether to cache the schema inferred by the server. See #Session.read_local
+        max_upload_workers (int): maximum number of files uploaded concurrently
+        timeout (float): deadline of the upload, in seconds. See #Session.deadline
 
         # Returns
         Dataframe: the Cebes Dataframe object created from the data source
         """
-        return self.read_local(path=path, fmt='json', options=options)
+        return self.read_local(path=path, fmt='json', options=options, columns=columns, condition=condition,
+                               schema=schema, cache_schema=cache_schema, max_upload_workers=max_upload_workers,
+                               timeout=timeout)
 
     def from_pandas(self, df):
         """
         Upload the given `pandas` DataFrame to the server and create a Cebes Dataframe out of it.
-        Types are preserved on a best-efforts basis.
+        Types are preserved on a best-efforts basis, using the schema derived by #Schema.from_pandas.
 
         # Arguments
         df (pd.DataFrame): a pandas DataFrame object
@@ -373,15 +688,15 @@ class Session(object):
         """
         require(isinstance(df, pd.DataFrame), 'Must be a pandas DataFrame object. Got {}'.format(type(df)))
         with tempfile.NamedTemporaryFile('w', prefix='cebes', delete=False) as f:
+            # with microseconds, the precision of Spark timestamps
             df.to_csv(path_or_buf=f, index=False, sep=',', quotechar='"', escapechar='\\', header=True,
-                      na_rep='', date_format='yyyy-MM-dd\'T\'HH:mm:ss.SSSZZ')
+                      na_rep='', date_format='%Y-%m-%dT%H:%M:%S.%f')
             file_name = f.name
 
-        csv_options = CsvReadOptions(infer_schema=True,
-                                     sep=',', quote='"', escape='\\', header=True,
-                                     null_value='', date_format='yyyy-MM-dd\'T\'HH:mm:ss.SSSZZ',
-                                     timestamp_format='yyyy-MM-dd\'T\'HH:mm:ss.SSSZZ')
-        cebes_df = self.read_csv(file_name, csv_options)
+        csv_options = CsvReadOptions(sep=',', quote='"', escape='\\', header=True,
+                                     null_value='', date_format='yyyy-MM-dd\'T\'HH:mm:ss.SSSSSS',
+                                     timestamp_format='yyyy-MM-dd\'T\'HH:mm:ss.SSSSSS')
+        cebes_df = self.read_csv(file_name, csv_options, schema=Schema.from_pandas(df))
         try:
             os.remove(file_name)
         except IOError:
@@ -396,8 +711,10 @@ class Session(object):
         dict: a dict of datasets, currently has only one element:
             `{'cylinder_bands': Dataframe}`
         """
-        response = self._client.post_and_wait('test/loaddata', data={'datasets': ['cylinder_bands']})
-        return {'cylinder_bands': Dataframe.from_json(response['dataframes'][0])}
+        with self._dataframe_tracker.requesting():
+            response = self._client.post_and_wait('test/loaddata', data={'datasets': ['cylinder_bands']})
+            return {'cylinder_bands': Dataframe.from_json(response['dataframes'][0],
+                                                          tracker=self._dataframe_tracker)}
 
 
 ########################################################################
@@ -411,7 +728,7 @@ class _TagHelper(object):
     """
 
     def __init__(self, client, cmd_prefix='df', object_class=Dataframe,
-                 response_class=responses.TaggedDataframeResponse):
+                 response_class=responses.TaggedDataframeResponse, tracker=None):
         """
 
         :param client:
@@ -420,47 +737,66 @@ class _TagHelper(object):
         :type object_class: Type
         :param response_class:
         :type response_class: Type
+        :param tracker: the tracker of the objects, which must not release the tagged ones
+        :type tracker: DataframeTracker
         """
         self._object_cls = object_class
         self._client = client
         self._cmd_prefix = cmd_prefix
         self._response_class = response_class
+        self._tracker = tracker
 
-    def get(self, identifier):
+    def get(self, identifier, timeout=None):
         """
         Get the object from the given identifier, which can be a tag or a UUID
 
         :param identifier: either a tag or an ID of the object to be retrieved.
         :type identifier: six.text_type
+        :param timeout: deadline of the call, in seconds. See :func:`Session.deadline`
         """
-        return self._object_cls.from_json(self._client.post_and_wait('{}/get'.format(self._cmd_prefix), identifier))
+        with self._requesting():
+            obj = self._from_json(self._client.post_and_wait(
+                '{}/get'.format(self._cmd_prefix), identifier, timeout=timeout))
+            if self._tracker is not None:
+                self._tracker.pin(obj.id)
+        return obj
 
-    def tag(self, obj, tag):
+    def tag(self, obj, tag, timeout=None):
         """
         Add the given tag to the given object, return the object itself
 
         :param obj: the object to be tagged
         :param tag: new tag for the object
         :type tag: six.text_type
+        :param timeout: deadline of the call, in seconds. See :func:`Session.deadline`
         :return: the object itself if success
         """
         require(isinstance(obj, self._object_cls), 'Unsupported object of type {}'.format(type(obj)))
-        self._client.post_and_wait('{}/tagadd'.format(self._cmd_prefix), {'tag': tag, 'objectId': obj.id})
+        self._client.post_and_wait('{}/tagadd'.format(self._cmd_prefix), {'tag': tag, 'objectId': obj.id},
+                                   timeout=timeout)
+        if self._tracker is not None:
+            self._tracker.pin(obj.id)
         return obj
 
-    def untag(self, tag):
+    def untag(self, tag, timeout=None):
         """
         Untag the object of the given tag. Note that if the object
         has more than 1 tag, it can still be accessed using other tags.
 
         :param tag: the tag of the object to be removed
         :type tag: six.text_type
+        :param timeout: deadline of the call, in seconds. See :func:`Session.deadline`
         :return: the object itself if success
         """
-        return self._object_cls.from_json(self._client.post_and_wait(
-            '{}/tagdelete'.format(self._cmd_prefix), {'tag': tag}))
+        with self._requesting():
+            obj = self._from_json(self._client.post_and_wait(
+                '{}/tagdelete'.format(self._cmd_prefix), {'tag': tag}, timeout=timeout))
+        if self._tracker is not None:
+            # if it has other tags, the server does not release it
+            self._tracker.unpin(obj.id)
+        return obj
 
-    def list(self, pattern=None, max_count=100):
+    def list(self, pattern=None, max_count=100, timeout=None):
         """
         Get the list of tagged objects.
 
@@ -469,12 +805,29 @@ class _TagHelper(object):
             ``*`` to match zero or more characters.
         :type pattern: six.text_type
         :param max_count: maximum number of entries to be returned
+        :param timeout: deadline of the call, in seconds. See :func:`Session.deadline`
         :rtype: responses._TaggedResponse
         """
         data = {'maxCount': max_count}
         if pattern is not None:
             data['pattern'] = pattern
-        return self._response_class(self._client.post_and_wait('{}/tags'.format(self._cmd_prefix), data))
+        return self._response_class(self._client.post_and_wait(
+            '{}/tags'.format(self._cmd_prefix), data, timeout=timeout))
+
+    @contextmanager
+    def _requesting(self):
+        """Context of a request returning an object, see :func:`DataframeTracker.requesting`"""
+        if self._tracker is None:
+            yield
+        else:
+            with self._tracker.requesting():
+                yield
+
+    def _from_json(self, js_data):
+        """Parse the object, tracked by the tracker of this helper if it has one"""
+        if self._tracker is None:
+            return self._object_cls.from_json(js_data)
+        return self._object_cls.from_json(js_data, tracker=self._tracker)
 
 
 class _PipelineHelper(_TagHelper):
@@ -620,13 +973,9 @@ class _PipelineHelper(_TagHelper):
 ########################################################################
 
 
-class ReadOptions(object):
-    PERMISSIVE = 'PERMISSIVE'
-    DROPMALFORMED = 'DROPMALFORMED'
-    FAILFAST = 'FAILFAST'
-
+class _FileOptions(object):
     """
-    Contain options for read commands
+    Base class of the options for reading and writing files
     """
 
     def __init__(self, **kwargs):
@@ -664,6 +1013,16 @@ class ReadOptions(object):
         return d
 
 
+class ReadOptions(_FileOptions):
+    PERMISSIVE = 'PERMISSIVE'
+    DROPMALFORMED = 'DROPMALFORMED'
+    FAILFAST = 'FAILFAST'
+
+    """
+    Contain options for read commands
+    """
+
+
 class CsvReadOptions(ReadOptions):
     """
     Options for reading CSV files.
@@ -780,3 +1139,49 @@ class ParquetReadOptions(ReadOptions):
     def __init__(self, merge_schema=True):
         """See class docstring for documentation."""
         super(ParquetReadOptions, self).__init__(merge_schema=merge_schema)
+
+
+class WriteOptions(_FileOptions):
+    """
+    Contain options for write commands, see #Dataframe.write
+    """
+
+
+class CsvWriteOptions(WriteOptions):
+    """
+    Options for writing CSV files.
+
+    # Arguments
+    sep: sets the single character as a separator for each field and value.
+    quote: sets the single character used for escaping quoted values where the separator can be part of the value.
+    escape: sets the single character used for escaping quotes inside an already quoted value.
+    header: writes the names of columns as the first line.
+    null_value: sets the string representation of a null value.
+    date_format: sets the string that indicates a date format.
+        Custom date formats follow the formats at `java.text.SimpleDateFormat`. This applies to date type.
+    timestamp_format: sets the string that indicates a timestamp format.
+        Custom date formats follow the formats at `java.text.SimpleDateFormat`. This applies to timestamp type.
+    """
+
+    def __init__(self, sep=',', quote='"', escape='\\', header=True, null_value='',
+                 date_format='yyyy-MM-dd', timestamp_format='yyyy-MM-dd\'T\'HH:mm:ss.SSSZZ'):
+        """See class docstring for documentation."""
+        super(CsvWriteOptions, self).__init__(sep=sep, quote=quote, escape=escape, header=header,
+                                              null_value=null_value, date_format=date_format,
+                                              timestamp_format=timestamp_format)
+
+
+class JsonWriteOptions(WriteOptions):
+    """
+    Options for writing Json files
+
+    # Arguments
+    date_format: sets the string that indicates a date format.
+        Custom date formats follow the formats at `java.text.SimpleDateFormat`. This applies to date type
+    timestamp_format: sets the string that indicates a timestamp format.
+        Custom date formats follow the formats at `java.text.SimpleDateFormat`. This applies to timestamp type
+    """
+
+    def __init__(self, date_format='yyyy-MM-dd', timestamp_format="yyyy-MM-dd'T'HH:mm:ss.SSSZZ"):
+        """See class docstring for documentation."""
+        super(JsonWriteOptions, self).__init__(date_format=date_format, timestamp_format=timestamp_format)
@@ -0,0 +1,235 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import base64
+
+import six
+
+from pycebes.core.dataframe import _parse_column_names
+from pycebes.core.session import CsvWriteOptions, JsonWriteOptions
+from pycebes.internal.helpers import require, is_positive_integer
+
+
+class DataframeWriter(object):
+    """
+    Write a #Dataframe to an external storage. Use it through #Dataframe.write:
+
+    ```python
+    df.write.parquet('/data/sales', mode=DataframeWriter.OVERWRITE, partition_by=['year', 'month'])
+    df.write.hive('sales', partition_by='year', bucket_by='customer', num_buckets=32)
+    ```
+
+    The data is written by the server, in parallel: each partition of the Dataframe is written
+    by its own task, so files are written as one file per partition (and per value of the
+    ``partition_by`` columns). Use #Dataframe.coalesce before writing a small Dataframe to avoid
+    many tiny files, or #Dataframe.repartition to write a large one with more parallelism.
+    """
+
+    # what to do when the destination already exists
+    APPEND = 'append'
+    OVERWRITE = 'overwrite'
+    ERROR_IF_EXISTS = 'error'
+    IGNORE = 'ignore'
+
+    _MODES = (APPEND, OVERWRITE, ERROR_IF_EXISTS, IGNORE)
+    _COMPRESSIONS = {
+        'parquet': ('none', 'snappy', 'gzip', 'lzo', 'zstd'),
+        'orc': ('none', 'snappy', 'zlib', 'lzo'),
+        'csv': ('none', 'bzip2', 'gzip', 'lz4', 'snappy', 'deflate'),
+        'json': ('none', 'bzip2', 'gzip', 'lz4', 'snappy', 'deflate'),
+    }
+
+    def __init__(self, df):
+        """
+        Should not be used by end-users, use #Dataframe.write instead.
+
+        # Arguments
+        df (Dataframe): the Dataframe to be written
+        """
+        self._df = df
+
+    def parquet(self, path, server=None, mode=ERROR_IF_EXISTS, partition_by=None, compression=None):
+        """
+        Write the Dataframe as Parquet files on HDFS
+
+        # Arguments
+        path (str): path to the output directory on HDFS, e.g. `/data/dataset1`
+        server (str): Host name and port, e.g. `hdfs://server:9000`
+        mode (str): what to do when the output directory exists, one of #DataframeWriter.APPEND,
+            #DataframeWriter.OVERWRITE, #DataframeWriter.ERROR_IF_EXISTS or #DataframeWriter.IGNORE
+        partition_by (list): names of the columns to partition the output by, one sub-directory per value
+        compression (str): compression codec, can be `none`, `snappy`, `gzip`, `lzo` or `zstd`.
+            None means the default codec of the server
+        """
+        self._write(self._hdfs_request(path, server, 'parquet', mode=mode, partition_by=partition_by,
+                                       compression=compression))
+
+    def orc(self, path, server=None, mode=ERROR_IF_EXISTS, partition_by=None, compression=None):
+        """
+        Write the Dataframe as ORC files on HDFS
+
+        # Arguments
+        path (str): path to the output directory on HDFS, e.g. `/data/dataset1`
+        server (str): Host name and port, e.g. `hdfs://server:9000`
+        mode (str): what to do when the output directory exists, see #DataframeWriter.parquet
+        partition_by (list): names of the columns to partition the output by, one sub-directory per value
+        compression (str): compression codec, can be `none`, `snappy`, `zlib` or `lzo`.
+            None means the default codec of the server
+        """
+        self._write(self._hdfs_request(path, server, 'orc', mode=mode, partition_by=partition_by,
+                                       compression=compression))
+
+    def csv(self, path, server=None, mode=ERROR_IF_EXISTS, partition_by=None, compression=None, options=None):
+        """
+        Write the Dataframe as CSV files on HDFS
+
+        # Arguments
+        path (str): path to the output directory on HDFS, e.g. `/data/dataset1`
+        server (str): Host name and port, e.g. `hdfs://server:9000`
+        mode (str): what to do when the output directory exists, see #DataframeWriter.parquet
+        partition_by (list): names of the columns to partition the output by, one sub-directory per value
+        compression (str): compression codec, can be `none`, `bzip2`, `gzip`, `lz4`, `snappy` or `deflate`
+        options (CsvWriteOptions): additional options that dictate how the files are written
+        """
+        require(options is None or isinstance(options, CsvWriteOptions),
+                'options must be a {} object. Got {!r}'.format(CsvWriteOptions.__name__, options))
+        self._write(self._hdfs_request(path, server, 'csv', mode=mode, partition_by=partition_by,
+                                       compression=compression, options=options))
+
+    def json(self, path, server=None, mode=ERROR_IF_EXISTS, partition_by=None, compression=None, options=None):
+        """
+        Write the Dataframe as Json files on HDFS, one record per line
+
+        # Arguments
+        path (str): path to the output directory on HDFS, e.g. `/data/dataset1`
+        server (str): Host name and port, e.g. `hdfs://server:9000`
+        mode (str): what to do when the output directory exists, see #DataframeWriter.parquet
+        partition_by (list): names of the columns to partition the output by, one sub-directory per value
+        compression (str): compression codec, can be `none`, `bzip2`, `gzip`, `lz4`, `snappy` or `deflate`
+        options (JsonWriteOptions): additional options that dictate how the files are written
+        """
+        require(options is None or isinstance(options, JsonWriteOptions),
+                'options must be a {} object. Got {!r}'.format(JsonWriteOptions.__name__, options))
+        self._write(self._hdfs_request(path, server, 'json', mode=mode, partition_by=partition_by,
+                                       compression=compression, options=options))
+
+    def jdbc(self, url, table_name, user_name='', password='', mode=ERROR_IF_EXISTS,
+             num_partitions=None, batch_size=None):
+        """
+        Write the Dataframe into a JDBC table
+
+        # Arguments
+        url (str): URL to the JDBC server
+        table_name (str): name of the table
+        user_name (str): JDBC user name
+        password (str): JDBC password
+        mode (str): what to do when the table exists, see #DataframeWriter.parquet
+        num_partitions (int): maximum number of concurrent JDBC connections. If the Dataframe has
+            more partitions, it is coalesced to this number before writing
+        batch_size (int): number of rows to insert per round trip to the JDBC server
+        """
+        self._write(self._jdbc_request(url, table_name, user_name=user_name, password=password, mode=mode,
+                                       num_partitions=num_partitions, batch_size=batch_size))
+
+    def hive(self, table_name, mode=ERROR_IF_EXISTS, partition_by=None, bucket_by=None, num_buckets=None,
+             sort_by=None, fmt='parquet', compression=None):
+        """
+        Write the Dataframe into a Hive table
+
+        # Arguments
+        table_name (str): name of the Hive table
+        mode (str): what to do when the table exists, see #DataframeWriter.parquet
+        partition_by (list): names of the columns to partition the table by
+        bucket_by (list): names of the columns to bucket the table by. Joins and aggregations on these
+            columns do not need to shuffle the table when it is read back
+        num_buckets (int): number of buckets, must be given along with `bucket_by`
+        sort_by (list): names of the columns to sort each bucket by, only with `bucket_by`
+        fmt (str): format of the files of the table, can be `parquet`, `orc`, `csv` or `json`
+        compression (str): compression codec, see the write function of the chosen format
+        """
+        self._write(self._hive_request(table_name, mode=mode, partition_by=partition_by, bucket_by=bucket_by,
+                                       num_buckets=num_buckets, sort_by=sort_by, fmt=fmt,
+                                       compression=compression))
+
+    def _write(self, request):
+        self._df._record_use()
+        self._df._client.post_and_wait('storage/write', data=request)
+
+    def _base_request(self, mode=ERROR_IF_EXISTS, partition_by=None, fmt=None, compression=None, options=None):
+        """
+        Helper to verify the arguments common to all destinations
+        Return the ``storage/write`` request without the destination
+        """
+        require(mode in DataframeWriter._MODES, 'Unrecognized mode: {!r}. Supported values are: {}'.format(
+            mode, ', '.join(DataframeWriter._MODES)))
+        write_options = {} if options is None else options.to_json()
+        if compression is not None:
+            codecs = DataframeWriter._COMPRESSIONS.get(fmt, ())
+            require(compression in codecs, 'Unrecognized compression for {}: {!r}. Supported values are: {}'.format(
+                fmt, compression, ', '.join(codecs)))
+            write_options['compression'] = compression
+
+        return {'df': self._df.id, 'mode': mode, 'partitionBy': self._column_names(partition_by),
+                'writeOptions': write_options}
+
+    def _column_names(self, columns):
+        if columns is None:
+            return []
+        columns = [columns] if isinstance(columns, six.text_type) else list(columns)
+        return _parse_column_names(self._df, *columns)
+
+    def _hdfs_request(self, path, server=None, fmt='parquet', **kwargs):
+        require(isinstance(path, six.text_type) and path != '', 'path: expect a non-empty path, got {!r}'.format(path))
+        hdfs_options = {'path': path, 'format': fmt}
+        if server:
+            hdfs_options['uri'] = server
+        return dict(self._base_request(fmt=fmt, **kwargs), hdfs=hdfs_options)
+
+    def _jdbc_request(self, url, table_name, user_name='', password='', mode=ERROR_IF_EXISTS,
+                      num_partitions=None, batch_size=None):
+        jdbc_options = {'url': url, 'tableName': table_name, 'userName': user_name,
+                        'passwordBase64': base64.urlsafe_b64encode(password.encode('utf-8')).decode('ascii')}
+        if num_partitions is not None:
+            require(is_positive_integer(num_partitions),
+                    'num_partitions: expect a positive integer, got {!r}'.format(num_partitions))
+            jdbc_options['numPartitions'] = int(num_partitions)
+        if batch_size is not None:
+            require(is_positive_integer(batch_size),
+                    'batch_size: expect a positive integer, got {!r}'.format(batch_size))
+            jdbc_options['batchSize'] = int(batch_size)
+        return dict(self._base_request(mode=mode), jdbc=jdbc_options)
+
+    def _hive_request(self, table_name, mode=ERROR_IF_EXISTS, partition_by=None, bucket_by=None, num_buckets=None,
+                      sort_by=None, fmt='parquet', compression=None):
+        require(isinstance(table_name, six.text_type) and table_name != '',
+                'table_name: expect a non-empty table name, got {!r}'.format(table_name))
+        require(fmt in DataframeWriter._COMPRESSIONS, 'Unrecognized data format: {}. Supported values are: {}'.format(
+            fmt, ', '.join(sorted(DataframeWriter._COMPRESSIONS))))
+        hive_options = {'tableName': table_name, 'format': fmt}
+
+        bucket_cols = self._column_names(bucket_by)
+        sort_cols = self._column_names(sort_by)
+        if bucket_cols:
+            require(is_positive_integer(num_buckets),
+                    'num_buckets: expect a positive integer along with bucket_by, got {!r}'.format(num_buckets))
+            require(not set(bucket_cols).intersection(self._column_names(partition_by)),
+                    'A column cannot be used in both partition_by and bucket_by')
+            hive_options.update({'bucketBy': bucket_cols, 'numBuckets': int(num_buckets), 'sortBy': sort_cols})
+        else:
+            require(num_buckets is None and not sort_cols,
+                    'num_buckets and sort_by can only be used along with bucket_by')
+
+        request = self._base_request(mode=mode, partition_by=partition_by, fmt=fmt, compression=compression)
+        return dict(request, hive=hive_options)
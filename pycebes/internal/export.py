@@ -0,0 +1,133 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from pycebes.core.schema import StorageTypes
+from pycebes.internal.helpers import require
+
+"""
+Helpers to decode the files of a Dataframe exported by the server (``df/export``) into pandas
+"""
+
+
+def export_format():
+    """
+    The format the server should export Dataframes in, so that they can be decoded here:
+    `parquet` if pandas has a Parquet engine (pyarrow or fastparquet), `json` (one record per line) otherwise
+    """
+    for engine in ('pyarrow', 'fastparquet'):
+        try:
+            __import__(engine)
+            return 'parquet'
+        except ImportError:
+            continue
+    return 'json'
+
+
+_INTEGER_STORAGE_TYPES = (StorageTypes.SHORT, StorageTypes.INTEGER, StorageTypes.LONG)
+
+
+def _cast_json_columns(df, schema):
+    """
+    Cast the columns decoded from Json to the pandas types of the fields of the given schema.
+    Json only has strings and numbers, so this is where dates and timestamps are parsed, while strings
+    that look like numbers or dates (e.g. `00123`) are kept as they are.
+    """
+    for f in schema.fields:
+        values = df[f.name]
+        storage_type = f.storage_type
+        if storage_type in (StorageTypes.DATE, StorageTypes.TIMESTAMP):
+            # the server writes them in ISO 8601, converted to UTC
+            df[f.name] = pd.to_datetime(values, utc=True).dt.tz_localize(None)
+        elif storage_type in _INTEGER_STORAGE_TYPES:
+            # the nullable integer type keeps large longs exact when there are nulls
+            df[f.name] = values.astype('int64' if values.notnull().all() else 'Int64')
+        elif storage_type in (StorageTypes.FLOAT, StorageTypes.DOUBLE):
+            df[f.name] = values.astype('float64')
+        elif storage_type == StorageTypes.BOOLEAN and values.notnull().all():
+            df[f.name] = values.astype(bool)
+    return df
+
+
+def read_part(path, fmt, schema):
+    """
+    Decode one exported file into a pandas DataFrame
+
+    # Arguments
+    path (str): path to the local file
+    fmt (str): format of the file, `parquet` or `json`
+    schema (Schema): schema of the Dataframe
+    """
+    if fmt == 'parquet':
+        return pd.read_parquet(path).reindex(columns=schema.columns)
+
+    require(fmt == 'json', 'Unsupported export format: {}'.format(fmt))
+    # empty files have no lines, and null fields are left out of the records
+    with open(path, 'rb') as f:
+        empty = f.read(1) == b''
+    df = pd.DataFrame() if empty else pd.read_json(path, lines=True, dtype=False, convert_dates=False)
+    return _cast_json_columns(df.reindex(columns=schema.columns), schema)
+
+
+def read_parts(paths, fmt, schema, max_memory_bytes=None, max_workers=4):
+    """
+    Decode the given exported files concurrently and concatenate them, in order, into one pandas DataFrame
+
+    # Arguments
+    paths (list): local paths to the files, in the order of the partitions
+    fmt (str): format of the files, `parquet` or `json`
+    schema (Schema): schema of the Dataframe
+    max_memory_bytes (int): maximum total size of the decoded files, in bytes. None means no limit
+    max_workers (int): maximum number of files decoded at the same time
+
+    # Returns
+    pd.DataFrame: the concatenated DataFrame
+
+    # Raises
+    MemoryError: if the decoded files take more than ``max_memory_bytes``. The decoding is stopped
+        as soon as this is known, and the decoded parts are dropped.
+    """
+    require(max_workers > 0, 'max_workers must be positive, got {!r}'.format(max_workers))
+    if not paths:
+        return pd.DataFrame(columns=schema.columns)
+
+    lock = threading.Lock()
+    used = [0]
+
+    def _read(path):
+        df = read_part(path, fmt, schema)
+        with lock:
+            used[0] += int(df.memory_usage(index=True, deep=True).sum())
+            if max_memory_bytes is not None and used[0] > max_memory_bytes:
+                raise MemoryError('The Dataframe takes more than {} bytes in memory. Download it to disk '
+                                  'with Dataframe.download instead, or raise max_memory_bytes'.format(max_memory_bytes))
+        return df
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+        futures = [executor.submit(_read, p) for p in paths]
+        try:
+            frames = [f.result() for f in futures]
+        except BaseException:
+            for f in futures:
+                f.cancel()
+            raise
+
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
@@ -9,7 +9,9 @@
 #
 # See the NOTICE file distributed with this work for information regarding copyright ownership.
 
+import hashlib
 import logging
+import numbers
 
 
 def require(condition, msg='Requirement failed'):
@@ -24,6 +26,26 @@ def require(condition, msg='Requirement failed'):
         raise ValueError(msg)
 
 
+def is_integer(value):
+    """
+    Check whether the given value is an integer, including numpy integers but not booleans
+
+    :param value: the value to check
+    :return: True if ``value`` is an integer
+    """
+    return isinstance(value, numbers.Integral) and not isinstance(value, bool)
+
+
+def is_positive_integer(value):
+    """
+    Check whether the given value is a positive integer, see :func:`is_integer`
+
+    :param value: the value to check
+    :return: True if ``value`` is a positive integer
+    """
+    return is_integer(value) and value > 0
+
+
 def get_logger(name):
     """
     Get a logger with default configuration and given name
@@ -39,3 +61,20 @@ def get_logger(name):
         ch.setFormatter(formatter)
         logger.addHandler(ch)
     return logger
+
+
+def file_digest(path, algorithm='sha256', chunk_size=1 << 20):
+    """
+    Compute the digest of the content of the given file, reading it by chunks
+    so that big files are not loaded into memory
+
+    :param path: path to the file
+    :param algorithm: name of the hash algorithm, as accepted by ``hashlib.new()``
+    :param chunk_size: size of the chunks, in bytes
+    :return: the hex digest
+    """
+    h = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
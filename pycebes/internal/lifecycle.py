@@ -0,0 +1,209 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+
+from pycebes.internal.helpers import get_logger
+
+_logger = get_logger(__name__)
+
+
+class DataframeTracker(object):
+    """
+    Keep track of the Dataframe objects of a session, so that the server can be told to release the
+    Dataframes that are no longer referenced on the client.
+
+    When the last Python object of a Dataframe ID is garbage-collected, the ID is queued for release,
+    unless it is pinned (e.g. because it was tagged). The queued IDs are released in one request
+    when there are ``batch_size`` of them, or when #DataframeTracker.release_unused is called.
+
+    A released ID must not be tracked again, otherwise a live Dataframe would point to an object freed
+    on the server. Requests that can return Dataframes are therefore sent within
+    #DataframeTracker.requesting, and a release waits for them to be done (including tracking their
+    results), while new ones wait for the release to be done.
+    """
+
+    def __init__(self, client, batch_size=50, on_release=None):
+        """
+        # Arguments
+        client (Client): the client used to release the Dataframes
+        batch_size (int): number of unused Dataframes that triggers a release. None means they are only
+            released by #DataframeTracker.release_unused
+        on_release (callable): function called with the list of IDs of the Dataframes after they are released
+        """
+        self._client = client
+        self.batch_size = batch_size
+        self._on_release = on_release
+
+        # finalizers can run in the middle of any other method, on the same thread
+        self._lock = threading.RLock()
+        self._cond = threading.Condition(self._lock)
+        # number of requests within requesting(), per thread so that they can be nested
+        self._requests = 0
+        self._local = threading.local()
+        self._releasing = False
+        self._waiting_releases = 0
+        self._live = Counter()
+        self._pinned = set()
+        self._unused = set()
+        # number of times every Dataframe ID was tracked, to spot the IDs tracked again while being released
+        self._generations = Counter()
+
+    @property
+    def unused(self):
+        """IDs of the Dataframes waiting to be released"""
+        with self._lock:
+            return sorted(self._unused)
+
+    def track(self, df):
+        """Start tracking the given Dataframe object"""
+        with self._lock:
+            self._live[df.id] += 1
+            self._generations[df.id] += 1
+            self._unused.discard(df.id)
+        weakref.finalize(df, self._collected, df.id)
+
+        if self._depth() == 0:
+            # otherwise when the request is done, see requesting()
+            self._release_if_full()
+
+    @contextmanager
+    def requesting(self):
+        """
+        Context of a request that can return Dataframes, which must be tracked before it exits.
+        Dataframes are not released while it is open, and it waits for the ongoing release, if any.
+
+        ```python
+        with tracker.requesting():
+            df = Dataframe.from_json(client.post_and_wait('df/...', data), tracker=tracker)
+        ```
+        """
+        depth = self._depth()
+        if depth == 0:
+            with self._cond:
+                while self._releasing or self._waiting_releases > 0:
+                    self._cond.wait()
+                self._requests += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                with self._cond:
+                    self._requests -= 1
+                    self._cond.notify_all()
+                self._release_if_full()
+
+    def pin(self, df_id):
+        """Never release the given Dataframe ID, e.g. because it is tagged"""
+        with self._lock:
+            self._pinned.add(df_id)
+            self._unused.discard(df_id)
+
+    def unpin(self, df_id):
+        """Undo #DataframeTracker.pin. The Dataframe is queued for release if it is not referenced anymore"""
+        with self._lock:
+            self._pinned.discard(df_id)
+            if self._live[df_id] <= 0:
+                self._unused.add(df_id)
+
+    def release_unused(self):
+        """
+        Tell the server to release the Dataframes that are not referenced on the client anymore
+
+        # Returns
+        list: IDs of the released Dataframes
+        """
+        # the requests of this thread, if any, cannot be waited for
+        own_requests = 1 if self._depth() > 0 else 0
+        with self._cond:
+            self._waiting_releases += 1
+            try:
+                while self._releasing or self._requests > own_requests:
+                    self._cond.wait()
+            finally:
+                self._waiting_releases -= 1
+            # checked again right before sending, in case the IDs were tracked or pinned again
+            df_ids = sorted(i for i in self._unused if self._is_unused(i))
+            self._unused.clear()
+            generations = {i: self._generations[i] for i in df_ids}
+            self._releasing = bool(df_ids)
+            self._cond.notify_all()
+        if not df_ids:
+            return []
+        try:
+            self._client.post_and_wait('df/release', {'dfIds': df_ids})
+        except BaseException:
+            with self._cond:
+                self._unused.update(i for i in df_ids if self._generations[i] == generations[i] and
+                                    self._is_unused(i))
+                self._releasing = False
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            self._releasing = False
+            self._cond.notify_all()
+
+        with self._lock:
+            # only possible for Dataframes tracked outside of requesting()
+            revived = [i for i in df_ids if self._generations[i] != generations[i]]
+            for i in df_ids:
+                if i not in revived and self._is_unused(i):
+                    del self._generations[i]
+        if revived:
+            _logger.warning('Dataframes {} were tracked again while being released on the server. '
+                            'Send the requests returning them within DataframeTracker.requesting'.format(
+                                ', '.join(revived)))
+        if self._on_release is not None:
+            self._on_release([i for i in df_ids if i not in revived])
+        return df_ids
+
+    def clear(self):
+        """Forget all the Dataframes waiting to be released"""
+        with self._lock:
+            self._unused.clear()
+
+    def _depth(self):
+        """Number of nested requesting() contexts open in the current thread"""
+        return getattr(self._local, 'depth', 0)
+
+    def _release_if_full(self):
+        """Release the unused Dataframes if there are ``batch_size`` of them"""
+        with self._lock:
+            n_unused = len(self._unused)
+        if self.batch_size is None or n_unused < self.batch_size:
+            return
+        try:
+            self.release_unused()
+        except Exception as e:
+            # the Dataframes will be released next time
+            _logger.warning('Failed to release {} unused Dataframes: {}'.format(n_unused, e))
+
+    def _is_unused(self, df_id):
+        """Whether the given Dataframe ID can be released. Must be called with the lock held"""
+        return self._live[df_id] <= 0 and df_id not in self._pinned
+
+    def _collected(self, df_id):
+        with self._lock:
+            self._live[df_id] -= 1
+            if self._live[df_id] <= 0:
+                del self._live[df_id]
+                if df_id not in self._pinned:
+                    self._unused.add(df_id)
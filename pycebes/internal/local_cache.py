@@ -0,0 +1,102 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import fcntl
+import json
+import os
+from collections import OrderedDict
+
+
+class LocalCache(object):
+    """
+    A small key-value store kept in a JSON file on the local machine, normally under ``~/.cebes``.
+
+    The file is locked during every access, so that it can be shared between processes.
+    When there are more than ``max_entries`` entries, the least recently written ones are evicted.
+    """
+
+    def __init__(self, name, cache_dir='~/.cebes', max_entries=1000, file_mode=0o644):
+        """
+        # Arguments
+        name (str): name of the cache, used as the file name
+        cache_dir (str): directory holding the cache file
+        max_entries (int): maximum number of entries kept in the cache
+        file_mode (int): permissions of the cache file, e.g. ``0o600`` for caches holding secrets
+        """
+        self._cache_dir = os.path.expanduser(cache_dir)
+        self._file_path = os.path.join(self._cache_dir, '{}.json'.format(name))
+        self._max_entries = max_entries
+        self._file_mode = file_mode
+
+    @property
+    def file_path(self):
+        return self._file_path
+
+    def _open(self):
+        os.makedirs(self._cache_dir, mode=0o700, exist_ok=True)
+        fd = os.open(self._file_path, os.O_RDWR | os.O_CREAT, self._file_mode)
+        if os.fstat(fd).st_mode & 0o777 != self._file_mode:
+            os.fchmod(fd, self._file_mode)
+        return os.fdopen(fd, 'r+')
+
+    def _update(self, func):
+        """
+        Apply ``func`` on the content of the cache (an OrderedDict) while holding the lock.
+        The content is written back if ``func`` returns True.
+        """
+        with self._open() as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    entries = json.load(f, object_pairs_hook=OrderedDict)
+                except ValueError:
+                    entries = OrderedDict()
+                if not isinstance(entries, OrderedDict):
+                    entries = OrderedDict()
+
+                if func(entries):
+                    while len(entries) > self._max_entries:
+                        entries.popitem(last=False)
+                    f.seek(0)
+                    f.write(json.dumps(entries))
+                    f.truncate()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get(self, key, default=None):
+        """Return the value of the given key, or ``default`` if it is not in the cache"""
+        result = []
+        self._update(lambda entries: result.append(entries.get(key, default)))
+        return result[0]
+
+    def put(self, key, value):
+        """Set the value of the given key. ``value`` must be JSON-serializable"""
+        def _put(entries):
+            entries.pop(key, None)
+            entries[key] = value
+            return True
+        self._update(_put)
+
+    def remove(self, key):
+        """Remove the given key from the cache. No-op if the key is not in the cache"""
+        self._update(lambda entries: entries.pop(key, None) is not None)
+
+    def clear(self):
+        """Remove all entries in the cache"""
+        def _clear(entries):
+            entries.clear()
+            return True
+        self._update(_clear)
@@ -0,0 +1,120 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import bisect
+import random
+import threading
+from collections import deque
+
+
+class AdaptivePoller(object):
+    """
+    Decide when to poll the status of asynchronous requests, based on how long
+    previous requests of the same command (e.g. ``df/count``) took to complete.
+
+    While the request is younger than the completion times seen so far, the next poll is scheduled
+    at the next of those times, so polls are frequent around the expected completion time and sparse
+    elsewhere. Once the request is older than all of them, the poll interval grows with its age.
+    Commands with fewer than ``min_samples`` recorded completions use the random exponential back-off
+    ``sleep_base * randint(0, [2 ** min(i, 7)] - 1)``, where ``i`` is the number of polls so far.
+
+    Can be used from several threads.
+    """
+
+    def __init__(self, history_size=50, min_samples=3, min_interval=0.05, max_interval=30., tail_factor=0.25):
+        """
+        # Arguments
+        history_size (int): number of completion times kept for every command
+        min_samples (int): number of completion times needed before they are used to schedule the polls
+        min_interval (float): minimum time between two polls, in seconds
+        max_interval (float): maximum time between two polls, in seconds
+        tail_factor (float): once a request is older than all completion times recorded for its command,
+            the time to the next poll is this fraction of its age
+        """
+        self._history_size = history_size
+        self._min_samples = min_samples
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._tail_factor = tail_factor
+
+        # command URI -> deque of completion times, and of the number of status polls of the requests
+        self._durations = {}
+        self._polls = {}
+        self._lock = threading.Lock()
+
+    def next_delay(self, uri, elapsed, n_polls, sleep_base=0.5):
+        """
+        Seconds to wait before polling again a request of the given command
+
+        # Arguments
+        uri (str): the command of the request, or None if it is unknown
+        elapsed (float): seconds since the request was sent
+        n_polls (int): number of times the request was polled so far
+        sleep_base (float): base of the exponential back-off, used when there is not enough history
+        """
+        with self._lock:
+            durations = sorted(self._durations.get(uri, ()))
+
+        if len(durations) < self._min_samples:
+            return sleep_base * random.randint(0, (2 ** min(n_polls, 7)) - 1)
+
+        i = bisect.bisect_right(durations, elapsed)
+        if i < len(durations):
+            delay = durations[i] - elapsed
+        else:
+            delay = elapsed * self._tail_factor
+        return min(self._max_interval, max(self._min_interval, delay))
+
+    def record(self, uri, duration, n_polls):
+        """
+        Record that a request of the given command completed after ``duration`` seconds,
+        and was polled ``n_polls`` times
+        """
+        if uri is None:
+            return
+        with self._lock:
+            if uri not in self._durations:
+                self._durations[uri] = deque(maxlen=self._history_size)
+                self._polls[uri] = deque(maxlen=self._history_size)
+            self._durations[uri].append(duration)
+            self._polls[uri].append(n_polls)
+
+    def stats(self):
+        """
+        Statistics of the recorded requests, for every command
+
+        # Returns
+        dict: command URI -> dict of ``count``, ``mean``, ``p50``, ``p90`` and ``max`` of the completion times
+            in seconds, and ``mean_polls``, the average number of status polls per request
+        """
+        with self._lock:
+            history = {uri: (sorted(d), list(self._polls[uri])) for uri, d in self._durations.items()}
+
+        result = {}
+        for uri, (durations, polls) in history.items():
+            n = len(durations)
+            result[uri] = {'count': n,
+                           'mean': sum(durations) / n,
+                           'p50': durations[int(0.5 * (n - 1))],
+                           'p90': durations[int(0.9 * (n - 1))],
+                           'max': durations[-1],
+                           'mean_polls': float(sum(polls)) / n}
+        return result
+
+    def clear(self):
+        """Forget all recorded requests"""
+        with self._lock:
+            self._durations.clear()
+            self._polls.clear()
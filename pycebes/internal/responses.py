@@ -104,3 +104,114 @@ class TaggedPipelineResponse(_TaggedResponse):
 
     def __init__(self, js_data):
         super(TaggedPipelineResponse, self).__init__(js_data, _TaggedPipelineResponseEntry)
+
+
+class CachedDataframesResponse(object):
+    """Result of "df/cached": the Dataframes cached on the server, with their sizes"""
+
+    def __init__(self, js_data):
+        self.dataframes = []
+        for entry in js_data:
+            self.dataframes.append({'id': entry['id'],
+                                    'storage_level': entry.get('storageLevel'),
+                                    'memory_size': entry.get('memorySize', 0),
+                                    'disk_size': entry.get('diskSize', 0),
+                                    'cached_partitions': entry.get('numCachedPartitions'),
+                                    'partitions': entry.get('numPartitions')})
+
+    def __len__(self):
+        return len(self.dataframes)
+
+    @property
+    def total_size(self):
+        """Total memory and disk used by the cached Dataframes, in bytes"""
+        return sum(d['memory_size'] + d['disk_size'] for d in self.dataframes)
+
+    def __repr__(self):
+        rows = []
+        for d in self.dataframes:
+            row = collections.OrderedDict()
+            row['UUID'] = d['id']
+            row['Storage level'] = d['storage_level']
+            row['Memory size'] = d['memory_size']
+            row['Disk size'] = d['disk_size']
+            row['Cached partitions'] = '{}/{}'.format(d['cached_partitions'], d['partitions'])
+            rows.append(row)
+        return tabulate.tabulate(rows, headers='keys')
+
+
+class JobProgress(object):
+    """
+    Progress of a request running on the server, as reported in its status.
+    The numbers not reported by the server are None.
+    """
+
+    def __init__(self, js_data):
+        self.stages_completed = js_data.get('stagesCompleted')
+        self.stages_total = js_data.get('stagesTotal')
+        self.tasks_completed = js_data.get('tasksCompleted')
+        self.tasks_total = js_data.get('tasksTotal')
+        self.rows_processed = js_data.get('rowsProcessed')
+
+    def __eq__(self, other):
+        return isinstance(other, JobProgress) and self.__dict__ == other.__dict__
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, self)
+
+    def __str__(self):
+        parts = []
+        if self.tasks_total:
+            parts.append('{}/{} tasks'.format(self.tasks_completed or 0, self.tasks_total))
+        if self.stages_total:
+            parts.append('{}/{} stages'.format(self.stages_completed or 0, self.stages_total))
+        if self.rows_processed is not None:
+            parts.append('{} rows'.format(self.rows_processed))
+        return ', '.join(parts)
+
+    @property
+    def fraction(self):
+        """Fraction of the work done, based on the tasks if known, otherwise on the stages, or None"""
+        for done, total in [(self.tasks_completed, self.tasks_total), (self.stages_completed, self.stages_total)]:
+            if total:
+                return min(1., float(done or 0) / total)
+        return None
+
+
+class JobMetrics(object):
+    """Result of "request/<id>/metrics": metrics of the Spark stages run for a request"""
+
+    def __init__(self, js_data):
+        self.stages = [dict(s) for s in js_data.get('stages', [])]
+
+    def __len__(self):
+        return len(self.stages)
+
+    @staticmethod
+    def _skew(stage):
+        """Ratio between the longest and the median task time of the stage, or None if unknown"""
+        max_time, median_time = stage.get('maxTaskTime'), stage.get('medianTaskTime')
+        if not max_time or not median_time:
+            return None
+        return float(max_time) / median_time
+
+    def skewed_stages(self, ratio=5.):
+        """Stages whose longest task took more than ``ratio`` times the median task time"""
+        return [s for s in self.stages if (self._skew(s) or 0) > ratio]
+
+    def __repr__(self):
+        rows = []
+        for s in self.stages:
+            row = collections.OrderedDict()
+            row['Stage'] = s.get('stageId')
+            row['Name'] = s.get('name')
+            row['Status'] = s.get('status')
+            row['Tasks'] = '{}/{}'.format(s.get('numCompletedTasks', 0), s.get('numTasks', 0))
+            row['Failed tasks'] = s.get('numFailedTasks', 0)
+            row['Input rows'] = s.get('inputRecords')
+            row['Task time skew'] = self._skew(s)
+            rows.append(row)
+        return tabulate.tabulate(rows, headers='keys')
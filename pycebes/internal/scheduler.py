@@ -0,0 +1,185 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from pycebes.internal.helpers import require
+
+
+class Priorities(object):
+    """
+    Priorities of the requests in a #RequestScheduler. Lower values go first.
+    """
+    INTERACTIVE = 0
+    NORMAL = 1
+    BATCH = 2
+
+    # commands whose results are normally waited for by a person
+    _INTERACTIVE_COMMANDS = ('df/count', 'df/take', 'df/get', 'model/get', 'pipeline/get',
+                             'df/tags', 'model/tags', 'pipeline/tags')
+    _BATCH_COMMANDS = ('pipeline/run', 'model/run', 'storage/read', 'storage/write')
+
+    @classmethod
+    def of(cls, uri):
+        """Default priority of the requests to the given command URI"""
+        if uri in cls._INTERACTIVE_COMMANDS:
+            return cls.INTERACTIVE
+        if uri in cls._BATCH_COMMANDS:
+            return cls.BATCH
+        return cls.NORMAL
+
+
+class RequestScheduler(object):
+    """
+    Limit the number of requests in flight to the server at any time to ``max_in_flight``.
+    The requests over the limit are queued, and started in order of priority (see #Priorities),
+    then of arrival. To avoid starving low-priority requests, the priority of a queued request
+    is raised by one level every ``aging_interval`` seconds it has been waiting.
+
+    Can be used from several threads.
+    """
+
+    def __init__(self, max_in_flight=16, aging_interval=30.):
+        """
+        # Arguments
+        max_in_flight (int): maximum number of requests running at the same time. None means no limit
+        aging_interval (float): seconds after which a queued request is moved up by one priority level
+        """
+        require(max_in_flight is None or max_in_flight > 0,
+                'max_in_flight must be positive, got {!r}'.format(max_in_flight))
+        self._max_in_flight = max_in_flight
+        self._aging_interval = aging_interval
+        self._condition = threading.Condition()
+        self._counter = itertools.count()
+
+        # list of (priority, sequence number, enqueue time) of the queued requests
+        self._queue = []
+        self._in_flight = 0
+
+        # metrics
+        self._max_queued = 0
+        self._n_started = 0
+        self._n_delayed = 0
+        self._total_wait = 0.
+        self._max_wait = 0.
+
+    @property
+    def max_in_flight(self):
+        return self._max_in_flight
+
+    @max_in_flight.setter
+    def max_in_flight(self, value):
+        require(value is None or value > 0, 'max_in_flight must be positive, got {!r}'.format(value))
+        with self._condition:
+            self._max_in_flight = value
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority=Priorities.NORMAL, deadline=None):
+        """
+        Context manager holding one of the in-flight slots while the request runs
+
+        # Arguments
+        priority (int): the priority of the request, see #Priorities
+        deadline (float): the value of ``time.monotonic()`` after which to stop waiting for a slot,
+            or None to wait indefinitely
+
+        # Raises
+        TimeoutError: if no slot was available before the deadline
+        """
+        self.acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, priority=Priorities.NORMAL, deadline=None):
+        """Wait for a slot and take it. See #RequestScheduler.slot"""
+        with self._condition:
+            entry = (priority, next(self._counter), time.monotonic())
+            self._queue.append(entry)
+            self._max_queued = max(self._max_queued, len(self._queue))
+            delayed = False
+            try:
+                while not (self._has_free_slot() and self._next_entry() is entry):
+                    delayed = True
+                    timeout = None
+                    if deadline is not None:
+                        timeout = deadline - time.monotonic()
+                        if timeout <= 0:
+                            raise TimeoutError('Deadline exceeded while waiting for {} requests in flight '
+                                               'to finish'.format(self._in_flight))
+                    # wake up regularly, for the aging of the queued requests
+                    self._condition.wait(self._aging_interval if timeout is None
+                                         else min(timeout, self._aging_interval))
+            finally:
+                self._queue.remove(entry)
+                # the next request in the queue might be able to go now
+                self._condition.notify_all()
+
+            waited = time.monotonic() - entry[2]
+            self._in_flight += 1
+            self._n_started += 1
+            if delayed:
+                self._n_delayed += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+
+    def release(self):
+        """Give back a slot taken with #RequestScheduler.acquire"""
+        with self._condition:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._condition.notify_all()
+
+    def stats(self):
+        """
+        Metrics of the scheduler
+
+        # Returns
+        dict: with ``in_flight`` and ``queued``, the numbers of requests running and waiting now,
+            ``max_queued``, the longest the queue has been, ``started``, the number of requests started,
+            ``delayed``, how many of them had to wait for a slot, and ``mean_wait`` and ``max_wait``,
+            the time they waited for a slot, in seconds
+        """
+        with self._condition:
+            return {'in_flight': self._in_flight,
+                    'queued': len(self._queue),
+                    'max_queued': self._max_queued,
+                    'started': self._n_started,
+                    'delayed': self._n_delayed,
+                    'mean_wait': self._total_wait / self._n_started if self._n_started > 0 else 0.,
+                    'max_wait': self._max_wait}
+
+    """
+    Private helpers, to be called while holding the lock
+    """
+
+    def _has_free_slot(self):
+        return self._max_in_flight is None or self._in_flight < self._max_in_flight
+
+    def _next_entry(self):
+        """The queued request to be started next"""
+        now = time.monotonic()
+
+        def _effective_priority(entry):
+            priority, seq, enqueued = entry
+            if self._aging_interval:
+                priority -= int((now - enqueued) / self._aging_interval)
+            return priority, seq
+
+        return min(self._queue, key=_effective_priority)
@@ -0,0 +1,95 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+from pycebes.core import functions
+from pycebes.core import pipeline_api as pl
+from pycebes.core.analysis import validate_columns, validate_pipeline
+from pycebes.core.column import Column
+from pycebes.core.dataframe import Dataframe
+from pycebes.core.exceptions import AnalysisException
+from pycebes.core.expressions import SparkPrimitiveExpression
+from pycebes.core.pipeline import Pipeline
+from pycebes.core.schema import Schema, SchemaField, StorageTypes, VariableTypes
+
+
+class TestAnalysis(unittest.TestCase):
+    df1 = Dataframe('df-1', Schema(fields=[
+        SchemaField('customer', StorageTypes.STRING, VariableTypes.NOMINAL),
+        SchemaField('wax', StorageTypes.DOUBLE, VariableTypes.CONTINUOUS),
+        SchemaField('viscosity', StorageTypes.INTEGER, VariableTypes.DISCRETE),
+    ]))
+    df2 = Dataframe('df-2', Schema(fields=[
+        SchemaField('customer_name', StorageTypes.STRING, VariableTypes.NOMINAL),
+        SchemaField('country', StorageTypes.STRING, VariableTypes.NOMINAL),
+    ]))
+
+    def test_validate_columns(self):
+        df1, df2 = self.df1, self.df2
+        schemas = {df1.id: df1.schema}
+        validate_columns([df1.wax + 1, functions.col('customer'), functions.avg(df1.viscosity)], schemas)
+        validate_columns([df1.wax > 2], schemas, expect_boolean=True)
+
+        with self.assertRaises(AnalysisException) as ex:
+            validate_columns([functions.col('non_exist')], schemas)
+        self.assertIn('non_exist', '{}'.format(ex.exception))
+
+        with self.assertRaises(AnalysisException):
+            validate_columns([df1.wax + 1], schemas, expect_boolean=True)
+        with self.assertRaises(AnalysisException):
+            validate_columns([functions.avg(df1.customer > 1)], schemas)
+
+        # columns of the other Dataframe are only valid when its schema is given
+        join_expr = df1.customer == df2.customer_name
+        validate_columns([join_expr], {df1.id: df1.schema, df2.id: df2.schema}, expect_boolean=True)
+        validate_columns([join_expr], schemas, expect_boolean=True)
+        with self.assertRaises(AnalysisException):
+            validate_columns([Column(SparkPrimitiveExpression(df1.id, 'country')) == df2.country],
+                             {df1.id: df1.schema, df2.id: df2.schema})
+
+        # raw SQL expressions are left to the server
+        validate_columns([functions.expr('non_exist + 1')], schemas)
+
+    def test_validate_pipeline(self):
+        df = self.df1
+        with Pipeline() as ppl:
+            assembler = pl.vector_assembler(df, ['wax', 'viscosity'], 'features')
+            lr = pl.linear_regression(assembler.output_df, features_col='features', label_col='wax',
+                                      prediction_col='wax_predict')
+            pl.drop(lr.output_df, ['wax_predict', 'features'])
+        validate_pipeline(ppl)
+
+        with Pipeline() as ppl:
+            assembler = pl.vector_assembler(df, ['wax', 'viscosity'], 'features')
+            pl.linear_regression(assembler.output_df, features_col='feature', label_col='wax')
+        with self.assertRaises(AnalysisException) as ex:
+            validate_pipeline(ppl)
+        self.assertIn('feature', '{}'.format(ex.exception))
+
+        with Pipeline() as ppl:
+            data = pl.placeholder(pl.PlaceholderTypes.DATAFRAME)
+            cols = pl.placeholder(pl.PlaceholderTypes.VALUE, value_type='array')
+            pl.drop(df=data, col_names=cols)
+
+        # unknown inputs are skipped
+        validate_pipeline(ppl)
+        validate_pipeline(ppl, feeds={data: df, cols: ['wax']})
+        # dropping a column that does not exist is a no-op on the server
+        validate_pipeline(ppl, feeds={data: df, cols: ['hardener']})
+
+
+if __name__ == '__main__':
+    unittest.main()
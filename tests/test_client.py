@@ -0,0 +1,711 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import functools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import requests
+import six
+from requests import exceptions as requests_exceptions
+from six.moves.urllib.parse import urlparse
+
+from pycebes.core.client import Client, _TransferProgress
+from pycebes.core.exceptions import ServerException
+from pycebes.core.session import Session
+from pycebes.internal.helpers import file_digest
+from pycebes.internal.implicits import get_session_stack
+from pycebes.internal.local_cache import LocalCache
+from pycebes.internal.responses import JobMetrics, JobProgress
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+class _FakeResponse(object):
+
+    def __init__(self, body=None, status_code=requests.codes.ok, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.cookies = {}
+        self._body = {} if body is None else body
+        self.text = json.dumps(self._body)
+
+    def json(self):
+        return self._body
+
+
+class _FakeServer(object):
+    """
+    A Cebes server answering the HTTP sessions of a #Client, without any network.
+    ``handlers`` maps a command (e.g. ``df/count``) to a function called with the data and the headers
+    of the request, which returns the JSON response (or a #_FakeResponse) or raises an exception.
+    """
+
+    def __init__(self, host='server1'):
+        self.host = host
+        self.handlers = {}
+        # refuse all connections when True
+        self.down = False
+        self.n_refused = 0
+        self._lock = threading.Lock()
+        # list of (command, data, headers) of the requests received
+        self.requests = []
+
+    def answer(self, url, data=None, headers=None, **kwargs):
+        if self.down:
+            self.n_refused += 1
+            raise requests_exceptions.ConnectionError('Connection refused by {}'.format(self.host))
+        path = urlparse(url).path.strip('/')
+        uri = path.split('/', 1)[1] if path.startswith('v1/') else path
+        if data is not None and not isinstance(data, (six.text_type, bytes)):
+            # a multipart upload, read as it is sent
+            data = {'bytes': len(data.read())}
+        else:
+            data = json.loads(data) if data else {}
+        with self._lock:
+            self.requests.append((uri, data, dict(headers or {})))
+
+        if uri == 'version':
+            return _FakeResponse({'api': 'v1'})
+        if uri == 'auth/login':
+            return _FakeResponse(headers={'Set-Authorization': 'token-{}'.format(self.host)})
+        if uri == 'auth/logout':
+            return _FakeResponse()
+        result = self.handlers[uri](data, headers or {})
+        return result if isinstance(result, _FakeResponse) else _FakeResponse(result)
+
+    def uris(self, prefix=''):
+        """Commands of the requests received, starting with the given prefix"""
+        with self._lock:
+            return [r[0] for r in self.requests if r[0].startswith(prefix)]
+
+    def serve_async(self, uri, response, delay=0., request_id='request-1'):
+        """
+        Answer ``uri`` with the given asynchronous request, finished after ``delay`` seconds,
+        or cancelled as soon as it is asked to
+        """
+        started = []
+        cancelled = []
+
+        def _submit(data, headers):
+            started.append(time.monotonic())
+            del cancelled[:]
+            return {'requestId': request_id}
+
+        def _status(data, headers):
+            if cancelled:
+                return {'status': 'cancelled'}
+            if started and time.monotonic() - started[-1] < delay:
+                return {'status': 'scheduled'}
+            return {'status': 'finished', 'response': response}
+
+        def _cancel(data, headers):
+            cancelled.append(True)
+            return {}
+
+        self.handlers[uri] = _submit
+        self.handlers['request/{}'.format(request_id)] = _status
+        self.handlers['request/{}/cancel'.format(request_id)] = _cancel
+
+
+class _FakeSession(object):
+    """Sends the requests of an endpoint to the #_FakeServer of its host"""
+
+    def __init__(self, servers):
+        self.headers = {}
+        self._servers = servers
+
+    def post(self, url, **kwargs):
+        return self._servers[urlparse(url).hostname].answer(url, **kwargs)
+
+    get = put = post
+
+
+def _fake_client(*servers, **kwargs):
+    """A #Client connected to the given fake servers"""
+    by_host = {s.host: s for s in servers}
+    kwargs.setdefault('cache_tokens', False)
+    with mock.patch.object(requests, 'Session', lambda: _FakeSession(by_host)):
+        client = Client(host=[s.host for s in servers], interactive=False, **kwargs)
+    client.retry_backoff = 0.01
+    # poll often, so that the tests are quick
+    client.poller.next_delay = lambda uri, elapsed, n_polls, sleep_base=0.5: 0.05
+    return client
+
+
+class TestClient(unittest.TestCase):
+    """
+    Tests of the client internals that do not need a Cebes server
+    """
+
+    def test_parse_endpoints(self):
+        self.assertEqual(Client._parse_endpoints('localhost', 21000), [('localhost', 21000)])
+        self.assertEqual(Client._parse_endpoints(['server1', 'server2:22000', ('server3', '23000')], 21000),
+                         [('server1', 21000), ('server2', 22000), ('server3', 23000)])
+
+        with self.assertRaises(ValueError):
+            Client._parse_endpoints([], 21000)
+        with self.assertRaises(ValueError):
+            Client._parse_endpoints([('server1', 21000, 'extra')], 21000)
+
+    def test_job_progress(self):
+        progress = JobProgress({'stagesCompleted': 1, 'stagesTotal': 4, 'tasksCompleted': 30, 'tasksTotal': 40})
+        self.assertAlmostEqual(progress.fraction, 0.75)
+        self.assertEqual('{}'.format(progress), '30/40 tasks, 1/4 stages')
+        self.assertEqual(progress, JobProgress({'stagesCompleted': 1, 'stagesTotal': 4,
+                                                'tasksCompleted': 30, 'tasksTotal': 40}))
+
+        self.assertAlmostEqual(JobProgress({'stagesCompleted': 1, 'stagesTotal': 4}).fraction, 0.25)
+        self.assertIsNone(JobProgress({'rowsProcessed': 1000}).fraction)
+
+        metrics = JobMetrics({'stages': [
+            {'stageId': 0, 'numTasks': 10, 'numCompletedTasks': 10, 'maxTaskTime': 120, 'medianTaskTime': 100},
+            {'stageId': 1, 'numTasks': 10, 'numCompletedTasks': 9, 'maxTaskTime': 6000, 'medianTaskTime': 100},
+            {'stageId': 2, 'numTasks': 10, 'numCompletedTasks': 0}]})
+        self.assertEqual(len(metrics), 3)
+        self.assertEqual([s['stageId'] for s in metrics.skewed_stages()], [1])
+        self.assertIn('9/10', repr(metrics))
+
+    def test_server_exception_retryable(self):
+        self.assertFalse(ServerException('Column wax not found').is_retryable)
+        self.assertTrue(ServerException('Job aborted', server_stack_trace='org.apache.spark.shuffle.'
+                                                                          'FetchFailedException: ...').is_retryable)
+        self.assertTrue(ServerException('Server answered 503', retryable=True).is_retryable)
+        self.assertFalse(ServerException('Request was cancelled: TimeoutException', retryable=False).is_retryable)
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.server = _FakeServer()
+        self.client = _fake_client(self.server)
+
+    def _post_concurrently(self, uri, n=4, **kwargs):
+        """Send the same request from ``n`` threads, return their results or exceptions"""
+        outcomes = [None] * n
+
+        def _post(i):
+            try:
+                outcomes[i] = self.client.post_and_wait(uri, {'df': 'df-1'}, **kwargs)
+            except Exception as e:
+                outcomes[i] = e
+
+        threads = [threading.Thread(target=_post, args=(i,)) for i in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return outcomes
+
+    def test_concurrent_requests(self):
+        self.server.serve_async('df/count', 42, delay=0.3)
+        self.assertEqual(self._post_concurrently('df/count'), [42] * 4)
+        self.assertEqual(self.server.uris('df/count'), ['df/count'])
+
+        # only read-only commands are deduplicated
+        self.server.serve_async('df/persist', {}, delay=0.3)
+        self._post_concurrently('df/persist')
+        self.assertEqual(len(self.server.uris('df/persist')), 4)
+
+    def test_leader_fails(self):
+        def _fail(data, headers):
+            time.sleep(0.3)
+            return _FakeResponse({'message': 'Column wax not found'}, status_code=requests.codes.bad_request)
+
+        self.server.handlers['df/count'] = _fail
+        outcomes = self._post_concurrently('df/count')
+        self.assertEqual(self.server.uris('df/count'), ['df/count'])
+        self.assertTrue(all(isinstance(e, ValueError) for e in outcomes))
+        # each thread gets its own exception, so the traceback of the leader is not extended by the others
+        self.assertEqual(len(set(id(e) for e in outcomes)), 4)
+        self.assertEqual(len(set('{}'.format(e) for e in outcomes)), 1)
+
+    def test_leader_times_out(self):
+        self.server.serve_async('df/count', 42, delay=0.5)
+
+        def _leader():
+            try:
+                self.client.post_and_wait('df/count', {'df': 'df-1'}, timeout=0.2)
+            except TimeoutError:
+                pass
+
+        leader = threading.Thread(target=_leader)
+        leader.start()
+        time.sleep(0.1)
+        # the follower sends the request again when the leader gives up on it
+        self.assertEqual(self.client.post_and_wait('df/count', {'df': 'df-1'}, timeout=5), 42)
+        leader.join()
+        self.assertEqual(self.server.uris('df/count'), ['df/count', 'df/count'])
+        self.assertEqual(self.server.uris('request/request-1/cancel'), ['request/request-1/cancel'])
+
+
+class TestCancel(unittest.TestCase):
+
+    def setUp(self):
+        self.server = _FakeServer()
+        self.client = _fake_client(self.server)
+
+    def _post_in_background(self, uri, request_id='request-1'):
+        """
+        Send the request from another thread, and wait until the request of the given ID is polled.
+        Return the thread and the list of its outcomes
+        """
+        outcomes = []
+
+        def _post():
+            try:
+                outcomes.append(self.client.post_and_wait(uri, {'df': 'df-1'}))
+            except Exception as e:
+                outcomes.append(e)
+
+        thread = threading.Thread(target=_post)
+        thread.start()
+        while not self.server.uris('request/{}'.format(request_id)):
+            time.sleep(0.01)
+        return thread, outcomes
+
+    def test_cancel_on_timeout(self):
+        self.server.serve_async('df/count', 42, delay=10, request_id='request-7')
+        with self.assertRaises(TimeoutError):
+            self.client.post_and_wait('df/count', {'df': 'df-1'}, timeout=0.3)
+        self.assertEqual(self.server.uris('request/request-7/'), ['request/request-7/cancel'])
+
+    def test_cancel_on_interrupt(self):
+        self.server.serve_async('df/count', 42, delay=10, request_id='request-7')
+
+        def _interrupt(data, headers):
+            raise KeyboardInterrupt()
+
+        self.server.handlers['request/request-7'] = _interrupt
+        with self.assertRaises(KeyboardInterrupt):
+            self.client.post_and_wait('df/count', {'df': 'df-1'})
+        self.assertEqual(self.server.uris('request/request-7/'), ['request/request-7/cancel'])
+
+    def test_cancel_all(self):
+        self.server.serve_async('df/count', 42, request_id='request-1')
+        self.assertEqual(self.client.post_and_wait('df/count', {'df': 'df-1'}), 42)
+
+        self.server.serve_async('df/take', {}, delay=10, request_id='request-2')
+        thread, outcomes = self._post_in_background('df/take', 'request-2')
+        # the request that completed is not cancelled
+        self.assertEqual(self.client.cancel_all(), ['request-2'])
+        thread.join()
+        self.assertEqual(self.server.uris('request/request-1/'), [])
+        self.assertEqual(self.server.uris('request/request-2/'), ['request/request-2/cancel'])
+        self.assertIsInstance(outcomes[0], ServerException)
+        self.assertEqual(self.client.cancel_all(), [])
+
+    def test_session_close(self):
+        by_host = {self.server.host: self.server}
+        with mock.patch.object(requests, 'Session', lambda: _FakeSession(by_host)), \
+                mock.patch('pycebes.core.session.Client', functools.partial(Client, cache_tokens=False)):
+            session = Session(host=self.server.host, interactive=False)
+        self.client = session.client
+        self.client.poller.next_delay = lambda uri, elapsed, n_polls, sleep_base=0.5: 0.05
+        try:
+            self.server.serve_async('df/count', 42, delay=10)
+            thread, outcomes = self._post_in_background('df/count')
+            session.close()
+            thread.join()
+        finally:
+            if session in get_session_stack().stack:
+                get_session_stack().stack.remove(session)
+
+        self.assertIsInstance(outcomes[0], ServerException)
+        uris = self.server.uris()
+        self.assertLess(uris.index('request/request-1/cancel'), uris.index('auth/logout'))
+
+
+class TestDeadline(unittest.TestCase):
+
+    def setUp(self):
+        self.server = _FakeServer()
+        self.client = _fake_client(self.server)
+
+    def test_nested_deadlines(self):
+        self.assertIsNone(self.client._deadline())
+        with self.client.deadline(10):
+            with self.client.deadline(0.5):
+                inner = self.client._deadline()
+                self.assertLessEqual(inner, time.monotonic() + 0.5)
+                # an explicit timeout cannot extend the enclosing deadline either
+                self.assertEqual(self.client._deadline(timeout=10), inner)
+            outer = self.client._deadline()
+            self.assertGreater(outer, time.monotonic() + 9)
+
+            # the inner deadline is capped by the outer one
+            with self.client.deadline(100):
+                self.assertEqual(self.client._deadline(), outer)
+        self.assertIsNone(self.client._deadline())
+
+    def test_request_timeout_header(self):
+        self.server.serve_async('df/count', 42)
+        self.assertEqual(self.client.post_and_wait('df/count', {'df': 'df-1'}, timeout=2.5), 42)
+        self.assertEqual([r[2].get('Request-Timeout') for r in self.server.requests if r[0] == 'df/count'], ['3'])
+
+        self.assertEqual(self.client.post_and_wait('df/count', {'df': 'df-1'}), 42)
+        self.assertNotIn('Request-Timeout', self.server.requests[-2][2])
+
+    def test_deadline_exceeded(self):
+        self.server.serve_async('df/count', 42, delay=10)
+        with self.client.deadline(0.2):
+            with self.assertRaises(TimeoutError):
+                self.client.post_and_wait('df/count', {'df': 'df-1'})
+            # nothing is sent once the deadline has passed
+            n_requests = len(self.server.requests)
+            with self.assertRaises(TimeoutError):
+                self.client.post_and_wait('df/count', {'df': 'df-1'})
+            self.assertEqual(len(self.server.requests), n_requests)
+
+    def test_max_count(self):
+        self.server.serve_async('df/count', 42, delay=10)
+        self.client.post('df/count', {'df': 'df-1'})
+        with self.assertRaises(TimeoutError):
+            self.client.wait('request-1', max_count=2)
+        self.assertEqual(len(self.server.uris('request/request-1')), 3)
+
+
+class TestRetry(unittest.TestCase):
+
+    def setUp(self):
+        self.server = _FakeServer()
+        self.client = _fake_client(self.server)
+
+    def _keys(self, server, uri='df/count'):
+        return [r[2].get('Idempotency-Key') for r in server.requests if r[0] == uri]
+
+    @staticmethod
+    def _failing(n, status_code=requests.codes.service_unavailable):
+        """Handler answering ``status_code`` to the first ``n`` requests, then an asynchronous request"""
+        answers = []
+
+        def _handler(data, headers):
+            answers.append(headers)
+            if len(answers) <= n:
+                return _FakeResponse({'message': 'Overloaded'}, status_code=status_code)
+            return {'requestId': 'request-1'}
+        return _handler
+
+    def test_same_idempotency_key(self):
+        self.server.serve_async('df/count', 42)
+        self.server.handlers['df/count'] = self._failing(2)
+        self.assertEqual(self.client.post_and_wait('df/count', {'df': 'df-1'}), 42)
+        keys = self._keys(self.server)
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(len(set(keys)), 1)
+
+        # new calls have new keys
+        self.client.post_and_wait('df/count', {'df': 'df-1'})
+        self.assertNotEqual(self._keys(self.server)[-1], keys[0])
+
+    def test_failover_same_idempotency_key(self):
+        server2 = _FakeServer('server2')
+        self.client = _fake_client(self.server, server2)
+
+        def _reset(data, headers):
+            raise requests_exceptions.ConnectionError('Connection reset by peer')
+
+        for s in (self.server, server2):
+            s.serve_async('df/count', 42)
+        self.server.handlers['df/count'] = _reset
+        self.assertEqual(self.client.post_and_wait('df/count', {'df': 'df-1'}), 42)
+        self.assertEqual(len(self._keys(self.server)), 1)
+        self.assertEqual(self._keys(server2), self._keys(self.server))
+        # polled where it was accepted
+        self.assertEqual(server2.uris('request/'), ['request/request-1'])
+
+    def test_max_retries(self):
+        self.server.handlers['df/count'] = self._failing(10)
+        self.client.max_retries = 2
+        with self.assertRaises(ServerException) as ctx:
+            self.client.post_and_wait('df/count', {'df': 'df-1'})
+        self.assertTrue(ctx.exception.is_retryable)
+        self.assertEqual(len(self._keys(self.server)), 3)
+
+        # errors in the request are not retried
+        self.server.handlers['df/count'] = self._failing(10, status_code=requests.codes.bad_request)
+        with self.assertRaises(ValueError):
+            self.client.post_and_wait('df/count', {'df': 'df-2'})
+        self.assertEqual(len(self._keys(self.server)), 4)
+
+    def test_retry_deadline(self):
+        self.server.handlers['df/count'] = self._failing(10)
+        self.client.retry_backoff = 10
+        started = time.monotonic()
+        with self.assertRaises(ServerException):
+            self.client.post_and_wait('df/count', {'df': 'df-1'}, timeout=1)
+        # not retried, since the back-off would end after the deadline
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(len(self._keys(self.server)), 1)
+
+    def test_local_errors_not_retried(self):
+        calls = []
+
+        def _open():
+            calls.append(True)
+            raise IOError(2, 'No such file or directory')
+
+        with self.assertRaises(IOError):
+            self.client._with_retry(_open, None, 'reading')
+        self.assertEqual(len(calls), 1)
+
+    def test_resubmit_failed_job(self):
+        self.server.serve_async('df/count', 42)
+        status = self.server.handlers['request/request-1']
+        statuses = [{'status': 'failed', 'response': {
+            'message': 'Job aborted', 'stackTrace': 'org.apache.spark.shuffle.FetchFailedException: ...'}}]
+        self.server.handlers['request/request-1'] = lambda data, headers: (
+            statuses.pop() if statuses else status(data, headers))
+
+        self.assertEqual(self.client.post_and_wait('df/count', {'df': 'df-1'}), 42)
+        # submitted again as a new request
+        keys = self._keys(self.server)
+        self.assertEqual(len(keys), 2)
+        self.assertNotEqual(keys[0], keys[1])
+
+        # failures caused by the request are not
+        self.server.handlers['request/request-1'] = lambda data, headers: {
+            'status': 'failed', 'response': {'message': 'Column wax not found'}}
+        with self.assertRaises(ServerException):
+            self.client.post_and_wait('df/count', {'df': 'df-2'})
+        self.assertEqual(len(self._keys(self.server)), 3)
+
+
+class TestEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = [_FakeServer('server1'), _FakeServer('server2')]
+        self.client = _fake_client(*self.servers)
+        for s in self.servers:
+            s.serve_async('df/count', 42)
+
+    def test_least_outstanding(self):
+        for s in self.servers:
+            s.serve_async('df/take', {}, delay=0.5, request_id='request-2')
+        thread = threading.Thread(target=self.client.post_and_wait, args=('df/take', {'df': 'df-1'}))
+        thread.start()
+        while not any(s.uris('request/request-2') for s in self.servers):
+            time.sleep(0.01)
+        busy, idle = self.servers if self.servers[0].uris('df/take') else self.servers[::-1]
+
+        # the other server has no outstanding request
+        self.assertEqual(self.client.post_and_wait('df/count', {'df': 'df-1'}), 42)
+        thread.join()
+        self.assertEqual(busy.uris('df/count'), [])
+        self.assertEqual(idle.uris('df/count'), ['df/count'])
+        self.assertEqual([e.outstanding for e in self.client._endpoints], [0, 0])
+
+    def test_failover_and_recovery(self):
+        server1, server2 = self.servers
+        server1.down = True
+        self.assertEqual(self.client.post_and_wait('df/count', {'df': 'df-1'}), 42)
+        self.assertEqual(server1.n_refused, 1)
+        self.assertEqual(server2.uris('df/count'), ['df/count'])
+        self.assertFalse(self.client._endpoints[0].healthy)
+
+        # not tried again until the health check
+        self.client.post_and_wait('df/count', {'df': 'df-2'})
+        self.assertEqual(server1.n_refused, 1)
+        self.assertEqual(len(server2.uris('df/count')), 2)
+
+        server1.down = False
+        with mock.patch('pycebes.core.client._HEALTH_CHECK_INTERVAL', 0):
+            self.client.post_and_wait('df/count', {'df': 'df-3'})
+        self.assertTrue(self.client._endpoints[0].healthy)
+        # when connecting, then for the health check
+        self.assertEqual(server1.uris('version'), ['version', 'version'])
+        self.assertEqual(server1.uris('df/count'), ['df/count'])
+
+        # all of them down
+        server1.down = server2.down = True
+        with self.assertRaises(OSError):
+            self.client.post_and_wait('df/count', {'df': 'df-4'})
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix='cebes')
+        self.server = _FakeServer()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _client(self, password):
+        with mock.patch('pycebes.core.client.LocalCache',
+                        lambda name, **kwargs: LocalCache(name, cache_dir=self.cache_dir, **kwargs)):
+            return _fake_client(self.server, user_name='admin', password=password, cache_tokens=True)
+
+    def test_cached_tokens(self):
+        self._client('secret')
+        self.assertEqual(self.server.uris('auth/login'), ['auth/login'])
+
+        # same credentials, logged in with the cached tokens
+        client = self._client('secret')
+        self.assertEqual(self.server.uris('auth/login'), ['auth/login'])
+        self.assertEqual(client.session.headers['Authorization'], 'token-server1')
+
+        # the cached tokens of another password are not used
+        self._client('wrong')
+        self.assertEqual(len(self.server.uris('auth/login')), 2)
+        self.assertEqual(self.server.requests[-1][1], {'userName': 'admin', 'passwordHash': 'wrong'})
+
+        with open(os.path.join(self.cache_dir, 'tokens.json')) as f:
+            self.assertNotIn('secret', f.read())
+
+
+class TestUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix='cebes')
+        self.server = _FakeServer()
+        self.server.handlers['storage/upload'] = lambda data, headers: {'path': '/uploads/1', 'size': 100}
+        with mock.patch('pycebes.core.client.LocalCache',
+                        lambda name, **kwargs: LocalCache(name, cache_dir=self.tmp_dir, **kwargs)):
+            self.client = _fake_client(self.server)
+
+        self.path = os.path.join(self.tmp_dir, 'data.csv')
+        with open(self.path, 'wb') as f:
+            f.write(b'x' * 100)
+        self.digest = file_digest(self.path)
+        self.index_key = '{}:{}'.format(self.client._endpoints[0], self.digest)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_lookup_hit(self):
+        self.server.handlers['storage/lookup'] = lambda data, headers: {'path': '/data/1', 'size': data['size']}
+        with self.assertLogs('pycebes.core.client', 'INFO') as logs:
+            result = self.client.upload(self.path)
+        self.assertEqual(result, {'path': '/data/1', 'size': 100, 'sha256': self.digest})
+        self.assertEqual(self.server.uris('storage/upload'), [])
+        self.assertIn('Skipped uploading', logs.output[0])
+        self.assertEqual(self.server.requests[-1][1], {'sha256': self.digest, 'size': 100, 'path': None})
+        self.assertEqual(self.client._upload_index.get(self.index_key), '/data/1')
+
+        # reported to the progress of a bigger upload
+        progress = _TransferProgress(200, n_files=2, interactive=False)
+        self.client.upload(self.path, progress=progress)
+        self.assertEqual(progress.sent_bytes, 100)
+
+    def test_known_path(self):
+        def _lookup(data, headers):
+            return {'path': data['path'], 'size': 100} if data['path'] else {}
+
+        self.server.handlers['storage/lookup'] = _lookup
+        self.assertEqual(self.client.upload(self.path)['path'], '/uploads/1')
+        self.assertEqual(self.client._upload_index.get(self.index_key), '/uploads/1')
+
+        # the server is asked about the path of the previous upload
+        self.assertEqual(self.client.upload(self.path)['path'], '/uploads/1')
+        self.assertEqual(self.server.requests[-1][1]['path'], '/uploads/1')
+        self.assertEqual(self.server.uris('storage/'), ['storage/lookup', 'storage/upload', 'storage/lookup'])
+
+        # without dedup, neither the lookup nor the index are used
+        self.client.upload(self.path, dedup=False)
+        self.assertEqual(self.server.uris('storage/')[-1], 'storage/upload')
+        self.assertEqual(len(self.server.uris('storage/lookup')), 2)
+
+    def test_size_mismatch(self):
+        self.server.handlers['storage/lookup'] = lambda data, headers: {'path': '/data/1', 'size': 99}
+        self.assertEqual(self.client.upload(self.path)['path'], '/uploads/1')
+        self.assertEqual(self.server.uris('storage/'), ['storage/lookup', 'storage/upload'])
+
+    def test_lookup_not_supported(self):
+        self.server.handlers['storage/lookup'] = lambda data, headers: _FakeResponse(
+            status_code=requests.codes.not_found)
+        self.assertEqual(self.client.upload(self.path)['path'], '/uploads/1')
+        self.assertFalse(self.client._endpoints[0].lookup_supported)
+
+        # not asked again
+        self.client.upload(self.path)
+        self.assertEqual(self.server.uris('storage/'), ['storage/lookup', 'storage/upload', 'storage/upload'])
+
+
+class TestUploadMany(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix='cebes')
+        self.server = _FakeServer()
+        with mock.patch('pycebes.core.client.LocalCache',
+                        lambda name, **kwargs: LocalCache(name, cache_dir=self.tmp_dir, **kwargs)):
+            self.client = _fake_client(self.server)
+
+        # the smallest file first, all the names of the same length
+        self.paths = []
+        for i in range(6):
+            self.paths.append(os.path.join(self.tmp_dir, 'part-{}.csv'.format(i)))
+            with open(self.paths[-1], 'wb') as f:
+                f.write(b'x' * 100 * (i + 1))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_concurrent_uploads(self):
+        lock = threading.Lock()
+        running = [0, 0]
+        finished = []
+
+        def _upload(data, headers):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            # the first file (of 100 bytes, plus the multipart overhead) is the slowest one
+            time.sleep(0.3 if data['bytes'] < 300 else 0.05)
+            with lock:
+                running[0] -= 1
+                finished.append(data['bytes'])
+            return {'path': '/uploads/{}'.format(data['bytes']), 'size': data['bytes']}
+
+        self.server.handlers['storage/upload'] = _upload
+        created = []
+
+        def _progress(*args, **kwargs):
+            created.append(_TransferProgress(*args, **kwargs))
+            return created[-1]
+
+        with mock.patch('pycebes.core.client._TransferProgress', _progress):
+            results = self.client.upload_many(self.paths, dedup=False, max_workers=2)
+
+        self.assertEqual(running[1], 2)
+        # in the order of the paths, not of completion
+        self.assertEqual([r['size'] for r in results], sorted(finished))
+        self.assertNotEqual([r['size'] for r in results], finished)
+        # one progress for all the files
+        self.assertEqual(len(created), 1)
+        self.assertEqual(created[0].sent_bytes, sum(os.path.getsize(p) for p in self.paths))
+
+    def test_failure_cancels_remaining(self):
+        def _upload(data, headers):
+            time.sleep(0.05)
+            return _FakeResponse({'message': 'Disk full'}, status_code=requests.codes.bad_request)
+
+        self.server.handlers['storage/upload'] = _upload
+        with self.assertRaises(ValueError):
+            self.client.upload_many(self.paths, dedup=False, max_workers=1)
+        # the uploads that were not started are cancelled
+        self.assertLessEqual(len(self.server.uris('storage/upload')), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
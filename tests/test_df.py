@@ -16,12 +16,13 @@ from __future__ import unicode_literals
 
 import unittest
 
+import numpy as np
 import pandas as pd
 import six
 
 from pycebes.core import functions
 from pycebes.core.column import Column
-from pycebes.core.dataframe import Dataframe
+from pycebes.core.dataframe import Dataframe, StorageLevels
 from pycebes.core.exceptions import ServerException
 from pycebes.core.sample import DataSample
 from pycebes.core.schema import Schema, SchemaField, StorageTypes, VariableTypes
@@ -99,6 +100,34 @@ class TestDataframe(test_base.TestBase):
             self.cylinder_bands.sample(prob=-0.6)
             self.assertTrue('Fraction must be nonnegative, but got -0.6' in cm.exception.message)
 
+    def test_sample_n_and_split(self):
+        df = self.cylinder_bands
+        n = len(df)
+
+        df1 = df.sample_n(100, seed=1)
+        self.assertEqual(len(df1), 100)
+        self.assertListEqual(df1.columns, df.columns)
+        self.assertEqual(len(df.sample_n(n + 10)), n)
+        # e.g. computed with pandas
+        self.assertEqual(len(df.sample_n(np.int64(10))), 10)
+
+        df1 = df.sample_by('customer', {'TVGUIDE': 1., 'MODMAT': 0.})
+        self.assertEqual(len(df1), len(df.where(df.customer == 'TVGUIDE')))
+
+        splits = df.random_split([0.8, 0.2], seed=1)
+        self.assertEqual(len(splits), 2)
+        self.assertEqual(sum(len(d) for d in splits), n)
+        self.assertEqual(len(splits[0].intersect(splits[1])), 0)
+
+        with self.assertRaises(ValueError):
+            df.sample_n(-1)
+        with self.assertRaises(ValueError):
+            df.sample_n(True)
+        with self.assertRaises(ValueError):
+            df.sample_by('customer', {'TVGUIDE': 2.})
+        with self.assertRaises(ValueError):
+            df.random_split([0, 0])
+
     """
     SQL APIs
     """
@@ -181,6 +210,34 @@ class TestDataframe(test_base.TestBase):
         self.assertEqual(len(df1), 100)
         self.assertListEqual(df1.columns, df.columns)
 
+    def test_partitioning(self):
+        df = self.cylinder_bands
+
+        df1 = df.repartition(4, 'customer')
+        self.assertListEqual(df1.columns, df.columns)
+        stats = df1.partition_stats()
+        self.assertListEqual(list(stats.columns), ['partition_id', 'count'])
+        self.assertLessEqual(len(stats), 4)
+        self.assertEqual(stats['count'].sum(), len(df))
+
+        stats = df1.coalesce(np.int64(2)).partition_stats()
+        self.assertLessEqual(len(stats), 2)
+        self.assertEqual(stats['count'].sum(), len(df))
+
+        df2 = df1.sort_within_partitions('timestamp', df1.customer.desc)
+        self.assertEqual(len(df2), len(df))
+
+        with self.assertRaises(ValueError):
+            df.repartition(0)
+        with self.assertRaises(ValueError):
+            df.coalesce(-1)
+        with self.assertRaises(ValueError):
+            df.repartition(True)
+        with self.assertRaises(ValueError):
+            df.sort_within_partitions('non_exist')
+        with self.assertRaises(ValueError):
+            df.repartition(4).partition_stats(max_partitions=1)
+
     def test_intersect(self):
         df = self.cylinder_bands
 
@@ -403,6 +460,25 @@ class TestDataframe(test_base.TestBase):
         self.assertEqual(len(df1), len(df))
         self.assertEqual(len(df1.columns) + 3, len(df.columns))
 
+    def test_persist(self):
+        df = self.cylinder_bands.where(self.cylinder_bands.wax > 2)
+        n = len(df)
+
+        self.assertIs(df.persist(StorageLevels.MEMORY_ONLY_SER), df)
+        self.assertEqual(len(df), n)
+        cached = self.session.cached_dataframes()
+        self.assertIn(df.id, [d['id'] for d in cached.dataframes])
+        entry = next(d for d in cached.dataframes if d['id'] == df.id)
+        self.assertEqual(StorageLevels.from_str(entry['storage_level']), StorageLevels.MEMORY_ONLY_SER)
+
+        self.assertIs(df.unpersist(), df)
+        self.assertNotIn(df.id, [d['id'] for d in self.session.cached_dataframes().dataframes])
+        self.assertEqual(len(df.cache()), n)
+        df.unpersist()
+
+        with self.assertRaises(ValueError):
+            df.persist('MEMORY_ONLY')
+
     def test_drop_duplicates(self):
         df = self.cylinder_bands
         n = len(df)
@@ -445,6 +521,58 @@ class TestDataframe(test_base.TestBase):
         with self.assertRaises(ValueError):
             df.fillna(value=[2, 3, 4])
 
+    def test_describe(self):
+        df = self.cylinder_bands
+        n = len(df)
+
+        summary = df.describe()
+        self.assertListEqual(list(summary.columns), df.columns)
+        self.assertListEqual(list(summary.index), ['count', 'nulls', 'distinct', 'mean', 'stddev', 'min',
+                                                   '25%', '50%', '75%', 'max'])
+        self.assertEqual(summary.loc['count', 'wax'] + summary.loc['nulls', 'wax'], n)
+        self.assertLessEqual(summary.loc['min', 'wax'], summary.loc['50%', 'wax'])
+        self.assertLessEqual(summary.loc['50%', 'wax'], summary.loc['max', 'wax'])
+        self.assertTrue(pd.isnull(summary.loc['mean', 'customer']))
+
+        summary = df.describe([df.wax, 'customer'], stats=['nulls', 'max'])
+        self.assertListEqual(list(summary.index), ['nulls', 'max'])
+        self.assertListEqual(list(summary.columns), ['wax', 'customer'])
+
+        profile = df.profile(['wax', 'customer'])
+        self.assertListEqual(list(profile.index), ['wax', 'customer'])
+        self.assertEqual(profile.loc['wax', 'storage_type'], df.schema['wax'].storage_type.name)
+        self.assertAlmostEqual(profile.loc['wax', 'null_fraction'], float(profile.loc['wax', 'nulls']) / n)
+        self.assertGreater(profile.loc['customer', 'max_length'], 0)
+
+        with self.assertRaises(ValueError):
+            df.describe(stats=['median'])
+        with self.assertRaises(ValueError):
+            df.describe(['non_exist'])
+
+    def test_approx_quantile_and_histogram(self):
+        df = self.cylinder_bands
+
+        quantiles = df.approx_quantile(['wax', df.hardener], [0, 0.5, 1])
+        self.assertListEqual(list(quantiles.columns), ['wax', 'hardener'])
+        self.assertListEqual(list(quantiles.index), [0, 0.5, 1])
+        self.assertTrue(quantiles['wax'].is_monotonic_increasing)
+
+        hist = df.histogram('wax', bins=5)
+        self.assertEqual(len(hist), 5)
+        self.assertListEqual(list(hist.columns), ['lower', 'upper', 'count'])
+        self.assertEqual(hist['count'].sum(), len(df.where(df.wax.is_not_null())))
+        self.assertEqual(len(df.histogram('wax', bins=np.int64(5))), 5)
+
+        hist = df.histogram(df.wax, bins=[0, 2, 10])
+        self.assertListEqual(list(hist['lower']), [0, 2])
+
+        with self.assertRaises(ValueError):
+            df.approx_quantile('customer')
+        with self.assertRaises(ValueError):
+            df.approx_quantile('wax', [-0.5])
+        with self.assertRaises(ValueError):
+            df.histogram('wax', bins=[3, 1])
+
 
 if __name__ == '__main__':
     unittest.main()
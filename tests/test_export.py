@@ -0,0 +1,82 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from pycebes.core.schema import Schema, SchemaField, StorageTypes
+from pycebes.internal import export
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix='cebes')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _write_part(self, i, records):
+        path = os.path.join(self.tmp_dir, 'part-{:05d}.json'.format(i))
+        with open(path, 'w') as f:
+            f.writelines(json.dumps(r) + '\n' for r in records)
+        return path
+
+    def test_read_parts(self):
+        schema = Schema([SchemaField('customer'), SchemaField('wax', StorageTypes.DOUBLE), SchemaField('note')])
+        columns = schema.columns
+        paths = [self._write_part(0, [{'customer': 'a', 'wax': 1.5}, {'customer': 'b', 'wax': 2.}]),
+                 self._write_part(1, []),
+                 self._write_part(2, [{'customer': 'c', 'wax': 3., 'note': 'x'}])]
+
+        df = export.read_parts(paths, 'json', schema, max_workers=2)
+        self.assertEqual(list(df.columns), columns)
+        self.assertEqual(list(df['customer']), ['a', 'b', 'c'])
+        self.assertEqual(list(df['wax']), [1.5, 2., 3.])
+        self.assertEqual(list(df.index), [0, 1, 2])
+
+        self.assertEqual(list(export.read_parts([], 'json', schema).columns), columns)
+
+        with self.assertRaises(MemoryError):
+            export.read_parts(paths, 'json', schema, max_memory_bytes=100)
+        with self.assertRaises(ValueError):
+            export.read_parts(paths, 'csv', schema)
+
+    def test_read_part_types(self):
+        schema = Schema([SchemaField('code'), SchemaField('day'), SchemaField('n', StorageTypes.LONG),
+                         SchemaField('m', StorageTypes.INTEGER), SchemaField('t', StorageTypes.TIMESTAMP)])
+        path = self._write_part(0, [
+            {'code': '00123', 'day': '2017-01-02', 'n': 2 ** 60 + 1, 'm': 1, 't': '2017-01-02T10:20:30.123Z'},
+            {'code': '1e3', 'day': 'x', 'n': 7, 't': '2017-01-03T00:00:00.000+01:00'}])
+
+        df = export.read_part(path, 'json', schema)
+        self.assertEqual(list(df.columns), schema.columns)
+        # strings that look like numbers or dates are kept as they are
+        self.assertEqual(list(df['code']), ['00123', '1e3'])
+        self.assertEqual(list(df['day']), ['2017-01-02', 'x'])
+        self.assertEqual(list(df['n']), [2 ** 60 + 1, 7])
+        self.assertEqual(df['n'].dtype, 'int64')
+        self.assertEqual(df['m'][0], 1)
+        self.assertTrue(pd.isnull(df['m'][1]))
+        self.assertEqual(list(df['t']), [pd.Timestamp('2017-01-02 10:20:30.123'), pd.Timestamp('2017-01-02 23:00:00')])
+
+
+if __name__ == '__main__':
+    unittest.main()
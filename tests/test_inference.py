@@ -0,0 +1,131 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+from pycebes.core import functions
+from pycebes.core.exceptions import AnalysisException
+from pycebes.core.inference import infer_field, infer_fields, infer_schema
+from pycebes.core.schema import Schema, SchemaField, StorageTypes, VariableTypes
+
+
+class TestInference(unittest.TestCase):
+    schema = Schema(fields=[
+        SchemaField('customer', StorageTypes.STRING, VariableTypes.NOMINAL),
+        SchemaField('job_number', StorageTypes.INTEGER, VariableTypes.DISCRETE),
+        SchemaField('wax', StorageTypes.DOUBLE, VariableTypes.CONTINUOUS),
+        SchemaField('timestamp', StorageTypes.LONG, VariableTypes.DISCRETE),
+        SchemaField('date', StorageTypes.DATE, VariableTypes.DATETIME),
+        SchemaField('tags', StorageTypes.array(StorageTypes.STRING), VariableTypes.ARRAY),
+        SchemaField('props', StorageTypes.map(StorageTypes.STRING, StorageTypes.DOUBLE), VariableTypes.MAP),
+    ])
+
+    def _check(self, column, name, storage_type, variable_type=None):
+        f = infer_field(column, self.schema)
+        self.assertEqual(f.name, name)
+        self.assertEqual(f.storage_type, storage_type)
+        if variable_type is not None:
+            self.assertEqual(f.variable_type, variable_type)
+
+    def test_columns(self):
+        col = functions.col
+        self._check(col('customer'), 'customer', StorageTypes.STRING, VariableTypes.NOMINAL)
+        self._check(col('Customer'), 'customer', StorageTypes.STRING)
+        self._check(col('df1.wax'), 'wax', StorageTypes.DOUBLE)
+        self._check(col('wax').alias('w'), 'w', StorageTypes.DOUBLE, VariableTypes.CONTINUOUS)
+        self.assertEqual(infer_schema([col('*')], self.schema).columns, self.schema.columns)
+
+        with self.assertRaises(AnalysisException) as ex:
+            infer_field(col('non_exist'), self.schema)
+        self.assertIn('non_exist', '{}'.format(ex.exception))
+
+    def test_arithmetic(self):
+        col = functions.col
+        self._check(col('job_number') + 1, '(job_number + 1)', StorageTypes.INTEGER)
+        self._check(col('job_number') * col('timestamp'), '(job_number * timestamp)', StorageTypes.LONG)
+        self._check(col('job_number') - col('wax'), '(job_number - wax)', StorageTypes.DOUBLE)
+        self._check(col('job_number') / 2, '(job_number / 2)', StorageTypes.DOUBLE)
+        self._check(-col('wax'), '(- wax)', StorageTypes.DOUBLE)
+        self._check(functions.sqrt('job_number'), 'sqrt(job_number)', StorageTypes.DOUBLE)
+        self._check(functions.floor('wax'), 'floor(wax)', StorageTypes.LONG)
+
+        with self.assertRaises(AnalysisException):
+            infer_field(col('date') + 1, self.schema)
+        with self.assertRaises(AnalysisException):
+            infer_field(col('customer') & col('wax'), self.schema)
+
+    def test_aggregates(self):
+        self._check(functions.count('customer'), 'count(customer)', StorageTypes.LONG)
+        self._check(functions.count_distinct('customer', 'job_number'),
+                    'count(DISTINCT customer, job_number)', StorageTypes.LONG)
+        self._check(functions.avg('wax'), 'avg(wax)', StorageTypes.DOUBLE)
+        self._check(functions.sum('job_number'), 'sum(job_number)', StorageTypes.LONG)
+        self._check(functions.sum('wax'), 'sum(wax)', StorageTypes.DOUBLE)
+        self._check(functions.max('timestamp'), 'max(timestamp)', StorageTypes.LONG)
+        self._check(functions.stddev('wax'), 'stddev_samp(wax)', StorageTypes.DOUBLE)
+        self._check(functions.collect_set('customer'), 'collect_set(customer)',
+                    StorageTypes.array(StorageTypes.STRING))
+        self._check(functions.percentile_approx('job_number', 0.5), 'percentile_approx(job_number, 0.5, 10000)',
+                    StorageTypes.INTEGER)
+        self._check(functions.percentile_approx('wax', [0.25, 0.75], accuracy=100),
+                    'percentile_approx(wax, array(0.25, 0.75), 100)', StorageTypes.array(StorageTypes.DOUBLE))
+
+        with self.assertRaises(AnalysisException):
+            infer_field(functions.avg('date'), self.schema)
+        with self.assertRaises(AnalysisException):
+            infer_field(functions.percentile_approx('date', 0.5), self.schema)
+        with self.assertRaises(ValueError):
+            functions.percentile_approx('wax', [0.5, 1.5])
+
+    def test_datetime_and_cast(self):
+        self._check(functions.year('date'), 'year(date)', StorageTypes.INTEGER)
+        self._check(functions.date_add('date', 3), 'date_add(date, 3)', StorageTypes.DATE)
+        self._check(functions.col('job_number').cast(StorageTypes.LONG), 'CAST(job_number AS BIGINT)',
+                    StorageTypes.LONG, VariableTypes.DISCRETE)
+        self._check(functions.col('wax').cast(StorageTypes.STRING), 'CAST(wax AS STRING)',
+                    StorageTypes.STRING, VariableTypes.TEXT)
+
+    def test_case_when(self):
+        col = functions.col
+        self._check(functions.when(col('wax') > 2, 1).otherwise(0),
+                    'CASE WHEN (wax > 2) THEN 1 ELSE 0 END', StorageTypes.INTEGER)
+        self._check(functions.when(col('wax') > 2, 1).when(col('wax') < 1, col('wax')),
+                    'CASE WHEN (wax > 2) THEN 1 WHEN (wax < 1) THEN wax END', StorageTypes.DOUBLE)
+        self._check(functions.when(col('wax') > 2, None).otherwise('low'),
+                    'CASE WHEN (wax > 2) THEN NULL ELSE low END', StorageTypes.STRING)
+
+        with self.assertRaises(AnalysisException):
+            infer_field(functions.when(col('wax'), 1), self.schema)
+
+    def test_collections(self):
+        col = functions.col
+        self._check(col('tags').get_item(0), 'tags[0]', StorageTypes.STRING)
+        self._check(col('props').get_item('a'), 'props[a]', StorageTypes.DOUBLE)
+        fields = infer_fields(functions.explode(col('props')), self.schema)
+        self.assertEqual([f.name for f in fields], ['key', 'value'])
+        fields = infer_fields(functions.explode(col('props')).alias('k', 'v'), self.schema)
+        self.assertEqual([f.name for f in fields], ['k', 'v'])
+        self.assertEqual([f.storage_type for f in fields], [StorageTypes.STRING, StorageTypes.DOUBLE])
+
+        with self.assertRaises(AnalysisException):
+            infer_field(functions.explode(col('props')), self.schema)
+
+    def test_raw_expression(self):
+        with self.assertRaises(NotImplementedError):
+            infer_field(functions.expr('wax + 1'), self.schema)
+
+
+if __name__ == '__main__':
+    unittest.main()
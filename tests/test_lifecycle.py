@@ -0,0 +1,130 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import gc
+import threading
+import time
+import unittest
+
+from pycebes.core.dataframe import Dataframe
+from pycebes.core.schema import Schema
+from pycebes.internal.lifecycle import DataframeTracker
+
+
+class _RecordingClient(object):
+    """Records the requests instead of sending them, after calling ``on_request`` if it is given"""
+
+    def __init__(self, on_request=None):
+        self.requests = []
+        self.on_request = on_request
+
+    def post_and_wait(self, uri, data):
+        if self.on_request is not None:
+            self.on_request()
+        self.requests.append((uri, data))
+
+
+class TestLifecycle(unittest.TestCase):
+
+    def test_dataframe_tracker(self):
+        client = _RecordingClient()
+        tracker = DataframeTracker(client, batch_size=3)
+
+        def _track(df_id):
+            df = Dataframe(df_id, Schema())
+            tracker.track(df)
+            return df
+
+        df1, df2, df2_again = _track('df-1'), _track('df-2'), _track('df-2')
+        del df1
+        gc.collect()
+        self.assertEqual(tracker.unused, ['df-1'])
+
+        # still referenced by another object
+        del df2
+        gc.collect()
+        self.assertEqual(tracker.unused, ['df-1'])
+
+        # tagged
+        tracker.pin('df-2')
+        del df2_again
+        gc.collect()
+        self.assertEqual(tracker.unused, ['df-1'])
+        tracker.unpin('df-2')
+        self.assertEqual(tracker.unused, ['df-1', 'df-2'])
+
+        self.assertEqual(tracker.release_unused(), ['df-1', 'df-2'])
+        self.assertEqual(client.requests, [('df/release', {'dfIds': ['df-1', 'df-2']})])
+        self.assertEqual(tracker.release_unused(), [])
+        self.assertEqual(len(client.requests), 1)
+
+        # released automatically when there are batch_size of them
+        for i in range(3):
+            _track('df-{}'.format(i + 3))
+        gc.collect()
+        df6 = _track('df-6')
+        self.assertEqual(client.requests[-1], ('df/release', {'dfIds': ['df-3', 'df-4', 'df-5']}))
+        self.assertEqual(tracker.unused, [])
+        self.assertEqual(df6.id, 'df-6')
+
+    def test_tracked_again_while_released(self):
+        entered = []
+        released = []
+        results = []
+        client = _RecordingClient()
+        tracker = DataframeTracker(client, batch_size=None, on_release=released.extend)
+
+        tracker.track(Dataframe('df-1', Schema()))
+        tracker.track(Dataframe('df-2', Schema()))
+        gc.collect()
+        self.assertEqual(tracker.unused, ['df-1', 'df-2'])
+
+        # a request returning df-1 is in flight: the release waits for its result to be tracked
+        with tracker.requesting():
+            thread = threading.Thread(target=lambda: results.append(tracker.release_unused()))
+            thread.start()
+            time.sleep(0.2)
+            self.assertEqual(client.requests, [])
+            df1 = Dataframe.from_json({'id': 'df-1', 'schema': {'fields': []}}, tracker=tracker)
+        thread.join(10)
+        self.assertEqual(client.requests, [('df/release', {'dfIds': ['df-2']})])
+        self.assertEqual(results, [['df-2']])
+        self.assertEqual(released, ['df-2'])
+        self.assertEqual(df1.id, 'df-1')
+        self.assertEqual(tracker.unused, [])
+
+        # requests wait for the ongoing release
+        def _request():
+            with tracker.requesting():
+                entered.append(len(client.requests))
+
+        def _on_request():
+            thread = threading.Thread(target=_request)
+            thread.start()
+            time.sleep(0.2)
+            self.assertEqual(entered, [])
+            return thread
+
+        threads = []
+        client.on_request = lambda: threads.append(_on_request())
+        del df1
+        gc.collect()
+        self.assertEqual(tracker.release_unused(), ['df-1'])
+        threads[0].join(10)
+        self.assertEqual(entered, [2])
+        self.assertEqual(released, ['df-2', 'df-1'])
+
+if __name__ == '__main__':
+    unittest.main()
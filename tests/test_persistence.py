@@ -0,0 +1,157 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+from pycebes.core.column import lit
+from pycebes.core.dataframe import Dataframe, StorageLevels
+from pycebes.core.persistence import AutoPersistPolicy
+from pycebes.core.pipeline import Model
+from pycebes.core.schema import Schema
+from pycebes.internal.implicits import get_session_stack
+from pycebes.internal.scheduler import Priorities
+
+
+class _RecordingClient(object):
+    """Records the requests instead of sending them, and answers size estimates"""
+
+    def __init__(self, sizes):
+        self.sizes = sizes
+        self.requests = []
+        self.priorities = set()
+
+    def post_and_wait(self, uri, data, priority=None, timeout=None):
+        if uri in ('df/join', 'model/run'):
+            return {'id': 'df-result', 'schema': {'fields': []}}
+        self.requests.append((uri, data['df']))
+        self.priorities.add(priority)
+        if uri == 'df/estimatesize':
+            return {'sizeInBytes': self.sizes[data['df']]}
+        return {}
+
+
+class _FakeSession(object):
+    """The few attributes of a Session used by Dataframes"""
+
+    def __init__(self, client, auto_persist):
+        self.client = client
+        self.auto_persist = auto_persist
+        self.validate = False
+        self.dataframe_tracker = None
+
+
+class TestPersistence(unittest.TestCase):
+
+    def test_auto_persist_policy(self):
+        client = _RecordingClient({'df-1': 600, 'df-2': 300, 'df-3': 2000, 'df-4': 400})
+        policy = AutoPersistPolicy(threshold=2, budget_bytes=1000, storage_level=StorageLevels.MEMORY_ONLY)
+        df1, df2, df3, df4 = [Dataframe('df-{}'.format(i), Schema()) for i in range(1, 5)]
+
+        policy.record_use(df1, client)
+        self.assertEqual(client.requests, [])
+        policy.record_use(df1, client)
+        # sent in the background
+        self.assertTrue(policy.wait(timeout=10))
+        self.assertEqual(client.requests, [('df/estimatesize', 'df-1'), ('df/persist', 'df-1')])
+        self.assertEqual(client.priorities, {Priorities.BATCH})
+        self.assertEqual(policy.used_bytes, 600)
+
+        # only once
+        policy.record_use(df1, client)
+        self.assertEqual(len(client.requests), 2)
+
+        # too big
+        policy.record_use(df3, client)
+        policy.record_use(df3, client)
+        policy.wait()
+        self.assertEqual(client.requests[-1], ('df/estimatesize', 'df-3'))
+        self.assertNotIn('df-3', policy.persisted)
+
+        policy.record_use(df2, client)
+        policy.record_use(df2, client)
+        policy.wait()
+        self.assertEqual(list(policy.persisted.items()), [('df-1', 600), ('df-2', 300)])
+
+        # df-1 is used again, so df-2 is the least recently used one
+        policy.record_use(df1, client)
+        del client.requests[:]
+        policy.record_use(df4, client)
+        policy.record_use(df4, client)
+        policy.wait()
+        self.assertEqual(client.requests, [('df/estimatesize', 'df-4'), ('df/unpersist', 'df-2'),
+                                           ('df/persist', 'df-4')])
+        self.assertEqual(list(policy.persisted.items()), [('df-1', 600), ('df-4', 400)])
+
+        # evicted Dataframes are persisted again after threshold more uses
+        del client.requests[:]
+        policy.record_use(df2, client)
+        policy.record_use(df2, client)
+        policy.wait()
+        self.assertEqual(client.requests, [('df/estimatesize', 'df-2'), ('df/unpersist', 'df-1'),
+                                           ('df/persist', 'df-2')])
+        self.assertEqual(list(policy.persisted.items()), [('df-4', 400), ('df-2', 300)])
+
+        policy.forget(['df-2'])
+        self.assertEqual(policy.used_bytes, 400)
+
+        with self.assertRaises(ValueError):
+            AutoPersistPolicy(threshold=0)
+
+    def test_all_inputs_recorded(self):
+        client = _RecordingClient({'df-1': 10, 'df-2': 10})
+        policy = AutoPersistPolicy(threshold=1)
+        df1, df2 = Dataframe('df-1', Schema()), Dataframe('df-2', Schema())
+
+        with get_session_stack().get_controller(_FakeSession(client, policy)):
+            df1.join(df2, lit(True))
+            policy.wait()
+            self.assertEqual(sorted(policy.persisted), ['df-1', 'df-2'])
+
+            policy.forget(['df-1', 'df-2'])
+            Model('model-1', 'LinearRegressionModel', {}, {}).transform(df2)
+            policy.wait()
+            self.assertEqual(list(policy.persisted), ['df-2'])
+
+    def test_explicitly_persisted(self):
+        client = _RecordingClient({'df-1': 600, 'df-2': 600})
+        policy = AutoPersistPolicy(threshold=2, budget_bytes=1000, storage_level=StorageLevels.MEMORY_ONLY)
+        df1, df2 = Dataframe('df-1', Schema()), Dataframe('df-2', Schema())
+
+        with get_session_stack().get_controller(_FakeSession(client, policy)):
+            df1.persist(StorageLevels.DISK_ONLY)
+            for _ in range(5):
+                policy.record_use(df1, client)
+            policy.wait()
+            self.assertEqual(client.requests, [('df/persist', 'df-1')])
+            self.assertEqual(policy.persisted, {})
+
+            # not evicted to make room for df-2
+            policy.record_use(df2, client)
+            policy.record_use(df2, client)
+            policy.wait()
+            self.assertEqual(client.requests[1:], [('df/estimatesize', 'df-2'), ('df/persist', 'df-2')])
+
+            # counted again once unpersisted
+            df1.unpersist()
+            del client.requests[:]
+            policy.record_use(df1, client)
+            policy.record_use(df1, client)
+            policy.wait()
+            self.assertEqual(client.requests, [('df/estimatesize', 'df-1'), ('df/unpersist', 'df-2'),
+                                               ('df/persist', 'df-1')])
+
+
+if __name__ == '__main__':
+    unittest.main()
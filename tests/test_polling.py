@@ -0,0 +1,63 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+from pycebes.internal.polling import AdaptivePoller
+
+
+class TestPolling(unittest.TestCase):
+
+    def test_adaptive_poller(self):
+        poller = AdaptivePoller(history_size=4, min_samples=3, min_interval=0.05, max_interval=10.)
+
+        # not enough history: exponential back-off
+        self.assertEqual(poller.next_delay('df/count', 0., 0), 0)
+        for n_polls in range(10):
+            self.assertTrue(0 <= poller.next_delay('df/count', 1., n_polls, sleep_base=0.5) <= 0.5 * 127)
+
+        for d in [2., 1., 3.]:
+            poller.record('df/count', d, 2)
+        poller.record(None, 100., 1)
+
+        # polls at the completion times seen so far
+        self.assertAlmostEqual(poller.next_delay('df/count', 0., 0), 1.)
+        self.assertAlmostEqual(poller.next_delay('df/count', 1., 1), 1.)
+        self.assertAlmostEqual(poller.next_delay('df/count', 2.99, 2), 0.05)
+
+        # then less and less often
+        self.assertAlmostEqual(poller.next_delay('df/count', 8., 3), 2.)
+        self.assertAlmostEqual(poller.next_delay('df/count', 100., 3), 10.)
+
+        # other commands are not affected
+        self.assertEqual(poller.next_delay('pipeline/run', 0., 0), 0)
+
+        stats = poller.stats()
+        self.assertEqual(list(stats.keys()), ['df/count'])
+        self.assertEqual(stats['df/count'], {'count': 3, 'mean': 2., 'p50': 2., 'p90': 2., 'max': 3.,
+                                             'mean_polls': 2.})
+
+        # only the latest completion times are kept
+        for d in [5., 5., 5.]:
+            poller.record('df/count', d, 1)
+        self.assertEqual(poller.stats()['df/count']['count'], 4)
+        self.assertEqual(poller.stats()['df/count']['p50'], 5.)
+
+        poller.clear()
+        self.assertEqual(poller.stats(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+import time
+import unittest
+
+from pycebes.internal.scheduler import Priorities, RequestScheduler
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_priorities(self):
+        self.assertEqual(Priorities.of('df/take'), Priorities.INTERACTIVE)
+        self.assertEqual(Priorities.of('pipeline/run'), Priorities.BATCH)
+        self.assertEqual(Priorities.of('df/select'), Priorities.NORMAL)
+
+    def test_request_scheduler(self):
+        scheduler = RequestScheduler(max_in_flight=1)
+        started = []
+
+        def _run(name, priority):
+            with scheduler.slot(priority):
+                started.append(name)
+
+        scheduler.acquire()
+        threads = []
+        for name, priority in [('batch', Priorities.BATCH), ('normal', Priorities.NORMAL),
+                               ('interactive', Priorities.INTERACTIVE)]:
+            threads.append(threading.Thread(target=_run, args=(name, priority)))
+            threads[-1].start()
+            time.sleep(0.05)
+        self.assertEqual(scheduler.stats()['queued'], 3)
+
+        # no slot before the deadline
+        with self.assertRaises(TimeoutError):
+            scheduler.acquire(deadline=time.monotonic() + 0.05)
+
+        scheduler.release()
+        for t in threads:
+            t.join()
+        self.assertEqual(started, ['interactive', 'normal', 'batch'])
+
+        stats = scheduler.stats()
+        self.assertEqual((stats['in_flight'], stats['queued'], stats['max_queued']), (0, 0, 4))
+        self.assertEqual((stats['started'], stats['delayed']), (4, 3))
+        self.assertGreater(stats['max_wait'], 0.05)
+
+        with self.assertRaises(ValueError):
+            RequestScheduler(max_in_flight=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
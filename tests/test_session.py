@@ -19,6 +19,7 @@ import unittest
 import pandas as pd
 import six
 
+from pycebes.core import functions
 from pycebes.core import pipeline_api as pl
 from pycebes.core.dataframe import Dataframe
 from pycebes.core.exceptions import ServerException
@@ -180,6 +181,18 @@ class TestSession(test_base.TestBase):
         self.assertEqual(len(df.columns), 40)
         self.assertFalse(all(f.storage_type == StorageTypes.STRING for f in df.schema.fields))
 
+        # with projection and filter
+        df = self.session.read_csv(path=csv_path, options=CsvReadOptions(),
+                                   columns=['_c0', '_c2'], condition=functions.col('_c2') == 'TVGUIDE')
+        self.assertEqual(df.columns, ['_c0', '_c2'])
+        self.assertGreater(len(df), 0)
+        self.assertTrue(all(v == 'TVGUIDE' for v in df.take(10).to_pandas()['_c2']))
+
+        with self.assertRaises(ValueError):
+            self.session.read_csv(path=csv_path, columns=[])
+        with self.assertRaises(ValueError):
+            self.session.read_csv(path=csv_path, condition='_c2 = "TVGUIDE"')
+
     def test_read_local_json(self):
         json_path = os.path.join(os.path.split(__file__)[0], 'data', 'cylinder_bands.json')
         with self.assertRaises(ValueError):
@@ -208,6 +221,12 @@ class TestSession(test_base.TestBase):
         self.assertEqual(cebes_df.schema['timestamp'].storage_type, StorageTypes.INTEGER)
         self.assertEqual(cebes_df.schema['anode_space_ratio'].storage_type, StorageTypes.DOUBLE)
 
+    def test_from_pandas_timestamps(self):
+        pandas_df = pd.DataFrame({'t': pd.to_datetime(['2017-01-02 10:20:30.123456', '2017-01-03 00:00:00.5'])})
+        cebes_df = self.session.from_pandas(pandas_df)
+        self.assertEqual(cebes_df.schema['t'].storage_type, StorageTypes.TIMESTAMP)
+        self.assertEqual(list(cebes_df.sort('t').to_pandas()['t']), list(pandas_df['t']))
+
     @unittest.skipUnless(test_config.ENABLE_DOCKER_TESTS, 'Docker tests are disabled')
     def test_docker_container(self):
         """
@@ -0,0 +1,280 @@
+# Copyright 2016 The Cebes Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, version 2.0 (the "License").
+# You may not use this work except in compliance with the License,
+# which is available at www.apache.org/licenses/LICENSE-2.0
+#
+# This software is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied, as more fully set forth in the License.
+#
+# See the NOTICE file distributed with this work for information regarding copyright ownership.
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import base64
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from pycebes.core.dataframe import Dataframe
+from pycebes.core.schema import Schema, SchemaField, StorageTypes, VariableTypes
+from pycebes.core.session import Session, CsvReadOptions, CsvWriteOptions, ReadOptions
+from pycebes.core.writer import DataframeWriter
+from pycebes.internal.helpers import file_digest
+from pycebes.internal.local_cache import LocalCache
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+class TestStorageRequests(unittest.TestCase):
+    """
+    Tests on how requests to the ``storage`` endpoints are built. These do not need a Cebes server.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix='cebes')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_jdbc_request(self):
+        # a file-backed stand-in for the warehouse table
+        db_path = os.path.join(self.tmp_dir, 'warehouse.db')
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('CREATE TABLE sales (id INTEGER PRIMARY KEY, region TEXT, amount REAL)')
+            conn.executemany('INSERT INTO sales (region, amount) VALUES (?, ?)',
+                             [('north' if i % 2 == 0 else 'south', i * 1.5) for i in range(100)])
+            lower, upper = conn.execute('SELECT MIN(id), MAX(id) FROM sales').fetchone()
+        url = 'jdbc:sqlite:{}'.format(db_path)
+
+        request = Session._jdbc_request(url, 'sales', user_name='user', password='pass')
+        self.assertEqual(request, {'jdbc': {'url': url, 'tableName': 'sales', 'userName': 'user',
+                                            'passwordBase64': 'cGFzcw=='}})
+        self.assertEqual(base64.urlsafe_b64decode(request['jdbc']['passwordBase64']), b'pass')
+
+        request = Session._jdbc_request(url, 'sales', partition_column='id', lower_bound=lower,
+                                        upper_bound=upper, num_partitions=np.int64(4), fetch_size=1000)
+        jdbc = request['jdbc']
+        self.assertEqual(jdbc['partitionColumn'], 'id')
+        self.assertEqual((jdbc['lowerBound'], jdbc['upperBound']), ('1', '100'))
+        self.assertEqual(jdbc['numPartitions'], 4)
+        self.assertEqual(jdbc['fetchSize'], 1000)
+        self.assertNotIn('predicates', jdbc)
+
+        request = Session._jdbc_request(url, 'sales', predicates=["region = 'north'", "region = 'south'"])
+        self.assertEqual(request['jdbc']['predicates'], ["region = 'north'", "region = 'south'"])
+        self.assertNotIn('partitionColumn', request['jdbc'])
+
+        # the predicates cover the whole table
+        with sqlite3.connect(db_path) as conn:
+            counts = [conn.execute('SELECT COUNT(*) FROM sales WHERE {}'.format(p)).fetchone()[0]
+                      for p in request['jdbc']['predicates']]
+        self.assertEqual(sum(counts), 100)
+
+        # invalid combinations
+        with self.assertRaises(ValueError):
+            Session._jdbc_request(url, 'sales', partition_column='id', num_partitions=4)
+        with self.assertRaises(ValueError):
+            Session._jdbc_request(url, 'sales', lower_bound=lower, upper_bound=upper)
+        with self.assertRaises(ValueError):
+            Session._jdbc_request(url, 'sales', partition_column='id', lower_bound=upper,
+                                  upper_bound=lower, num_partitions=4)
+        with self.assertRaises(ValueError):
+            Session._jdbc_request(url, 'sales', partition_column='id', lower_bound=lower, upper_bound=upper,
+                                  num_partitions=4, predicates=["region = 'north'"])
+        with self.assertRaises(ValueError):
+            Session._jdbc_request(url, 'sales', num_partitions=0)
+        with self.assertRaises(ValueError):
+            Session._jdbc_request(url, 'sales', fetch_size=-1)
+        with self.assertRaises(ValueError):
+            Session._jdbc_request(url, 'sales', fetch_size=True)
+        with self.assertRaises(ValueError):
+            Session._jdbc_request(url, 'sales', predicates=[])
+
+    def test_write_request(self):
+        df = Dataframe('df-1', Schema([SchemaField('customer'), SchemaField('year', StorageTypes.INTEGER),
+                                       SchemaField('wax', StorageTypes.DOUBLE)]))
+        writer = df.write
+        self.assertIsInstance(writer, DataframeWriter)
+
+        request = writer._hdfs_request('/data/sales', 'hdfs://server:9000', 'csv', mode=DataframeWriter.OVERWRITE,
+                                       partition_by=['year', df.customer], compression='gzip',
+                                       options=CsvWriteOptions(sep=';'))
+        self.assertEqual(request['df'], 'df-1')
+        self.assertEqual(request['mode'], 'overwrite')
+        self.assertEqual(request['partitionBy'], ['year', 'customer'])
+        self.assertEqual(request['hdfs'], {'path': '/data/sales', 'format': 'csv', 'uri': 'hdfs://server:9000'})
+        self.assertEqual(request['writeOptions']['sep'], ';')
+        self.assertEqual(request['writeOptions']['header'], 'true')
+        self.assertEqual(request['writeOptions']['compression'], 'gzip')
+
+        request = writer._hive_request('sales', partition_by='year', bucket_by='customer', num_buckets=8,
+                                       sort_by=['wax'], fmt='orc')
+        self.assertEqual(request['mode'], 'error')
+        self.assertEqual(request['hive'], {'tableName': 'sales', 'format': 'orc', 'bucketBy': ['customer'],
+                                           'numBuckets': 8, 'sortBy': ['wax']})
+
+        request = writer._jdbc_request('jdbc:sqlite:/tmp/a.db', 'sales', password='pass',
+                                       num_partitions=np.int64(4))
+        self.assertEqual(request['jdbc']['passwordBase64'], 'cGFzcw==')
+        self.assertEqual(request['jdbc']['numPartitions'], 4)
+        self.assertEqual(request['partitionBy'], [])
+
+        # invalid combinations
+        with self.assertRaises(ValueError):
+            writer._hdfs_request('/data/sales', mode='replace')
+        with self.assertRaises(ValueError):
+            writer._hdfs_request('/data/sales', fmt='parquet', compression='bzip2')
+        with self.assertRaises(ValueError):
+            writer._hdfs_request('/data/sales', partition_by='non_exist')
+        with self.assertRaises(ValueError):
+            writer._hive_request('sales', bucket_by='customer')
+        with self.assertRaises(ValueError):
+            writer._hive_request('sales', partition_by='customer', bucket_by='customer', num_buckets=8)
+        with self.assertRaises(ValueError):
+            writer._hive_request('sales', sort_by='wax')
+        with self.assertRaises(ValueError):
+            writer._jdbc_request('jdbc:sqlite:/tmp/a.db', 'sales', batch_size=0)
+        with self.assertRaises(ValueError):
+            writer._jdbc_request('jdbc:sqlite:/tmp/a.db', 'sales', batch_size=True)
+        with self.assertRaises(ValueError):
+            writer._hive_request('sales', bucket_by='customer', num_buckets=True)
+        with self.assertRaises(ValueError):
+            writer.csv('/data/sales', options=CsvReadOptions())
+        self.assertNotIsInstance(CsvWriteOptions(), ReadOptions)
+
+    def test_schema_from_pandas(self):
+        df = pd.DataFrame({'i': [1, 2], 'f': [1.5, None], 's': ['a', 'b'], 'b': [True, False],
+                           't': pd.to_datetime(['2017-01-01', '2017-01-02']), 'c': pd.Categorical(['x', 'y'])})
+        schema = Schema.from_pandas(df)
+        self.assertEqual(schema.columns, ['i', 'f', 's', 'b', 't', 'c'])
+        self.assertEqual([f.storage_type for f in schema.fields],
+                         [StorageTypes.LONG, StorageTypes.DOUBLE, StorageTypes.STRING, StorageTypes.BOOLEAN,
+                          StorageTypes.TIMESTAMP, StorageTypes.STRING])
+        self.assertEqual(schema['c'].variable_type, VariableTypes.NOMINAL)
+
+        # round trip through JSON
+        schema2 = Schema.from_json(schema.to_json())
+        self.assertEqual([(f.name, f.storage_type, f.variable_type) for f in schema2.fields],
+                         [(f.name, f.storage_type, f.variable_type) for f in schema.fields])
+
+    def test_from_pandas_timestamps(self):
+        df = pd.DataFrame({'t': pd.to_datetime(['2017-01-02 10:20:30.123456', '2017-01-03 00:00:00.000001'])})
+        uploaded = []
+
+        def _read_csv(path, options, schema=None):
+            uploaded.append((pd.read_csv(path)['t'], options.to_json(), schema))
+
+        session = Session.__new__(Session)
+        with mock.patch.object(session, 'read_csv', side_effect=_read_csv):
+            session.from_pandas(df)
+
+        values, options, schema = uploaded[0]
+        self.assertEqual(options['timestampFormat'], "yyyy-MM-dd'T'HH:mm:ss.SSSSSS")
+        self.assertEqual(schema['t'].storage_type, StorageTypes.TIMESTAMP)
+        # sub-second precision is kept
+        self.assertEqual(list(pd.to_datetime(values, format='%Y-%m-%dT%H:%M:%S.%f')), list(df['t']))
+
+    def test_schema_cache(self):
+        csv_path = os.path.join(self.tmp_dir, 'data.csv')
+        with open(csv_path, 'w') as f:
+            f.write('a,b\n1,x\n2,y\n')
+        options = CsvReadOptions(header=True, infer_schema=True).to_json()
+
+        key = Session._schema_cache_key(file_digest(csv_path), 'csv', options)
+        self.assertNotEqual(key, Session._schema_cache_key(file_digest(csv_path), 'csv',
+                                                           CsvReadOptions(header=True).to_json()))
+
+        cache = LocalCache('schemas', cache_dir=self.tmp_dir, max_entries=2)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, {'fields': []})
+        self.assertEqual(cache.get(key), {'fields': []})
+
+        # least recently written entries are evicted
+        cache.put('k2', 2)
+        cache.put('k3', 3)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual((cache.get('k2'), cache.get('k3')), (2, 3))
+        cache.remove('k2')
+        self.assertIsNone(cache.get('k2'))
+
+        # caches holding secrets are only readable by the owner
+        secret_cache = LocalCache('tokens', cache_dir=self.tmp_dir, file_mode=0o600)
+        secret_cache.put('localhost:21000:admin', {'authorization': 'token'})
+        self.assertEqual(os.stat(secret_cache.file_path).st_mode & 0o777, 0o600)
+        self.assertEqual(secret_cache.get('localhost:21000:admin'), {'authorization': 'token'})
+
+        # content changed
+        with open(csv_path, 'a') as f:
+            f.write('3,z\n')
+        self.assertNotEqual(key, Session._schema_cache_key(file_digest(csv_path), 'csv', options))
+
+    def test_expand_local_paths(self):
+        parts_dir = os.path.join(self.tmp_dir, 'parts')
+        os.mkdir(parts_dir)
+        for name in ['part-2.csv', 'part-1.csv', 'part-3.csv.gz', 'part-4', '_SUCCESS', '.part-1.csv.crc',
+                     'other.json']:
+            with open(os.path.join(parts_dir, name), 'w') as f:
+                f.write('a,b\n')
+        os.mkdir(os.path.join(parts_dir, 'sub'))
+
+        def _names(paths):
+            return [os.path.relpath(p, parts_dir) for p in paths]
+
+        expand = Session._expand_local_paths
+        self.assertEqual(_names(expand(os.path.join(parts_dir, 'part-1.csv'))), ['part-1.csv'])
+        # only the files of the format, or without extension, are read from directories
+        self.assertEqual(_names(expand(parts_dir)), ['part-1.csv', 'part-2.csv', 'part-3.csv.gz', 'part-4'])
+        self.assertEqual(_names(expand(parts_dir, 'json')), ['other.json', 'part-4'])
+        self.assertEqual(_names(expand(os.path.join(parts_dir, 'other.json'), 'csv')), ['other.json'])
+        self.assertEqual(_names(expand(os.path.join(parts_dir, 'part-*.csv'))), ['part-1.csv', 'part-2.csv'])
+        self.assertEqual(_names(expand([os.path.join(parts_dir, 'part-2.csv'), os.path.join(parts_dir, '*.csv')])),
+                         ['part-2.csv', 'part-1.csv'])
+
+        with self.assertRaises(ValueError):
+            expand(os.path.join(parts_dir, 'non_exist.csv'))
+        with self.assertRaises(ValueError):
+            expand(os.path.join(parts_dir, '*.parquet'))
+        with self.assertRaises(ValueError):
+            expand([])
+
+    def test_read_local_validation(self):
+        session = Session.__new__(Session)
+        session._client = mock.Mock()
+        csv_path = os.path.join(self.tmp_dir, 'data.csv')
+        with open(csv_path, 'w') as f:
+            f.write('a,b\n')
+
+        # invalid arguments are rejected before uploading anything
+        with self.assertRaises(ValueError):
+            session.read_local(csv_path, fmt='parquet', schema=Schema())
+        with self.assertRaises(ValueError):
+            session.read_local(csv_path, schema='a INT')
+        with self.assertRaises(ValueError):
+            session.read_local(csv_path, fmt='xls')
+        with self.assertRaises(ValueError):
+            session.read_local(csv_path, max_upload_workers=0)
+        session._client.upload_many.assert_not_called()
+
+    def test_read_local_wrappers(self):
+        session = Session.__new__(Session)
+        with mock.patch.object(session, 'read_local') as read_local:
+            session.read_csv('data.csv', max_upload_workers=2, timeout=5)
+            session.read_json('data.json', timeout=5)
+        self.assertEqual([c[1]['fmt'] for c in read_local.call_args_list], ['csv', 'json'])
+        self.assertEqual([(c[1]['max_upload_workers'], c[1]['timeout']) for c in read_local.call_args_list],
+                         [(2, 5), (4, 5)])
+
+
+if __name__ == '__main__':
+    unittest.main()